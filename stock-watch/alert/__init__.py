@@ -1,2 +1,4 @@
 from .interface import IAlert
 from .line import AlertByLine
+from .breaker import BreakerAlert
+from .queued import QueuedAlert
@@ -0,0 +1,53 @@
+from typing import Dict
+from typing import List
+
+from breaker import CircuitBreaker
+from exceptions import AlertCircuitOpenException
+from exceptions import AlertException
+from .interface import IAlert
+
+
+class BreakerAlert(IAlert):
+    """
+    通知先の障害時に、通知を遮断する
+
+    連続して通知に失敗した場合は、通知先に送らずにすぐ失敗とし
+    (AlertCircuitOpenException)、一定時間後の通知で回復を確認する
+    (確認のためだけの通知は送らない)
+    """
+
+    def __init__(
+        self,
+        alert: IAlert,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0
+    ):
+        self.__alert = alert
+        self.__breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    def send_message(self, message: str):
+        self.send_messages([message])
+
+    def send_messages(self, messages: List[str]):
+        if not self.__breaker.allow():
+            raise AlertCircuitOpenException(
+                '通知先を遮断中のため、通知しませんでした。'
+            )
+        try:
+            self.__alert.send_messages(messages)
+        except AlertException:
+            self.__breaker.record_failure()
+            raise
+        self.__breaker.record_success()
+
+    def flush(self, timeout: float = None) -> List[str]:
+        return self.__alert.flush(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = self.__alert.get_stats()
+        stats.update(self.__breaker.get_stats())
+        return stats
@@ -1,5 +1,7 @@
 from abc import ABCMeta
 from abc import abstractmethod
+from typing import Dict
+from typing import List
 
 
 class IAlert(metaclass=ABCMeta):
@@ -20,3 +22,58 @@ class IAlert(metaclass=ABCMeta):
 
         """
         pass
+
+    def send_messages(self, messages: List[str]):
+        """
+        複数の通知メッセージを送信する
+
+        Params
+        -------
+        messages: List[str]
+            通知メッセージのリスト
+
+        Remarks
+        -------
+        既定では1件ずつ送信する
+        (まとめて送信できる実装では、オーバーライドする)
+        通知できなかった場合には例外発生
+        (exception.AlertException)
+
+        """
+        for message in messages:
+            self.send_message(message)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        通知の送信状況の統計を取得する
+
+        Returns
+        -------
+        0: Dict[str, int]
+            統計の項目名をキーとした値
+            (統計のない実装では空)
+
+        """
+        return {}
+
+    def flush(self, timeout: float = None) -> List[str]:
+        """
+        送信待ちの通知メッセージを送信し終えるまで待つ
+
+        Params
+        -------
+        timeout: float
+            待つ時間の上限(秒) (Noneの場合は、実装の既定の時間)
+
+        Returns
+        -------
+        0: List[str]
+            送信できなかった通知メッセージのリスト
+
+        Remarks
+        -------
+        既定では送信待ちのメッセージはないため、すぐに空のリストを返す
+        (バックグラウンドで送信する実装では、オーバーライドする)
+
+        """
+        return []
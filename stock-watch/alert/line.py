@@ -1,29 +1,152 @@
 import json
+import uuid
+from threading import Lock
+from typing import Dict
+from typing import List
 
 import requests
 
 from .interface import IAlert
 from config import Config
 from exceptions import AlertException
+from exceptions import PartialAlertException
+from session import PooledSession
 
 
 class AlertByLine(IAlert):
-    def __init__(self):
+    """
+    LINEのプッシュメッセージで通知する
+
+    複数のメッセージは、テキストの文字数の上限まで1つのテキストにまとめ、
+    1回の送信でテキストを上限の数まで送る
+    (上限を超えるメッセージは、行の区切りで分ける)
+
+    途中の送信に失敗した場合は、送信できなかったテキストを例外で返し
+    (PartialAlertException)、同じテキストを送信し直す場合は同じ再試行用のキーを使う
+    (送信済みだった場合、LINEは重複して通知しない)
+    """
+    # テキストの文字数の上限
+    max_text_length = 5000
+    # 1回の送信で送れるテキストの数の上限
+    max_texts_per_push = 5
+    # 保持する再試行用のキーの数の上限 (超えた場合は古いものから削除する)
+    max_retry_keys = 100
+
+    def __init__(self, session: PooledSession = None):
         config = Config()
         self.__url = 'https://api.line.me/v2/bot/message/push'
         self.__user_id = config.user_id
         self.__channel_access_token = config.channel_access_token
+        # 接続はセッションのプールから使い回す
+        self.__session = session or PooledSession()
+        # 送信を依頼されたメッセージ数と、実際に送信した回数
+        self.__stats = {'alert_messages': 0, 'alert_pushes': 0}
+        self.__stats_lock = Lock()
+        # 送信に失敗した送信内容をキーとした、再試行用のキー
+        self.__retry_keys: Dict[str, str] = {}
+
+    @property
+    def session(self) -> PooledSession:
+        return self.__session
 
     def send_message(self, message: str):
+        self.send_messages([message])
+
+    def send_messages(self, messages: List[str]):
+        pushes = self.pack_messages(messages)
+        with self.__stats_lock:
+            self.__stats['alert_messages'] += len(messages)
+        for index, texts in enumerate(pushes):
+            try:
+                self.__push(texts)
+            except AlertException as ex:
+                # 送信できなかったテキストは、同じまとめ方で送信し直せる
+                raise PartialAlertException(
+                    str(ex),
+                    delivered=sum(len(texts) for texts in pushes[:index]),
+                    undelivered=[
+                        text for texts in pushes[index:] for text in texts
+                    ]
+                ) from ex
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+        # 1件ずつ送信した場合と比べて、減らせた送信回数
+        stats['alert_calls_saved'] = \
+            max(stats['alert_messages'] - stats['alert_pushes'], 0)
+        return stats
+
+    def pack_messages(self, messages: List[str]) -> List[List[str]]:
+        """
+        メッセージを、送信ごとのテキストにまとめる
+
+        Params
+        -------
+        messages: List[str]
+            通知メッセージのリスト
+
+        Returns
+        -------
+        0: List[List[str]]
+            送信ごとの、テキストのリスト
+        """
+        texts = []
+        for message in messages:
+            for chunk in self.__split(message):
+                # 前のテキストに収まる場合は、改行でつなげる
+                if texts and \
+                        len(texts[-1]) + 1 + len(chunk) <= self.max_text_length:
+                    texts[-1] += '\n' + chunk
+                else:
+                    texts.append(chunk)
+        size = self.max_texts_per_push
+        return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    def __split(self, message: str) -> List[str]:
+        # 文字数の上限を超えるメッセージを、行の区切りで分ける
+        # (1行で上限を超える場合は、上限の文字数で分ける)
+        limit = self.max_text_length
+        chunks = []
+        chunk = ''
+        for line in message.split('\n'):
+            while len(line) > limit:
+                if chunk:
+                    chunks.append(chunk)
+                    chunk = ''
+                chunks.append(line[:limit])
+                line = line[limit:]
+            if chunk and len(chunk) + 1 + len(line) > limit:
+                chunks.append(chunk)
+                chunk = line
+            else:
+                chunk = f'{chunk}\n{line}' if chunk else line
+        if chunk:
+            chunks.append(chunk)
+        # 空のテキストは送れないため、除く
+        return [chunk for chunk in chunks if chunk.strip()]
+
+    def __push(self, texts: List[str]):
+        payload = self.__make_payload(texts)
+        # 失敗した送信内容を送信し直す場合は、同じ再試行用のキーを使う
+        with self.__stats_lock:
+            retry_key = self.__retry_keys.get(payload) or str(uuid.uuid4())
         try:
-            response = requests.post(
+            response = self.__session.post(
                 self.__url,
-                headers=self.__make_headers(),
-                data=self.__make_payload(message),
+                headers=self.__make_headers(retry_key),
+                data=payload,
             )
-            response.raise_for_status()
+            # 409は、同じ再試行用のキーの送信が既に受け付けられていた場合
+            # (送信できたものとする)
+            if response.status_code != 409:
+                response.raise_for_status()
         except requests.exceptions.RequestException as ex:
+            self.__keep_retry_key(payload, retry_key)
             response = ex.response
+            if response is None:
+                # 再試行しても接続できなかった場合
+                raise AlertException(f'api error: {ex}') from ex
             status_code = response.status_code
             response_body = \
                 json.loads(
@@ -34,18 +157,36 @@ class AlertByLine(IAlert):
                 f'message => {response_body["message"]}'
             raise AlertException(err_message)
 
-    def __make_headers(self):
+        with self.__stats_lock:
+            # 送信できた送信内容の再試行用のキーは、使わないため削除する
+            self.__retry_keys.pop(payload, None)
+            self.__stats['alert_pushes'] += 1
+
+    def __keep_retry_key(self, payload: str, retry_key: str):
+        with self.__stats_lock:
+            self.__retry_keys.pop(payload, None)
+            self.__retry_keys[payload] = retry_key
+            # 送信し直されない送信内容のキーが溜まらないよう、古いものから削除する
+            while len(self.__retry_keys) > self.max_retry_keys:
+                del self.__retry_keys[next(iter(self.__retry_keys))]
+
+    def __make_headers(self, retry_key: str):
         return {
             'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.__channel_access_token}'
+            'Authorization': f'Bearer {self.__channel_access_token}',
+            # 再試行したリクエストが重複して通知されないようにする
+            'X-Line-Retry-Key': retry_key,
         }
 
-    def __make_payload(self, message: str):
+    def __make_payload(self, texts: List[str]):
         payload = {
             'to': self.__user_id,
-            'messages': [{
-                'type': 'text',
-                'text': message
-            }]
+            'messages': [
+                {
+                    'type': 'text',
+                    'text': text
+                }
+                for text in texts
+            ]
         }
         return json.dumps(payload)
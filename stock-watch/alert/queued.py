@@ -0,0 +1,178 @@
+import time
+from collections import deque
+from threading import Condition
+from threading import Event
+from threading import Thread
+from typing import Dict
+from typing import List
+
+from exceptions import AlertException
+from exceptions import PartialAlertException
+from .interface import IAlert
+
+
+class QueuedAlert(IAlert):
+    """
+    通知メッセージを送信待ちに入れ、バックグラウンドで送信する
+
+    send_message・send_messagesは送信を待たずに戻り、
+    送信用のスレッドが、送信待ちのメッセージをまとめて通知先に送る
+    (通知先がまとめて送信できる場合は、送信回数が少なくなる)
+    送信に失敗した場合は、待ち時間を倍々に延ばして再試行する
+    (一部だけを送信できた場合は、送信できなかったテキストだけを送信し直す)
+    再試行は、通知先のHTTPの再試行とは別に数える
+    (通知先が再試行する場合、送信する回数は両方の回数の積となる)
+
+    flushで送信待ちがなくなるまで待ち、
+    期限までに送信できなかったメッセージを返す
+    """
+    # 続けて送信を依頼されるメッセージを、まとめるために待つ時間(秒)
+    linger = 0.05
+    # 1回の送信でまとめるメッセージ数の上限
+    batch_size = 100
+    # 最初に再試行するまでの待ち時間・待ち時間の上限(秒)
+    retry_interval = 1.0
+    max_retry_interval = 30.0
+
+    def __init__(
+        self,
+        alert: IAlert,
+        retries: int = 3,
+        flush_timeout: float = 30.0
+    ):
+        """
+        Params
+        -------
+        alert: IAlert
+            送信する通知先
+        retries: int
+            送信に失敗した場合に再試行する回数
+            (通知先のHTTPの再試行回数とは別に数える)
+        flush_timeout: float
+            flushで、送信待ちがなくなるまで待つ時間の既定(秒)
+        """
+        self.__alert = alert
+        self.__retries = max(retries, 0)
+        self.__flush_timeout = flush_timeout
+        self.__queue = deque()
+        # 送信中のメッセージ (flushの期限を過ぎた場合は、結果を使わない)
+        self.__sending: List[str] = []
+        # 再試行しても送信できなかったメッセージ
+        self.__undelivered: List[str] = []
+        self.__condition = Condition()
+        self.__closed = Event()
+        # 送信を依頼された・送信した・再試行した・送信できなかったメッセージ数
+        self.__stats = {
+            'alert_queued': 0,
+            'alert_delivered': 0,
+            'alert_retries': 0,
+            'alert_undelivered': 0,
+        }
+        self.__thread = Thread(
+            target=self.__run,
+            name='alert-sender',
+            daemon=True
+        )
+        self.__thread.start()
+
+    def send_message(self, message: str):
+        self.send_messages([message])
+
+    def send_messages(self, messages: List[str]):
+        with self.__condition:
+            if self.__closed.is_set():
+                raise AlertException('通知の送信を終了しています。')
+            self.__queue.extend(messages)
+            self.__stats['alert_queued'] += len(messages)
+            self.__condition.notify_all()
+
+    def flush(self, timeout: float = None) -> List[str]:
+        if timeout is None:
+            timeout = self.__flush_timeout
+        deadline = time.monotonic() + timeout
+        with self.__condition:
+            while self.__queue or self.__sending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__condition.wait(remaining)
+            # 期限までに送信できなかったメッセージは、送信待ちから除いて返す
+            # (送信中のメッセージも、送信できたか分からないため含める)
+            pending = self.__sending + list(self.__queue)
+            self.__stats['alert_undelivered'] += len(pending)
+            undelivered = self.__undelivered + pending
+            self.__sending = []
+            self.__queue.clear()
+            self.__undelivered = []
+            self.__condition.notify_all()
+        return undelivered
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = self.__alert.get_stats()
+        with self.__condition:
+            stats.update(self.__stats)
+            stats['alert_pending'] = len(self.__sending) + len(self.__queue)
+        return stats
+
+    def close(self):
+        """
+        送信用のスレッドを止める
+        (送信待ちのメッセージは送信しない)
+        """
+        with self.__condition:
+            self.__closed.set()
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__queue and not self.__closed.is_set():
+                    self.__condition.wait()
+                if self.__closed.is_set():
+                    return
+            # 続けて依頼されるメッセージも、まとめて送信する
+            self.__closed.wait(self.linger)
+            with self.__condition:
+                size = min(len(self.__queue), self.batch_size)
+                batch = [self.__queue.popleft() for _ in range(size)]
+                self.__sending = batch
+            if not batch:
+                continue
+
+            delivered = self.__deliver(batch)
+            with self.__condition:
+                if self.__sending is batch:
+                    self.__sending = []
+                    if delivered:
+                        self.__stats['alert_delivered'] += size
+                    else:
+                        self.__undelivered.extend(batch)
+                        self.__stats['alert_undelivered'] += len(batch)
+                self.__condition.notify_all()
+
+    def __deliver(self, batch: List[str]) -> bool:
+        interval = self.retry_interval
+        for attempt in range(self.__retries + 1):
+            if attempt:
+                # 終了した・flushの期限を過ぎた場合は、再試行しない
+                if self.__closed.wait(interval) or not self.__is_sending(batch):
+                    return False
+                interval = min(interval * 2, self.max_retry_interval)
+                with self.__condition:
+                    self.__stats['alert_retries'] += 1
+            try:
+                self.__alert.send_messages(list(batch))
+                return True
+            except PartialAlertException as ex:
+                # 送信済みのテキストは送信し直さない
+                # (送信できなかった場合に返すメッセージも、残りのテキストとする)
+                with self.__condition:
+                    batch[:] = ex.undelivered
+            except AlertException:
+                continue
+        return False
+
+    def __is_sending(self, batch: List[str]) -> bool:
+        with self.__condition:
+            return self.__sending is batch
@@ -0,0 +1,75 @@
+"""
+価格の取得1回分(全銘柄)のベンチマーク
+
+模擬サーバ(simulator)を別プロセスで起動し、kabutanの代わりに
+指定された銘柄数の価格を取得する時間を測る
+(同じシードであれば、価格・遅延・エラーは同じになる)
+2回目は、1回目に取得したページの検証情報を使って取得する
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_cycle.py [銘柄数] [同時接続数] [サーバの引数...]
+    例: python benchmarks/bench_cycle.py 10000 8 --latency 0.02 --error-rate 0.01
+"""
+import sys
+import time
+from multiprocessing import Process
+from multiprocessing import Queue
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from price import PriceByKabutan  # noqa: E402
+from session import PooledSession  # noqa: E402
+from simulator.__main__ import make_server  # noqa: E402
+from simulator.__main__ import parse_args  # noqa: E402
+
+
+def serve(args: list, urls: Queue):
+    server = make_server(parse_args(['--port', '0'] + args))
+    urls.put(server.url)
+    server.serve_forever()
+
+
+def run_cycle(price: PriceByKabutan, descriptions: list) -> int:
+    failures = 0
+    for future in price.iter_data(descriptions):
+        if future.exception() is not None:
+            failures += 1
+    return failures
+
+
+def main(count: int, concurrency: int, server_args: list):
+    urls = Queue()
+    server = Process(target=serve, args=(server_args, urls), daemon=True)
+    server.start()
+    try:
+        url = urls.get(timeout=10)
+        session = PooledSession(pool_size=concurrency)
+        price = PriceByKabutan(
+            concurrency=concurrency,
+            session=session,
+            url=url
+        )
+        descriptions = list(range(1000, 1000 + count))
+        for cycle in (1, 2):
+            started = time.perf_counter()
+            failures = run_cycle(price, descriptions)
+            elapsed = time.perf_counter() - started
+            print('cycle {}: {:,} codes  {:.2f} s  {:,.0f} codes/s'
+                  '  failures {:,}'.format(
+                      cycle, count, elapsed, count / elapsed, failures
+                  ))
+        print(', '.join(
+            f'{key}={value}' for key, value in price.get_stats().items()
+        ))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 10000,
+        int(args[1]) if len(args) > 1 else 8,
+        args[2:]
+    )
@@ -0,0 +1,85 @@
+"""
+htmlからの価格の抽出のベンチマーク
+
+保存したkabutanのページについて、ページ全体を解析する抽出と、
+価格の要素の周辺だけを解析する抽出の時間を比べる
+(ページが保存されていない場合は、テスト用のページを使う)
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_extract.py [ページのディレクトリ]
+    python benchmarks/bench_extract.py --fetch 銘柄コード... [ページのディレクトリ]
+        (kabutanからページを取得して保存する)
+"""
+import glob
+import sys
+import timeit
+from decimal import Decimal
+from os import makedirs
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from price import PriceByKabutan  # noqa: E402
+
+base_dir = path.dirname(path.abspath(__file__))
+corpus_dir = path.join(base_dir, 'corpus')
+sample_file = path.join(base_dir, '..', 'tests', 'price', 'kabutan_9024.html')
+
+
+def fetch(descriptions, directory: str):
+    makedirs(directory, exist_ok=True)
+    price = PriceByKabutan()
+    for description in descriptions:
+        file = path.join(directory, f'kabutan_{description}.html')
+        with open(file, 'w', encoding='utf-8') as f:
+            f.write(price.get_html(int(description)))
+        print('saved:', file)
+
+
+def main(directory: str):
+    files = sorted(glob.glob(path.join(directory, '*.html'))) or [sample_file]
+    price = PriceByKabutan()
+    full_total = 0.0
+    fast_total = 0.0
+    for file in files:
+        with open(file, encoding='utf-8') as f:
+            html = f.read()
+        # 抽出結果が一致することを確認
+        full_price = price.extract_price_text_by_soup(html)
+        assert price.extract_price(html) == \
+            Decimal(full_price.replace('円', '').replace(',', ''))
+
+        full_time = timeit.timeit(
+            lambda: price.extract_price_text_by_soup(html),
+            number=5
+        ) / 5
+        fast_time = timeit.timeit(
+            lambda: price.extract_price(html),
+            number=200
+        ) / 200
+        full_total += full_time
+        fast_total += fast_time
+        print('{:24}  {:7,} bytes  price {:>10}  full {:8.2f} ms'
+              '  fast {:6.3f} ms'.format(
+                  path.basename(file),
+                  len(html.encode('utf-8')),
+                  full_price,
+                  full_time * 10 ** 3,
+                  fast_time * 10 ** 3
+              ))
+    print('pages: {}  full {:.2f} ms/page  fast {:.3f} ms/page  x{:.0f}'.format(
+        len(files),
+        full_total / len(files) * 10 ** 3,
+        fast_total / len(files) * 10 ** 3,
+        full_total / fast_total
+    ))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if args and args[0] == '--fetch':
+        codes = [arg for arg in args[1:] if arg.isdigit()]
+        others = [arg for arg in args[1:] if not arg.isdigit()]
+        fetch(codes, others[0] if others else corpus_dir)
+    else:
+        main(args[0] if args else corpus_dir)
@@ -0,0 +1,56 @@
+"""
+価格の履歴の追記・読み込みのベンチマーク
+
+履歴の件数を増やしながら、1件の追記にかかる時間と、
+全期間・直近1割の期間の読み込みにかかる時間を計測する
+(追記は件数によらず一定、読み込みはコピーしないため件数によらず一定となる)
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_history.py [最大件数]
+"""
+import sys
+import tempfile
+import timeit
+from decimal import Decimal
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from history import ColumnarPriceHistory  # noqa: E402
+
+
+def main(max_count: int):
+    with tempfile.TemporaryDirectory() as directory:
+        history = ColumnarPriceHistory(directory)
+        count = 0
+        size = 1000
+        while size <= max_count:
+            for timestamp in range(count, size):
+                history.append(8267, Decimal(2700), timestamp)
+            count = size
+
+            number = 1000
+            append_time = timeit.timeit(
+                lambda: history.append(1333, Decimal(2000), 0),
+                number=number
+            ) / number
+            read_time = timeit.timeit(
+                lambda: history.get_range(8267),
+                number=number
+            ) / number
+            recent_time = timeit.timeit(
+                lambda: history.get_range(8267, start=count * 9 // 10),
+                number=number
+            ) / number
+            print('history: {:9,}  append {:6.1f} us  read all {:6.1f} us'
+                  '  read recent {:6.1f} us'.format(
+                      count,
+                      append_time * 10 ** 6,
+                      read_time * 10 ** 6,
+                      recent_time * 10 ** 6
+                  ))
+            size *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,69 @@
+"""
+トリガー条件判定のベンチマーク
+
+銘柄ごとに判定メソッドを取得して呼び出す従来の方法と、
+一括判定(IDb.get_triggered_descriptions)を比較する
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_judge.py [ルール件数]
+"""
+import random
+import sys
+import tempfile
+import timeit
+from decimal import Decimal
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from db import CsvAsDb  # noqa: E402
+
+
+def make_csv(file: str, count: int):
+    with open(file, 'w') as f:
+        f.write('description,price,trigger\n')
+        for code in range(1000, 1000 + count):
+            f.write('{},{},{}\n'.format(
+                code,
+                random.randint(100, 10000),
+                random.choice(('over', 'under'))
+            ))
+
+
+def judge_by_closure(db: CsvAsDb, prices: dict) -> list:
+    return [
+        code for code, price in prices.items()
+        if db.get_judge_func(code)(price)
+    ]
+
+
+def main(count: int):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        file = path.join(directory, 'alert.csv')
+        make_csv(file, count)
+        CsvAsDb.csv_file = file
+        db = CsvAsDb()
+
+    prices = {
+        code: Decimal(random.randint(100, 10000))
+        for code in db.get_descriptions()
+    }
+    assert judge_by_closure(db, prices) == \
+        db.get_triggered_descriptions(prices)
+
+    repeat = 5
+    closure = min(timeit.repeat(
+        lambda: judge_by_closure(db, prices), number=1, repeat=repeat
+    ))
+    batch = min(timeit.repeat(
+        lambda: db.get_triggered_descriptions(prices), number=1, repeat=repeat
+    ))
+    print('rules: {:,}'.format(count))
+    print('closure: {:8.2f} ms'.format(closure * 1000))
+    print('batch  : {:8.2f} ms'.format(batch * 1000))
+    print('speedup: {:8.1f} x'.format(closure / batch))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
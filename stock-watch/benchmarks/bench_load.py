@@ -0,0 +1,99 @@
+"""
+alert.csvの読み込み方法ごとの起動時間・メモリ使用量のベンチマーク
+
+読み込み方法ごとに別プロセスで、
+モジュールの読み込みからCsvAsDbの生成までの時間(うちCsvAsDbの生成時間)と
+最大RSSを計測する
+('snapshot'は、作成済みのスナップショットから読み込む場合)
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_load.py [ルール件数]
+"""
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from os import path
+
+stock_watch_dir = path.join(path.dirname(path.abspath(__file__)), '..')
+
+# 計測対象のプロセスで実行するスクリプト
+measure_script = '''
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+from db import CsvAsDb
+CsvAsDb.use_snapshot = sys.argv[3] == 'snapshot'
+constructed = time.perf_counter()
+db = CsvAsDb(sys.argv[1], sys.argv[2])
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'elapsed': elapsed,
+    'construct': time.perf_counter() - constructed,
+    'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': 'pandas' in sys.modules,
+    'descriptions': len(db.get_descriptions()),
+}))
+'''
+
+
+def make_csv(file: str, count: int):
+    with open(file, 'w') as f:
+        f.write('description,price,trigger\n')
+        for code in range(1000, 1000 + count):
+            f.write('{},{}.{},{}\n'.format(
+                code,
+                random.randint(100, 10000),
+                random.randint(0, 9),
+                random.choice(('over', 'under'))
+            ))
+
+
+def measure(file: str, loader: str, mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', measure_script, file, loader, mode],
+        cwd=stock_watch_dir,
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main(count: int):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        file = path.join(directory, 'alert.csv')
+        make_csv(file, count)
+
+        print('rules: {:,}'.format(count))
+        for loader, mode in (
+            ('pandas', 'csv'),
+            ('stream', 'csv'),
+            ('stream', 'snapshot'),
+        ):
+            if mode == 'snapshot':
+                # 1回目でスナップショットを作成する
+                measure(file, loader, mode)
+            # 最も速かった回の結果を採用する
+            result = min(
+                (measure(file, loader, mode) for _ in range(3)),
+                key=lambda r: r['elapsed']
+            )
+            print('{:8}: {:8.1f} ms  (CsvAsDb {:7.1f} ms)  '
+                  'maxrss {:7.1f} MB  pandas loaded: {}'
+                  .format(
+                      loader if mode == 'csv' else mode,
+                      result['elapsed'] * 1000,
+                      result['construct'] * 1000,
+                      result['maxrss'] / 1024,
+                      result['modules']
+                  ))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
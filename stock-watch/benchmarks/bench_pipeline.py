@@ -0,0 +1,101 @@
+"""
+受信と解析のパイプラインのベンチマーク
+
+模擬サーバ(simulator)を別プロセスで起動して保存したkabutanのページを返させ、
+解析方法(inline・thread・process)ごとに、指定された銘柄数の価格を取得する時間を測る
+(ページが保存されていない場合は、テスト用のページを使う)
+
+--scan-sizeに小さい値を指定すると、価格の要素の周辺だけの解析が失敗し、
+ページ全体を解析する(CPUに負荷のかかる)場合を測れる
+
+使い方 (stock-watchディレクトリで実行)
+    python benchmarks/bench_pipeline.py [銘柄数] [同時接続数] [--scan-size 文字数]
+        [ページのディレクトリ]
+"""
+import os
+import sys
+import time
+from multiprocessing import Process
+from multiprocessing import Queue
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from price import PriceByKabutan  # noqa: E402
+from session import PooledSession  # noqa: E402
+from simulator.__main__ import load_pages  # noqa: E402
+from simulator.__main__ import make_server  # noqa: E402
+from simulator.__main__ import parse_args  # noqa: E402
+
+base_dir = path.dirname(path.abspath(__file__))
+corpus_dir = path.join(base_dir, 'corpus')
+sample_dir = path.join(base_dir, '..', 'tests', 'price')
+
+
+def serve(directory: str, urls: Queue):
+    server = make_server(parse_args(['--port', '0', '--corpus', directory]))
+    urls.put(server.url)
+    server.serve_forever()
+
+
+def run(url: str, mode: str, count: int, concurrency: int) -> float:
+    price = PriceByKabutan(
+        concurrency=concurrency,
+        session=PooledSession(pool_size=concurrency),
+        url=url,
+        parse_mode=mode
+    )
+    try:
+        # 解析用のプールを起動しておく
+        list(price.iter_data([0]))
+        # 銘柄コードごとに検証情報を持つため、計測では毎回別の銘柄コードとする
+        descriptions = list(range(1, count + 1))
+        started = time.perf_counter()
+        failures = sum(
+            future.exception() is not None
+            for future in price.iter_data(descriptions)
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        price.close()
+    if failures:
+        print(f'  ({mode}: {failures} failures)')
+    return elapsed
+
+
+def main(count: int, concurrency: int, directory: str):
+    if not load_pages(directory):
+        directory = sample_dir
+    urls = Queue()
+    server = Process(target=serve, args=(directory, urls), daemon=True)
+    server.start()
+    try:
+        url = urls.get(timeout=10)
+        print('pages: {}  codes: {:,}  concurrency: {}  cpus: {}'
+              '  scan_size: {}'.format(
+                  len(load_pages(directory)),
+                  count, concurrency, os.cpu_count(),
+                  PriceByKabutan.scan_size
+              ))
+        for mode in PriceByKabutan.parse_modes:
+            elapsed = run(url, mode, count, concurrency)
+            print('{:8}  {:7.2f} s  {:8,.0f} codes/s'.format(
+                mode, elapsed, count / elapsed
+            ))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--scan-size' in args:
+        index = args.index('--scan-size')
+        PriceByKabutan.scan_size = int(args[index + 1])
+        del args[index:index + 2]
+    numbers = [arg for arg in args if arg.isdigit()]
+    others = [arg for arg in args if not arg.isdigit()]
+    main(
+        int(numbers[0]) if len(numbers) > 0 else 1000,
+        int(numbers[1]) if len(numbers) > 1 else 8,
+        others[0] if others else corpus_dir
+    )
@@ -0,0 +1 @@
+from .circuit import CircuitBreaker
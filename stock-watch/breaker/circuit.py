@@ -0,0 +1,141 @@
+import time
+from threading import Event
+from threading import Lock
+from threading import Thread
+from typing import Callable
+from typing import Dict
+
+
+class CircuitBreaker:
+    """
+    取得元・通知先の障害時に、要求を止める(遮断する)
+
+    連続して失敗した回数が閾値に達した場合は遮断し(open)、
+    要求を送らずにすぐ失敗とする
+    遮断中は、確認用の関数(probe)で一定時間ごとに回復を確認し、
+    成功した場合に遮断をやめる(closed)
+    確認用の関数がない場合は、一定時間後に1件だけ要求を通し(half-open)、
+    その結果で遮断をやめるか、遮断を続けるかを決める
+
+    Attributes
+    -------
+    closed: str
+        遮断していない状態
+    open: str
+        遮断している状態
+    half_open: str
+        回復を確認するため、1件だけ要求を通している状態
+    """
+    closed = 'closed'
+    open = 'open'
+    half_open = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        probe: Callable[[], None] = None
+    ):
+        """
+        Params
+        -------
+        failure_threshold: int
+            遮断する、連続して失敗した回数
+        recovery_timeout: float
+            遮断してから回復を確認するまでの時間(秒)
+        probe: Callable[[], None]
+            回復を確認する関数 (失敗した場合は例外発生)
+            (未指定の場合、遮断中の要求で1件だけ確認する)
+        """
+        self.__threshold = max(failure_threshold, 1)
+        self.__recovery_timeout = recovery_timeout
+        self.__probe = probe
+        self.__state = self.closed
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__lock = Lock()
+        self.__stopped = Event()
+        self.__probe_thread: Thread = None
+        # 遮断した回数・遮断中にすぐ失敗とした要求数
+        self.__stats = {'breaker_opened': 0, 'breaker_rejected': 0}
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            return self.__state
+
+    def allow(self) -> bool:
+        """
+        要求を送ってよいかを判定する
+
+        Returns
+        -------
+        0: bool
+            要求を送ってよいか (遮断中の場合はFalse)
+
+        Remarks
+        -------
+        Trueの場合、要求の結果をrecord_success・record_failureで記録する
+
+        """
+        with self.__lock:
+            if self.__state == self.closed:
+                return True
+            if self.__state == self.open and self.__probe is None and \
+                    time.monotonic() - self.__opened_at >= \
+                    self.__recovery_timeout:
+                # この要求で回復を確認する (他の要求は遮断を続ける)
+                self.__state = self.half_open
+                return True
+            self.__stats['breaker_rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.__state = self.closed
+            self.__failures = 0
+
+    def record_failure(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__state == self.half_open or (
+                self.__state == self.closed and
+                self.__failures >= self.__threshold
+            ):
+                self.__open()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return dict(self.__stats)
+
+    def close(self):
+        """
+        回復の確認を止める
+        """
+        self.__stopped.set()
+
+    def __open(self):
+        self.__state = self.open
+        self.__opened_at = time.monotonic()
+        self.__stats['breaker_opened'] += 1
+        if self.__probe is not None and self.__probe_thread is None:
+            self.__probe_thread = Thread(target=self.__run_probe, daemon=True)
+            self.__probe_thread.start()
+
+    def __run_probe(self):
+        # 遮断をやめるまで、一定時間ごとに回復を確認する
+        # (遮断の状態と確認のスレッドは、同じロックの中で更新する)
+        while not self.__stopped.wait(self.__recovery_timeout):
+            with self.__lock:
+                if self.__state != self.open:
+                    self.__probe_thread = None
+                    return
+            try:
+                self.__probe()
+            except Exception:
+                continue
+            with self.__lock:
+                self.__state = self.closed
+                self.__failures = 0
+                self.__probe_thread = None
+                return
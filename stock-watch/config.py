@@ -33,3 +33,260 @@ class Config():
             return self.__parser.get(section, key)
         except configparser.NoOptionError:
             raise ValueError(f'設定ファイルにキーが存在しません。 キー: {key}')
+
+    @property
+    def db_type(self):
+        section = 'DEFAULT'
+        key = 'db'
+        # 未設定の場合はCSVをDBとする
+        return self.__parser.get(section, key, fallback='csv')
+
+    @property
+    def csv_loader(self):
+        section = 'DEFAULT'
+        key = 'csv_loader'
+        # 未設定の場合はpandasで読み込む
+        return self.__parser.get(section, key, fallback='pandas')
+
+    @property
+    def alert_state(self):
+        section = 'DEFAULT'
+        key = 'alert_state'
+        # 未設定の場合は通知状態をSQLiteに保持し、基準を超えた時点でのみ通知する
+        return self.__parser.get(section, key, fallback='sqlite')
+
+    @property
+    def rearm_band(self):
+        section = 'DEFAULT'
+        key = 'rearm_band'
+        # 未設定の場合は基準を下回った(上回った)時点で再通知の対象とする
+        try:
+            return self.__parser.getfloat(section, key, fallback=0.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_history(self):
+        section = 'DEFAULT'
+        key = 'price_history'
+        # 未設定の場合は取得した価格を履歴に保存する
+        try:
+            return self.__parser.getboolean(section, key, fallback=True)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_concurrency(self):
+        section = 'DEFAULT'
+        key = 'price_concurrency'
+        # 未設定の場合は、取得元への負荷を抑えるため1銘柄ずつ取得する
+        try:
+            return self.__parser.getint(section, key, fallback=1)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_parse(self):
+        section = 'DEFAULT'
+        key = 'price_parse'
+        # 未設定の場合は受信したスレッドでそのまま解析する
+        return self.__parser.get(section, key, fallback='inline')
+
+    @property
+    def price_parse_workers(self):
+        section = 'DEFAULT'
+        key = 'price_parse_workers'
+        # 未設定の場合はCPU数分のスレッド・プロセスで解析する
+        try:
+            return self.__parser.getint(section, key, fallback=0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_hedge(self):
+        section = 'DEFAULT'
+        key = 'price_hedge'
+        # 未設定の場合は応答の遅い銘柄を取得し直さない
+        try:
+            return self.__parser.getboolean(section, key, fallback=False)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_hedge_quantile(self):
+        section = 'DEFAULT'
+        key = 'price_hedge_quantile'
+        # 未設定の場合はかかった時間の95%点を過ぎたら取得し直す
+        try:
+            return self.__parser.getfloat(section, key, fallback=0.95)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_pool_size(self):
+        section = 'DEFAULT'
+        key = 'http_pool_size'
+        # 未設定の場合はrequestsの既定と同じ、ホストごとに10接続を保持する
+        try:
+            return self.__parser.getint(section, key, fallback=10)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_retries(self):
+        section = 'DEFAULT'
+        key = 'http_retries'
+        # 未設定の場合は一時的なエラーを3回まで再試行する
+        try:
+            return self.__parser.getint(section, key, fallback=3)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_connect_timeout(self):
+        section = 'DEFAULT'
+        key = 'http_connect_timeout'
+        # 未設定の場合は5秒で接続できなければタイムアウトとする
+        try:
+            return self.__parser.getfloat(section, key, fallback=5.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_read_timeout(self):
+        section = 'DEFAULT'
+        key = 'http_read_timeout'
+        # 未設定の場合は30秒応答がなければタイムアウトとする
+        try:
+            return self.__parser.getfloat(section, key, fallback=30.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_rate(self):
+        section = 'DEFAULT'
+        key = 'http_rate'
+        # 未設定の場合は1秒あたりのリクエスト数を制限しない
+        try:
+            return self.__parser.getfloat(section, key, fallback=0.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def http_latency_target(self):
+        section = 'DEFAULT'
+        key = 'http_latency_target'
+        # 未設定の場合は応答に3秒を超えたら同時に送信するリクエスト数を減らす
+        try:
+            return self.__parser.getfloat(section, key, fallback=3.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def breaker_threshold(self):
+        section = 'DEFAULT'
+        key = 'breaker_threshold'
+        # 未設定の場合は5回続けて失敗したら、取得元・通知先を遮断する
+        try:
+            return self.__parser.getint(section, key, fallback=5)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def breaker_recovery(self):
+        section = 'DEFAULT'
+        key = 'breaker_recovery'
+        # 未設定の場合は遮断してから30秒ごとに回復を確認する
+        try:
+            return self.__parser.getfloat(section, key, fallback=30.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def alert_queue(self):
+        section = 'DEFAULT'
+        key = 'alert_queue'
+        # 未設定の場合は株価チェックの処理の中で、通知を送信する
+        try:
+            return self.__parser.getboolean(section, key, fallback=False)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def alert_retries(self):
+        section = 'DEFAULT'
+        key = 'alert_retries'
+        # 未設定の場合は送信待ちの通知を、送信に失敗してから3回まで再試行する
+        try:
+            return self.__parser.getint(section, key, fallback=3)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def alert_flush_timeout(self):
+        section = 'DEFAULT'
+        key = 'alert_flush_timeout'
+        # 未設定の場合は終了時に、送信待ちの通知を30秒まで待つ
+        try:
+            return self.__parser.getfloat(section, key, fallback=30.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_cache(self):
+        section = 'DEFAULT'
+        key = 'price_cache'
+        # 未設定の場合は取得した価格をSQLiteに保持し、次回の起動でも使う
+        return self.__parser.get(section, key, fallback='sqlite')
+
+    @property
+    def price_cache_ttl(self):
+        section = 'DEFAULT'
+        key = 'price_cache_ttl'
+        # 未設定の場合は取引時間中の価格はキャッシュせず、毎回取得する
+        try:
+            return self.__parser.getfloat(section, key, fallback=0.0)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_cache_size(self):
+        section = 'DEFAULT'
+        key = 'price_cache_size'
+        # 未設定の場合は10000銘柄までキャッシュする
+        try:
+            return self.__parser.getint(section, key, fallback=10000)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_cache_memory(self):
+        section = 'DEFAULT'
+        key = 'price_cache_memory'
+        # 未設定の場合はメモリ使用量4MBまでキャッシュする (単位: KB)
+        try:
+            return self.__parser.getint(section, key, fallback=4096)
+        except ValueError:
+            raise ValueError(f'設定ファイルの値が不正です。 キー: {key}')
+
+    @property
+    def price_url(self):
+        section = 'DEFAULT'
+        key = 'price_url'
+        # 未設定の場合はkabutanの銘柄ページから価格を取得する
+        return self.__parser.get(section, key, fallback='')
+
+    @property
+    def price_list_urls(self):
+        section = 'DEFAULT'
+        key = 'price_list_urls'
+        # 未設定の場合は一覧ページを使わず、1銘柄ずつ取得する
+        # (複数のURLは改行・空白で区切る)
+        return self.__parser.get(section, key, fallback='').split()
+
+    @property
+    def market_calendar(self):
+        section = 'DEFAULT'
+        key = 'market_calendar'
+        # 未設定の場合は東京証券取引所の取引時間に合わせて株価チェックを行う
+        return self.__parser.get(section, key, fallback='tse')
@@ -1,2 +1,3 @@
 from .interface import IDb
 from .csv import CsvAsDb
+from .sqlite import SqliteDb
@@ -1,93 +1,321 @@
+import os
+from itertools import chain
+from threading import Event
+from threading import Lock
+from threading import Thread
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import NamedTuple
+from typing import Set
 from typing import Tuple
 from typing import Callable
 from decimal import Decimal
 
-import pandas as pd
-
 from exceptions import DbException
+from log import ILogger
+from log import FileLogger
 from .interface import IDb
+from .loader import LoadResult
+from .loader import loaders
+from .rule import Rule
+from .rule import RuleColumns
+from .rule import group_descriptions
+from .rule import make_alert_message
+from .index import RuleIndex
+from .snapshot import hash_file
+from .snapshot import read_snapshot
+from .snapshot import write_snapshot
+
+
+class RuleSet(NamedTuple):
+    """
+    読み込んだルール一式
+    (読み込み直した場合は、一度の代入でまとめて入れ替える)
+    """
+    descriptions: List[int]
+    rules: RuleColumns
+    # ルールの索引 (読み込み直した場合は、新たに作成したものに入れ替える)
+    index: RuleIndex
+    invalid_descriptions: Set[int]
+    error_report: List[str]
+    # 銘柄コードをキーとした指標によるルール
+    indicator_rules: Dict[int, List[Rule]]
 
 
 class CsvAsDb(IDb):
     csv_file = '../config/alert.csv'
+    # CSVの読み込み方法 ('pandas' or 'stream')
+    loader = 'pandas'
+    # 検証済みのルールをCSVと同じ場所にスナップショットとして保存し、
+    # CSVの内容が変わるまでは読み込み・検証を行わずに使う
+    use_snapshot = True
 
-    def __init__(self):
-        self.__df = pd.read_csv(self.csv_file)
+    def __init__(self, csv_file: str = None, loader: str = None):
+        self.__csv_file = csv_file or self.csv_file
+        loader = loader or self.loader
+        if loader not in loaders:
+            raise DbException(f'CSVの読み込み方法が不正です。 読み込み方法: {loader}')
+        self.__load = loaders[loader]
+        self.__stat = self.__get_stat()
+        self.__hash = hash_file(self.__csv_file)
+        self.__rule_set = \
+            self.__make_rule_set(*self.__load_with_snapshot(self.__hash))
+        self.__reload_lock = Lock()
+        self.__stop_watching = None
 
     def get_descriptions(self) -> List[int]:
-        description_list = list(self.__df['description'])
-        # 重複をとる
-        return list(dict.fromkeys(description_list))
+        return list(self.__rule_set.descriptions)
 
     def get_description_groups(self) -> List[List[int]]:
-        over_group = []
-        under_group = []
+        # 不正データの銘柄は監視対象外
+        # (内容はget_error_reportで起動時にまとめて通知される)
+        return group_descriptions(self.get_all_rules())
 
-        for description in self.get_descriptions():
-            try:
-                price, trigger = self.__get_price_trigger_from_db(description)
-                print(description, trigger)
-            except DbException:
-                # TODO: エラー制御が良くない ファイル不正の場合の挙動がアプリケーションを通して一貫していない
-                # MEMO: そもそもファイル不正のチェックは__init__でやるべきかも
-                continue
-
-            if trigger == 'over':
-                over_group.append(description)
-            else:
-                under_group.append(description)
-        return [over_group, under_group]
+    def get_all_rules(self) -> List[Rule]:
+        rule_set = self.__rule_set
+        return list(chain(
+            rule_set.rules,
+            chain.from_iterable(rule_set.indicator_rules.values())
+        ))
 
     def get_judge_func(self, description: int) -> Callable[[int], bool]:
-        price, trigger = self.__get_price_trigger_from_db(description)
+        self.__get_rules_from_db(description)
+        index = self.__rule_set.index
 
         def judge_func(now_price):
-            if trigger == 'over':
-                return (now_price - price) >= 0
-            else:
-                return (price - now_price) >= 0
+            return len(index.get_crossed(description, now_price)) > 0
         return judge_func
 
-    def make_alert_message(self, description: int) -> str:
-        price, trigger = self.__get_price_trigger_from_db(description)
-        message = '銘柄コード: {} が 価格: {:,.1f} 円を{}'.format(
-            description,
-            price,
-            '下回りました。' if trigger == 'under' else '上回りました。'
-        )
-        return message
+    def make_alert_message(
+        self,
+        description: int,
+        price: Decimal,
+        rules: List[Rule] = None
+    ) -> str:
+        rules = rules or \
+            self.__rule_set.index.get_crossed(description, price) or \
+            self.__get_rules_from_db(description)
+        return make_alert_message(description, rules)
 
     def make_fail_message(self, description: int) -> str:
         return '銘柄コード: {}のDB登録取得が失敗しました。'.format(description)
 
-    def __get_price_trigger_from_db(
+    def get_triggered_descriptions(
         self,
-        description: int
-    ) -> Tuple[Decimal, str]:
-        # DBから指定銘柄についてのレコードを取得
-        records = self.__df[self.__df['description'] == description]
-        ex_message_not_exist = 'DBにデータが存在しません。 銘柄コード: {}'.format(description)
-        ex_message_invalid = 'DBデータが不正です。 銘柄コード: {}'.format(description)
-
-        if len(records) == 0:
-            # 指定銘柄のデータがない場合
-            raise DbException(ex_message_not_exist)
-        if len(records) > 1:
-            # 指定銘柄のデータが複数行
-            raise DbException(ex_message_invalid)
-
-        # DBデータからfunctionを作成
-        record = records.iloc[0]
-        trigger = record.trigger
-        price = record.price
-
-        # DB設定値のチェック
-        if trigger not in ('under', 'over'):
-            # トリガー条件が想定外の場合
-            raise DbException(ex_message_invalid)
-        if not str(price).isdigit():
-            # 価格に数値以外が設定されている場合
-            raise DbException(ex_message_invalid)
-
-        return Decimal(float(price)), trigger
+        prices: Dict[int, Decimal]
+    ) -> List[int]:
+        return self.__rule_set.index.judge(prices)
+
+    def get_crossed_rules(
+        self,
+        prices: Dict[int, Decimal]
+    ) -> Dict[int, List[Rule]]:
+        index = self.__rule_set.index
+        crossed = {
+            description: index.get_crossed(description, price)
+            for description, price in prices.items()
+        }
+        return {
+            description: rules
+            for description, rules in crossed.items() if rules
+        }
+
+    def get_indicator_rules(
+        self,
+        descriptions: List[int]
+    ) -> Dict[int, List[Rule]]:
+        indicator_rules = self.__rule_set.indicator_rules
+        return {
+            description: indicator_rules[description]
+            for description in descriptions if description in indicator_rules
+        }
+
+    def get_error_report(self) -> str:
+        return '\n'.join(self.__rule_set.error_report)
+
+    def get_rules(self) -> List[Rule]:
+        """
+        検証済みのルールをCSVの記載順に取得する
+
+        Returns
+        -------
+        0: List[Rule]
+            検証済みのルールのリスト
+        """
+        return list(self.__rule_set.rules)
+
+    def get_error_lines(self) -> List[str]:
+        """
+        不正な行ごとのエラー内容を取得する
+
+        Returns
+        -------
+        0: List[str]
+            エラー内容のリスト
+        """
+        return list(self.__rule_set.error_report)
+
+    def reload_if_changed(self) -> bool:
+        """
+        CSVファイルの更新日時・サイズが変わっていれば読み込み直し、
+        ルール一式を索引ごと入れ替える
+
+        Returns
+        -------
+        0: bool
+            読み込み直した場合True
+
+        Remarks
+        -------
+        読み込み直したCSVの項目が不正な場合は、変更前のルールを維持し、
+        その内容をエラーレポートに追加する
+        """
+        with self.__reload_lock:
+            stat = self.__get_stat()
+            if stat == self.__stat:
+                return False
+            # 読み込み中にさらに更新された場合は、次回の確認で読み込み直す
+            self.__stat = stat
+            csv_hash = hash_file(self.__csv_file)
+            if csv_hash == self.__hash:
+                # 更新日時のみ変わり、内容が同じ場合
+                return False
+
+            try:
+                loaded, index = self.__load_with_snapshot(csv_hash)
+            except DbException as ex:
+                self.__rule_set = self.__rule_set._replace(
+                    error_report=self.__rule_set.error_report + [str(ex)]
+                )
+                return False
+
+            # 株価チェック中の参照で、新旧のルール・索引が混ざらないように、
+            # 一度の代入で入れ替える
+            self.__rule_set = self.__make_rule_set(loaded, index)
+            self.__hash = csv_hash
+            return True
+
+    def start_watching(self, interval: float, logger: ILogger = None):
+        """
+        CSVファイルの変更をバックグラウンドで定期的に確認し、反映する
+
+        Params
+        -------
+        interval: float
+            確認間隔(秒)
+        logger: ILogger
+            読み込み直せなかった場合のログの出力先
+            (未指定の場合、ファイルに出力する)
+
+        Remarks
+        -------
+        ライブラリとして、常駐するプロセスから使う
+        (main.pyは1回の株価チェックで終了するため、確認を開始しない)
+        """
+        if self.__stop_watching is not None:
+            return
+        stop_watching = Event()
+        logger = logger or FileLogger()
+
+        def watch():
+            while not stop_watching.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as ex:
+                    # 保存の途中のファイル(置き換え中・書き込み途中)を読んだ場合も、
+                    # 変更前のルールを維持して確認を続ける
+                    logger.exception(ex)
+
+        Thread(target=watch, name='csv-watcher', daemon=True).start()
+        self.__stop_watching = stop_watching
+
+    def stop_watching(self):
+        """
+        CSVファイルの変更の確認を停止する
+        """
+        if self.__stop_watching is not None:
+            self.__stop_watching.set()
+            self.__stop_watching = None
+
+    def get_snapshot_file(self) -> str:
+        """
+        スナップショットのファイルを取得する
+
+        Returns
+        -------
+        0: str
+            CSVファイルと同じ場所の、拡張子に.snapshotを加えたファイル
+        """
+        return self.__csv_file + '.snapshot'
+
+    def __load_with_snapshot(
+        self,
+        csv_hash: bytes
+    ) -> Tuple[LoadResult, RuleIndex]:
+        # CSVの内容と一致するスナップショットがあればそれを使い、
+        # なければCSVを読み込んでスナップショットを作成する
+        if self.use_snapshot:
+            loaded = read_snapshot(self.get_snapshot_file(), csv_hash)
+            if loaded is not None:
+                return loaded
+
+        result = self.__load(self.__csv_file)
+        index = RuleIndex(result.rules)
+        if self.use_snapshot:
+            try:
+                write_snapshot(
+                    self.get_snapshot_file(),
+                    csv_hash,
+                    result,
+                    index
+                )
+            except OSError:
+                # 保存できない場合は、次回もCSVを読み込む
+                pass
+        return result, index
+
+    def __get_stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.__csv_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def __make_rule_set(
+        self,
+        loaded: LoadResult,
+        index: RuleIndex
+    ) -> RuleSet:
+        return RuleSet(
+            loaded.descriptions,
+            loaded.rules,
+            index,
+            loaded.invalid_descriptions,
+            loaded.error_report,
+            self.__group_by_description(loaded.indicator_rules)
+        )
+
+    @staticmethod
+    def __group_by_description(
+        rules: Iterable[Rule]
+    ) -> Dict[int, List[Rule]]:
+        grouped: Dict[int, List[Rule]] = {}
+        for rule in rules:
+            grouped.setdefault(rule.description, []).append(rule)
+        return grouped
+
+    def __get_rules_from_db(self, description: int) -> List[Rule]:
+        # コンパイル済みのルールから指定銘柄のレコードを取得
+        rule_set = self.__rule_set
+        rules = rule_set.index.get(description) or \
+            rule_set.indicator_rules.get(description)
+        if rules:
+            return rules
+
+        if description in rule_set.invalid_descriptions:
+            # 指定銘柄のデータが不正な場合
+            raise DbException(
+                'DBデータが不正です。 銘柄コード: {}'.format(description)
+            )
+        # 指定銘柄のデータがない場合
+        raise DbException(
+            'DBにデータが存在しません。 銘柄コード: {}'.format(description)
+        )
@@ -0,0 +1,266 @@
+from decimal import Decimal
+from threading import Lock
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+from .rule import Rule
+from .rule import RuleColumns
+from .rule import to_decimal
+from .rule import triggers
+
+
+class RuleIndex:
+    """
+    検証済みのルールを銘柄コードで引けるように保持する
+
+    ルールは (銘柄コード, トリガー方向, 基準価格) の順に並べた列で保持し、
+    銘柄の範囲とその中の基準価格を二分探索して、価格を超えた基準を求める
+
+    一括判定用に、銘柄コード順に並べた
+    銘柄コード・以上の最小基準価格・以下の最大基準価格の配列も合わせて保持する
+    (いずれかを超えていれば、その銘柄は発火している)
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        columns = rules if isinstance(rules, RuleColumns) \
+            else RuleColumns(rules)
+        rule_arrays = self.__sort(
+            np.frombuffer(columns.descriptions, dtype=np.int64),
+            np.frombuffer(columns.directions, dtype=np.int8),
+            np.frombuffer(columns.prices, dtype=np.float64)
+        )
+        # 判定中の参照と更新が競合しないよう、配列は組で差し替える
+        self.__arrays = rule_arrays + self.__summarize(*rule_arrays)
+        self.__update_lock = Lock()
+
+    @classmethod
+    def from_arrays(cls, arrays: Tuple[np.ndarray, ...]) -> 'RuleIndex':
+        """
+        get_arraysで取得した配列から、並べ替えを行わずに索引を作成する
+
+        Params
+        -------
+        arrays: Tuple[np.ndarray, ...]
+            get_arraysで取得した配列 (読み取り専用でもよい)
+
+        Returns
+        -------
+        0: RuleIndex
+            配列をコピーせずに参照する索引
+        """
+        index = cls(())
+        index.__arrays = tuple(arrays)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.__arrays[3])
+
+    def get_arrays(self) -> Tuple[np.ndarray, ...]:
+        """
+        索引を構成する配列を取得する
+
+        Returns
+        -------
+        0: Tuple[np.ndarray, ...]
+            並べ替え済みのルールの 銘柄コード・トリガー方向・基準価格 と、
+            銘柄ごとの 銘柄コード・以上の最小基準価格・以下の最大基準価格
+        """
+        return self.__arrays
+
+    def get_descriptions(self) -> List[int]:
+        """
+        ルールを持つ銘柄コードを取得する
+
+        Returns
+        -------
+        0: List[int]
+            銘柄コードのリスト (昇順)
+        """
+        return self.__arrays[3].tolist()
+
+    def get(self, description: int) -> List[Rule]:
+        """
+        指定銘柄のルールを取得する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+
+        Returns
+        -------
+        0: List[Rule]
+            ルールのリスト (存在しない場合は空のリスト)
+        """
+        rule_codes, rule_directions, rule_prices = self.__arrays[:3]
+        start, end = self.__get_range(rule_codes, description)
+        return [
+            Rule(description, to_decimal(price), triggers[direction])
+            for direction, price in zip(
+                rule_directions[start:end].tolist(),
+                rule_prices[start:end].tolist()
+            )
+        ]
+
+    def get_crossed(self, description: int, price: Decimal) -> List[Rule]:
+        """
+        指定銘柄のルールのうち、価格が超えた基準を取得する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+        price: Decimal
+            現在価格
+
+        Returns
+        -------
+        0: List[Rule]
+            価格が超えた基準のルールのリスト
+        """
+        rule_codes, rule_directions, rule_prices = self.__arrays[:3]
+        start, end = self.__get_range(rule_codes, description)
+        # 銘柄の範囲内は 以下(-1)・以上(1) の順に、基準価格の昇順で並ぶ
+        middle = start + int(np.searchsorted(rule_directions[start:end], 0))
+        under = rule_prices[start:middle]
+        over = rule_prices[middle:end]
+
+        # 以上: 価格以下の基準すべて / 以下: 価格以上の基準すべて
+        now_price = float(price)
+        crossed_over = over[:np.searchsorted(over, now_price, 'right')]
+        crossed_under = under[np.searchsorted(under, now_price, 'left'):]
+        return \
+            [
+                Rule(description, to_decimal(p), 'over')
+                for p in crossed_over.tolist()
+            ] + \
+            [
+                Rule(description, to_decimal(p), 'under')
+                for p in crossed_under.tolist()
+            ]
+
+    def judge(self, prices: Dict[int, Decimal]) -> List[int]:
+        """
+        複数銘柄の価格について、トリガー条件を一括で判定する
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした現在価格
+
+        Returns
+        -------
+        0: List[int]
+            トリガー条件を満たした銘柄コードのリスト
+            (pricesの順序を保つ、ルールのない銘柄は含まない)
+        """
+        rule_codes, over_min, under_max = self.__arrays[3:]
+        if not prices or not len(rule_codes):
+            return []
+
+        codes = np.fromiter(prices.keys(), dtype=np.int64, count=len(prices))
+        now_prices = np.fromiter(
+            map(float, prices.values()),
+            dtype=np.float64,
+            count=len(prices)
+        )
+
+        # 銘柄コード順の配列を二分探索して、対応するルールの位置を求める
+        positions = np.searchsorted(rule_codes, codes)
+        positions[positions == len(rule_codes)] = 0
+        exists = rule_codes[positions] == codes
+
+        triggered = exists & (
+            (now_prices >= over_min[positions]) |
+            (now_prices <= under_max[positions])
+        )
+        return codes[triggered].tolist()
+
+    def update(self, changes: Dict[int, List[Rule]]):
+        """
+        変更のあった銘柄のルールだけを差し替える
+
+        判定中の呼び出し元は更新前・更新後のいずれかの状態を参照し、
+        更新を待たされることはない
+
+        Params
+        -------
+        changes: Dict[int, List[Rule]]
+            銘柄コードをキーとした新しいルール
+            (空のリストの場合はその銘柄のルールを削除する)
+        """
+        with self.__update_lock:
+            changed = np.array(list(changes), dtype=np.int64)
+            new_columns = RuleColumns(
+                rule for code_rules in changes.values() for rule in code_rules
+            )
+            new_rules = self.__sort(
+                np.frombuffer(new_columns.descriptions, dtype=np.int64),
+                np.frombuffer(new_columns.directions, dtype=np.int8),
+                np.frombuffer(new_columns.prices, dtype=np.float64)
+            )
+            new_summary = self.__summarize(*new_rules)
+
+            # 変更のあった銘柄の行を除き、新しい行を銘柄の位置に挿入する
+            rules = self.__replace(self.__arrays[:3], changed, new_rules)
+            summary = self.__replace(self.__arrays[3:], changed, new_summary)
+            self.__arrays = rules + summary
+
+    @staticmethod
+    def __get_range(rule_codes: np.ndarray, description: int):
+        return (
+            int(np.searchsorted(rule_codes, description, 'left')),
+            int(np.searchsorted(rule_codes, description, 'right')),
+        )
+
+    @staticmethod
+    def __sort(
+        codes: np.ndarray,
+        directions: np.ndarray,
+        prices: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        # (銘柄コード, トリガー方向, 基準価格) の順に並べる
+        order = np.lexsort((prices, directions, codes))
+        return codes[order], directions[order], prices[order]
+
+    @staticmethod
+    def __summarize(
+        codes: np.ndarray,
+        directions: np.ndarray,
+        prices: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        # 銘柄ごとの 以上の最小基準価格・以下の最大基準価格 を求める
+        if not len(codes):
+            return (
+                np.empty(0, np.int64),
+                np.empty(0, np.float64),
+                np.empty(0, np.float64),
+            )
+        unique_codes, starts = np.unique(codes, return_index=True)
+        over_prices = np.where(directions == 1, prices, np.inf)
+        under_prices = np.where(directions == -1, prices, -np.inf)
+        return (
+            unique_codes,
+            np.minimum.reduceat(over_prices, starts),
+            np.maximum.reduceat(under_prices, starts),
+        )
+
+    @staticmethod
+    def __replace(
+        arrays: Tuple[np.ndarray, ...],
+        changed: np.ndarray,
+        new_arrays: Tuple[np.ndarray, ...]
+    ) -> Tuple[np.ndarray, ...]:
+        # 先頭の配列(銘柄コード)が変更対象の行を除き、
+        # 銘柄コード順を保つ位置に新しい行を挿入する
+        keep = ~np.isin(arrays[0], changed)
+        kept = [array[keep] for array in arrays]
+        positions = np.searchsorted(kept[0], new_arrays[0])
+        return tuple(
+            np.insert(array, positions, new_array)
+            for array, new_array in zip(kept, new_arrays)
+        )
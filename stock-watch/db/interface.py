@@ -1,9 +1,12 @@
 from abc import ABCMeta
 from abc import abstractmethod
 from decimal import Decimal
+from typing import Dict
 from typing import List
 from typing import Callable
 
+from .rule import Rule
+
 
 class IDb(metaclass=ABCMeta):
     @abstractmethod
@@ -29,6 +32,20 @@ class IDb(metaclass=ABCMeta):
         0: List[List[int]]
             銘柄グループのリスト
             各銘柄グループは銘柄コードのリストを持つ
+            (各銘柄はいずれか1つのグループに属する)
+        """
+        pass
+
+    @abstractmethod
+    def get_all_rules(self) -> List[Rule]:
+        """
+        監視対象の全てのルールを取得する
+
+        Returns
+        -------
+        0: List[Rule]
+            ルールのリスト
+            (指標によるルールを含む、不正データの銘柄のルールは含まない)
         """
         pass
 
@@ -53,7 +70,75 @@ class IDb(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def make_alert_message(self, description: int) -> str:
+    def get_triggered_descriptions(
+        self,
+        prices: Dict[int, Decimal]
+    ) -> List[int]:
+        """
+        複数銘柄の価格について、トリガー条件を一括で判定する
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした現在価格
+
+        Returns
+        -------
+        0: List[int]
+            トリガー条件を満たした銘柄コードのリスト
+            (pricesの順序を保つ)
+        """
+        pass
+
+    @abstractmethod
+    def get_crossed_rules(
+        self,
+        prices: Dict[int, Decimal]
+    ) -> Dict[int, List[Rule]]:
+        """
+        複数銘柄の価格について、価格が超えた基準のルールを一括で取得する
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした現在価格
+
+        Returns
+        -------
+        0: Dict[int, List[Rule]]
+            銘柄コードをキーとした、価格が超えた基準のルール
+            (pricesの順序を保つ、超えた基準のない銘柄は含まない)
+        """
+        pass
+
+    @abstractmethod
+    def get_indicator_rules(
+        self,
+        descriptions: List[int]
+    ) -> Dict[int, List[Rule]]:
+        """
+        複数銘柄の、指標によるルールを一括で取得する
+
+        Params
+        -------
+        descriptions: List[int]
+            銘柄コードのリスト
+
+        Returns
+        -------
+        0: Dict[int, List[Rule]]
+            銘柄コードをキーとした、指標によるルール
+            (指標によるルールのない銘柄は含まない)
+        """
+        pass
+
+    @abstractmethod
+    def make_alert_message(
+        self,
+        description: int,
+        price: Decimal,
+        rules: List[Rule] = None
+    ) -> str:
         """
         お知らせメッセージを作成する
 
@@ -61,6 +146,12 @@ class IDb(metaclass=ABCMeta):
         -------
         description: int
             銘柄コード
+        price: Decimal
+            現在価格
+            (価格が超えたすべての基準価格をメッセージに含める)
+        rules: List[Rule]
+            お知らせ対象のルール
+            (指定した場合は、価格によらずこのルールをメッセージに含める)
 
         Returns
         -------
@@ -85,3 +176,16 @@ class IDb(metaclass=ABCMeta):
             作成した失敗メッセージ
         """
         pass
+
+    @abstractmethod
+    def get_error_report(self) -> str:
+        """
+        DBデータの検証エラーをまとめたレポートを取得する
+
+        Returns
+        -------
+        0: str
+            検証エラーの内容(1行1エラー)
+            エラーがない場合は空文字列
+        """
+        pass
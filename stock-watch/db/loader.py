@@ -0,0 +1,264 @@
+import csv
+from array import array
+from typing import List
+from typing import NamedTuple
+from typing import Set
+
+from decimal import Decimal
+
+from exceptions import DbException
+from .rule import Rule
+from .rule import RuleColumns
+from .rule import directions
+from .rule import indicator_triggers
+from .rule import window_triggers
+
+columns = ('description', 'price', 'trigger')
+
+
+class LoadResult(NamedTuple):
+    """
+    alert.csvを検証・変換した結果
+
+    Attributes
+    -------
+    descriptions: array
+        銘柄コード(重複なし、CSVの記載順)
+    rules: RuleColumns
+        検証済みのルール(CSVの記載順、全く同じ内容の行は1つにまとめる)
+    invalid_descriptions: Set[int]
+        不正なデータを持つ銘柄コード
+    error_report: List[str]
+        不正な行ごとのエラー内容
+    indicator_rules: List[Rule]
+        検証済みの指標によるルール(CSVの記載順、全く同じ内容の行は1つにまとめる)
+    """
+    descriptions: array
+    rules: RuleColumns
+    invalid_descriptions: Set[int]
+    error_report: List[str]
+    indicator_rules: List[Rule]
+
+
+def check_columns(header: List[str]):
+    missing_columns = [c for c in columns if c not in header]
+    if missing_columns:
+        raise DbException(
+            'DBファイルに項目が存在しません。 項目: {}'.format(
+                ', '.join(missing_columns)
+            )
+        )
+
+
+def make_error_line(number: int, description: str, reasons: List[str]):
+    return 'DBデータが不正です。 {}件目 銘柄コード: {} ({})'.format(
+        number,
+        description,
+        ', '.join(reasons)
+    )
+
+
+def load_by_pandas(csv_file: str) -> LoadResult:
+    """
+    pandasでCSVを読み込み、列単位でまとめて検証する
+
+    Params
+    -------
+    csv_file: str
+        alert.csv形式のファイル
+
+    Returns
+    -------
+    0: LoadResult
+        検証・変換した結果
+    """
+    # pandasの読み込みは時間がかかるため、このローダーを使う場合のみ行う
+    import pandas as pd
+
+    df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+    check_columns(list(df.columns))
+
+    description = df['description'].str.strip()
+    price = df['price'].str.strip()
+    trigger = df['trigger'].str.strip()
+
+    # 各項目のチェックを列単位でまとめて行う
+    valid_description = description.str.fullmatch(r'\d+')
+    valid_price = price.str.fullmatch(r'\d+(\.\d+)?')
+    threshold = trigger.isin(directions)
+    indicator = trigger.isin(indicator_triggers)
+    valid_trigger = threshold | indicator
+    # 期間を指定する指標は、2以上の整数のみ
+    period = pd.to_numeric(price.where(price.str.fullmatch(r'\d+'), '0'))
+    valid_price &= ~trigger.isin(window_triggers) | (period >= 2)
+
+    valid = valid_description & valid_price & valid_trigger
+    # 1行でも不正な行がある銘柄は、銘柄ごと不正とする
+    invalid = description[~valid & valid_description].astype(int)
+    valid &= ~description.isin(description[~valid])
+
+    descriptions = array(
+        'q',
+        dict.fromkeys(description[valid_description].astype(int))
+    )
+    # 同じ銘柄に複数のルール(基準価格)を設定できる
+    # 全く同じ内容の行は1つにまとめる
+    rules = RuleColumns()
+    threshold &= valid
+    for code, p, t in dict.fromkeys(zip(
+        description[threshold].astype(int),
+        price[threshold].astype(float),
+        trigger[threshold]
+    )):
+        rules.append(code, p, t)
+    indicator &= valid
+    indicator_rules = list(dict.fromkeys(
+        Rule(code, Decimal(p), t)
+        for code, p, t in zip(
+            description[indicator].astype(int),
+            price[indicator],
+            trigger[indicator]
+        )
+    ))
+
+    # 不正な行は理由とともにまとめて1つのレポートにする
+    reasons = pd.DataFrame({
+        '銘柄コード不正': ~valid_description,
+        '価格不正': ~valid_price,
+        'トリガー不正': ~valid_trigger,
+    })
+    error_report = [
+        make_error_line(
+            index + 1,
+            description[index],
+            list(reasons.columns[reasons.loc[index]])
+        )
+        for index in df.index[reasons.any(axis=1)]
+    ]
+    return LoadResult(
+        descriptions,
+        rules,
+        set(invalid),
+        error_report,
+        indicator_rules
+    )
+
+
+def is_description(description: str) -> bool:
+    # load_by_pandasの正規表現 \d+ と同じ判定
+    return description.isdecimal()
+
+
+def is_price(price: str) -> bool:
+    # load_by_pandasの正規表現 \d+(\.\d+)? と同じ判定
+    # (整数部と、あれば小数部がともに数字のみ)
+    integer, point, fraction = price.partition('.')
+    return integer.isdecimal() and (not point or fraction.isdecimal())
+
+
+def is_indicator_price(trigger: str, price: str) -> bool:
+    # 期間を指定する指標は、2以上の整数のみ
+    if trigger in window_triggers:
+        return price.isdecimal() and int(price) >= 2
+    return is_price(price)
+
+
+def load_by_stream(csv_file: str) -> LoadResult:
+    """
+    標準ライブラリのcsvでCSVを1行ずつ読み込み、検証する
+    (pandasを読み込まないため、起動が速くメモリ使用量が少ない)
+
+    Params
+    -------
+    csv_file: str
+        alert.csv形式のファイル
+
+    Returns
+    -------
+    0: LoadResult
+        検証・変換した結果
+    """
+    descriptions = {}
+    rules = RuleColumns()
+    indicator_rules = {}
+    seen = set()
+    invalid_descriptions = set()
+    error_report = []
+
+    append_description = rules.descriptions.append
+    append_price = rules.prices.append
+    append_direction = rules.directions.append
+
+    with open(csv_file, newline='', encoding='utf_8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        check_columns(header)
+        description_column, price_column, trigger_column = \
+            (header.index(c) for c in columns)
+
+        number = 0
+        for row in reader:
+            if not row:
+                # 空行は読み飛ばす
+                continue
+            number += 1
+            if len(row) < len(header):
+                row += [''] * (len(header) - len(row))
+            description = row[description_column].strip()
+            price = row[price_column].strip()
+            trigger = row[trigger_column].strip()
+
+            if is_description(description):
+                code = int(description)
+                descriptions[code] = None
+                if trigger in directions and is_price(price):
+                    key = (code, float(price), trigger)
+                    if key not in seen:
+                        # 全く同じ内容の行は1つにまとめる
+                        seen.add(key)
+                        append_description(code)
+                        append_price(key[1])
+                        append_direction(directions[trigger])
+                    continue
+                if trigger in indicator_triggers and \
+                        is_indicator_price(trigger, price):
+                    # 全く同じ内容の行は1つにまとめる
+                    indicator_rules[Rule(code, Decimal(price), trigger)] = None
+                    continue
+                invalid_descriptions.add(code)
+
+            reasons = []
+            if not is_description(description):
+                reasons.append('銘柄コード不正')
+            if trigger in indicator_triggers:
+                if not is_indicator_price(trigger, price):
+                    reasons.append('価格不正')
+            elif not is_price(price):
+                reasons.append('価格不正')
+            if trigger not in directions and \
+                    trigger not in indicator_triggers:
+                reasons.append('トリガー不正')
+            error_report.append(make_error_line(number, description, reasons))
+
+    if invalid_descriptions:
+        # 1行でも不正な行がある銘柄は、銘柄ごと不正とする
+        rules = RuleColumns(
+            rule for rule in rules
+            if rule.description not in invalid_descriptions
+        )
+    return LoadResult(
+        array('q', descriptions),
+        rules,
+        invalid_descriptions,
+        error_report,
+        [
+            rule for rule in indicator_rules
+            if rule.description not in invalid_descriptions
+        ]
+    )
+
+
+loaders = {
+    'pandas': load_by_pandas,
+    'stream': load_by_stream,
+}
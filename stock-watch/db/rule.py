@@ -0,0 +1,179 @@
+from array import array
+from decimal import Decimal
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Set
+
+
+class Rule(NamedTuple):
+    """
+    検証済みのアラート設定1件
+
+    Attributes
+    -------
+    description: int
+        銘柄コード
+    price: Decimal
+        アラート基準価格
+    trigger: str
+        トリガー条件 ('over' or 'under')
+    """
+    description: int
+    price: Decimal
+    trigger: str
+
+
+# トリガー条件と、列で保持する際のトリガー方向の対応
+# (価格差にかけて0以上なら発火)
+directions = {'over': 1, 'under': -1}
+triggers = {direction: trigger for trigger, direction in directions.items()}
+
+# 指標によるトリガー条件
+# (基準価格の項目には、指標のパラメータを指定する)
+# 前日終値からの変化率(%)が指定値以上となった場合
+change_triggers = ('change_over', 'change_under')
+# 指定期間(件数)の単純移動平均・指数移動平均を上抜け・下抜けた場合、
+# ボリンジャーバンドの外に出た場合
+window_triggers = (
+    'sma_over', 'sma_under',
+    'ema_over', 'ema_under',
+    'bollinger_over', 'bollinger_under',
+)
+indicator_triggers = change_triggers + window_triggers
+
+
+def to_decimal(price: float) -> Decimal:
+    """
+    列で保持している基準価格をDecimalに戻す
+    (reprは元の10進表記を復元できる最短の表記となる)
+    """
+    return Decimal(repr(price))
+
+
+class RuleColumns:
+    """
+    ルールを銘柄コード・基準価格・トリガー方向の列ごとにarrayで保持する
+    (1件あたり17バイト、追加した順序を保つ)
+    """
+    __slots__ = ('descriptions', 'prices', 'directions')
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.descriptions = array('q')
+        self.prices = array('d')
+        self.directions = array('b')
+        for rule in rules:
+            self.append(rule.description, float(rule.price), rule.trigger)
+
+    def __len__(self) -> int:
+        return len(self.descriptions)
+
+    def __iter__(self) -> Iterator[Rule]:
+        for description, price, direction in zip(
+            self.descriptions,
+            self.prices,
+            self.directions
+        ):
+            yield Rule(description, to_decimal(price), triggers[direction])
+
+    def append(self, description: int, price: float, trigger: str):
+        self.descriptions.append(description)
+        self.prices.append(price)
+        self.directions.append(directions[trigger])
+
+
+def group_descriptions(rules: Iterable[Rule]) -> List[List[int]]:
+    """
+    ルールを持つ銘柄コードを、トリガー条件ごとのグループに分ける
+
+    Params
+    -------
+    rules: Iterable[Rule]
+        ルール (銘柄コードは記載順にグループに入る)
+
+    Returns
+    -------
+    0: List[List[int]]
+        [以上の銘柄, 以下の銘柄] のグループ
+        以上・以下の両方のルールを持つ銘柄がある場合は、
+        3つ目のグループとして追加する
+    """
+    triggers: Dict[int, Set[str]] = {}
+    for rule in rules:
+        # 指標によるトリガー条件は、上昇・下落の方向で分ける
+        trigger = 'over' if rule.trigger.endswith('over') else 'under'
+        triggers.setdefault(rule.description, set()).add(trigger)
+
+    over_group = []
+    under_group = []
+    both_group = []
+    for description, trigger_set in triggers.items():
+        if len(trigger_set) > 1:
+            both_group.append(description)
+        elif 'over' in trigger_set:
+            over_group.append(description)
+        else:
+            under_group.append(description)
+
+    groups = [over_group, under_group]
+    if both_group:
+        groups.append(both_group)
+    return groups
+
+
+def make_alert_message(description: int, rules: Iterable[Rule]) -> str:
+    """
+    お知らせメッセージを作成する
+
+    Params
+    -------
+    description: int
+        銘柄コード
+    rules: Iterable[Rule]
+        お知らせ対象のルール (価格を超えた基準)
+
+    Returns
+    -------
+    0: str
+        作成したお知らせメッセージ
+        トリガー条件ごとに1行とし、基準価格は超えた順に並べる
+    """
+    over_prices = sorted(r.price for r in rules if r.trigger == 'over')
+    under_prices = sorted(
+        (r.price for r in rules if r.trigger == 'under'),
+        reverse=True
+    )
+
+    lines = []
+    for prices, word in (
+        (over_prices, '上回りました。'),
+        (under_prices, '下回りました。'),
+    ):
+        if not prices:
+            continue
+        lines.append('銘柄コード: {} が 価格: {}を{}'.format(
+            description,
+            ', '.join('{:,.1f} 円'.format(price) for price in prices),
+            word
+        ))
+    for rule in rules:
+        if rule.trigger in indicator_messages:
+            lines.append('銘柄コード: {} が {}'.format(
+                description,
+                indicator_messages[rule.trigger].format(rule.price)
+            ))
+    return '\n'.join(lines)
+
+
+indicator_messages = {
+    'change_over': '前日終値から{:,.1f}%以上上昇しました。',
+    'change_under': '前日終値から{:,.1f}%以上下落しました。',
+    'sma_over': '{:.0f}期間の単純移動平均を上抜けました。',
+    'sma_under': '{:.0f}期間の単純移動平均を下抜けました。',
+    'ema_over': '{:.0f}期間の指数移動平均を上抜けました。',
+    'ema_under': '{:.0f}期間の指数移動平均を下抜けました。',
+    'bollinger_over': '{:.0f}期間のボリンジャーバンド(+2σ)を上回りました。',
+    'bollinger_under': '{:.0f}期間のボリンジャーバンド(-2σ)を下回りました。',
+}
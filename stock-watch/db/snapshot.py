@@ -0,0 +1,203 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from .index import RuleIndex
+from .loader import LoadResult
+from .rule import Rule
+from .rule import RuleColumns
+from .rule import indicator_triggers
+from .rule import to_decimal
+
+# スナップショットの形式
+# ヘッダ: マジック, CSVのハッシュ, 区画数
+# 区画表: 区画ごとの (型, 要素数)
+# 区画: 8バイト境界に揃えて順に配置
+magic = b'SWSNAP02'
+header_format = '<8s32sQ'
+section_format = '<cQ'
+alignment = 8
+
+
+def hash_file(file: str) -> bytes:
+    """
+    ファイルの内容のハッシュを求める
+
+    Params
+    -------
+    file: str
+        対象ファイル
+
+    Returns
+    -------
+    0: bytes
+        ハッシュ値(32バイト)
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def write_snapshot(
+    file: str,
+    csv_hash: bytes,
+    result: LoadResult,
+    index: RuleIndex
+):
+    """
+    検証・変換済みのルールをスナップショットとして書き込む
+    (書き込み中のファイルを読まれないよう、一時ファイルから置き換える)
+
+    Params
+    -------
+    file: str
+        スナップショットのファイル
+    csv_hash: bytes
+        元となったCSVのハッシュ
+    result: LoadResult
+        CSVを検証・変換した結果
+    index: RuleIndex
+        resultから作成した索引
+    """
+    report = '\n'.join(result.error_report).encode('utf_8')
+    sections = [
+        np.frombuffer(result.descriptions, dtype=np.int64),
+        np.frombuffer(result.rules.descriptions, dtype=np.int64),
+        np.frombuffer(result.rules.prices, dtype=np.float64),
+        np.frombuffer(result.rules.directions, dtype=np.int8),
+        np.array(sorted(result.invalid_descriptions), dtype=np.int64),
+        np.frombuffer(report, dtype=np.uint8),
+        np.array(
+            [rule.description for rule in result.indicator_rules],
+            dtype=np.int64
+        ),
+        np.array(
+            [float(rule.price) for rule in result.indicator_rules],
+            dtype=np.float64
+        ),
+        np.array(
+            [
+                indicator_triggers.index(rule.trigger)
+                for rule in result.indicator_rules
+            ],
+            dtype=np.int8
+        ),
+    ] + list(index.get_arrays())
+
+    temp_file = '{}.{}.tmp'.format(file, os.getpid())
+    with open(temp_file, 'wb') as f:
+        f.write(struct.pack(header_format, magic, csv_hash, len(sections)))
+        for section in sections:
+            f.write(struct.pack(
+                section_format,
+                section.dtype.char.encode('ascii'),
+                len(section)
+            ))
+        for section in sections:
+            f.write(b'\0' * (-f.tell() % alignment))
+            f.write(section.tobytes())
+    os.replace(temp_file, file)
+
+
+def read_snapshot(
+    file: str,
+    csv_hash: bytes
+) -> Optional[Tuple[LoadResult, RuleIndex]]:
+    """
+    スナップショットをメモリマップして読み込む
+
+    Params
+    -------
+    file: str
+        スナップショットのファイル
+    csv_hash: bytes
+        現在のCSVのハッシュ
+
+    Returns
+    -------
+    0: Optional[Tuple[LoadResult, RuleIndex]]
+        CSVを検証・変換した結果と索引
+        スナップショットがない、またはCSVのハッシュが一致しない場合はNone
+
+    Remarks
+    -------
+    索引の配列はコピーせず、メモリマップを直接参照する
+    """
+    try:
+        with open(file, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # ファイルがない、または空の場合
+        return None
+
+    try:
+        sections = _read_sections(buffer, csv_hash)
+    except (struct.error, ValueError):
+        # 壊れている場合は使わない
+        return None
+    if sections is None:
+        return None
+
+    descriptions, rule_descriptions, rule_prices, rule_directions, \
+        invalid_descriptions, report, \
+        indicator_descriptions, indicator_prices, indicator_kinds = \
+        sections[:9]
+
+    rules = RuleColumns()
+    rules.descriptions = array('q', rule_descriptions.tobytes())
+    rules.prices = array('d', rule_prices.tobytes())
+    rules.directions = array('b', rule_directions.tobytes())
+    error_report = report.tobytes().decode('utf_8')
+    result = LoadResult(
+        array('q', descriptions.tobytes()),
+        rules,
+        set(invalid_descriptions.tolist()),
+        error_report.split('\n') if error_report else [],
+        [
+            Rule(description, to_decimal(price), indicator_triggers[kind])
+            for description, price, kind in zip(
+                indicator_descriptions.tolist(),
+                indicator_prices.tolist(),
+                indicator_kinds.tolist()
+            )
+        ]
+    )
+    return result, RuleIndex.from_arrays(tuple(sections[9:]))
+
+
+def _read_sections(
+    buffer: mmap.mmap,
+    csv_hash: bytes
+) -> Optional[List[np.ndarray]]:
+    file_magic, file_hash, count = \
+        struct.unpack_from(header_format, buffer, 0)
+    if file_magic != magic or file_hash != csv_hash:
+        return None
+
+    offset = struct.calcsize(header_format)
+    table = []
+    for _ in range(count):
+        table.append(struct.unpack_from(section_format, buffer, offset))
+        offset += struct.calcsize(section_format)
+
+    sections = []
+    for dtype, length in table:
+        offset += -offset % alignment
+        section = np.frombuffer(
+            buffer,
+            dtype=np.dtype(dtype.decode('ascii')),
+            count=length,
+            offset=offset
+        )
+        sections.append(section)
+        offset += section.nbytes
+    return sections
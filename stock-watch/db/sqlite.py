@@ -0,0 +1,312 @@
+import sqlite3
+from decimal import Decimal
+from itertools import chain
+from typing import Callable
+from typing import Dict
+from typing import List
+
+from exceptions import DbException
+from .interface import IDb
+from .rule import Rule
+from .rule import group_descriptions
+from .rule import make_alert_message
+
+
+class SqliteDb(IDb):
+    """
+    SQLiteのファイルをDBとする
+
+    ルールは銘柄コードにインデックスを張ったテーブルに保持し、
+    毎回の起動時にCSVの読み込み・検証を行わない
+    (CSVからの取り込みはimport_csvで行う)
+
+    SQLは文字列を固定したプレースホルダ付きの文として発行し、
+    sqlite3の文キャッシュによりプリペアドステートメントとして再利用する
+    """
+    db_file = '../config/alert.db'
+    # sqlite3がコンパイル済みの文を保持する数
+    cached_statements = 32
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS rules ('
+        ' id INTEGER PRIMARY KEY,'
+        ' description INTEGER NOT NULL,'
+        ' price TEXT NOT NULL,'
+        " trigger TEXT NOT NULL CHECK (trigger IN ('over', 'under'))"
+        ')',
+        'CREATE INDEX IF NOT EXISTS rules_description'
+        ' ON rules (description)',
+        # 指標によるルール (既存のファイルのrulesのトリガー条件の制約を
+        # 変えずに済むよう、別のテーブルとする)
+        'CREATE TABLE IF NOT EXISTS indicator_rules ('
+        ' id INTEGER PRIMARY KEY,'
+        ' description INTEGER NOT NULL,'
+        ' price TEXT NOT NULL,'
+        ' trigger TEXT NOT NULL'
+        ')',
+        'CREATE INDEX IF NOT EXISTS indicator_rules_description'
+        ' ON indicator_rules (description)',
+        'CREATE TABLE IF NOT EXISTS import_errors ('
+        ' id INTEGER PRIMARY KEY,'
+        ' message TEXT NOT NULL'
+        ')',
+        'CREATE TEMP TABLE IF NOT EXISTS prices ('
+        ' id INTEGER PRIMARY KEY,'
+        ' description INTEGER NOT NULL,'
+        ' price REAL NOT NULL'
+        ')',
+    )
+
+    select_descriptions = \
+        'SELECT description FROM rules' \
+        ' GROUP BY description ORDER BY MIN(id)'
+    # 指標によるルールのみの銘柄 (価格によるルールの銘柄の後に並べる)
+    select_indicator_descriptions = \
+        'SELECT description FROM indicator_rules' \
+        ' WHERE description NOT IN (SELECT description FROM rules)' \
+        ' GROUP BY description ORDER BY MIN(id)'
+    select_rules = \
+        'SELECT description, price, trigger FROM rules ORDER BY id'
+    select_rule = \
+        'SELECT price, trigger FROM rules WHERE description = ? ORDER BY id'
+    select_indicator_rule = \
+        'SELECT price, trigger FROM indicator_rules' \
+        ' WHERE description = ? ORDER BY id'
+    select_crossed = \
+        'SELECT price, trigger FROM rules WHERE description = ?' \
+        " AND ((trigger = 'over' AND CAST(price AS REAL) <= ?)" \
+        " OR (trigger = 'under' AND CAST(price AS REAL) >= ?))" \
+        ' ORDER BY id'
+    select_triggered = \
+        'SELECT p.description FROM prices p WHERE EXISTS (' \
+        ' SELECT 1 FROM rules r WHERE r.description = p.description' \
+        " AND ((r.trigger = 'over' AND p.price >= CAST(r.price AS REAL))" \
+        " OR (r.trigger = 'under' AND p.price <= CAST(r.price AS REAL)))" \
+        ') ORDER BY p.id'
+    select_crossed_rules = \
+        'SELECT p.description, r.price, r.trigger' \
+        ' FROM prices p JOIN rules r ON r.description = p.description' \
+        " WHERE (r.trigger = 'over' AND p.price >= CAST(r.price AS REAL))" \
+        " OR (r.trigger = 'under' AND p.price <= CAST(r.price AS REAL))" \
+        ' ORDER BY p.id, r.id'
+    select_all_indicator_rules = \
+        'SELECT description, price, trigger FROM indicator_rules ORDER BY id'
+    select_indicator_rules = \
+        'SELECT p.description, r.price, r.trigger' \
+        ' FROM prices p JOIN indicator_rules r' \
+        ' ON r.description = p.description' \
+        ' ORDER BY p.id, r.id'
+    select_import_errors = 'SELECT message FROM import_errors ORDER BY id'
+    insert_rule = \
+        'INSERT INTO rules (description, price, trigger) VALUES (?, ?, ?)'
+    insert_indicator_rule = \
+        'INSERT INTO indicator_rules (description, price, trigger)' \
+        ' VALUES (?, ?, ?)'
+    insert_import_error = 'INSERT INTO import_errors (message) VALUES (?)'
+    insert_price = 'INSERT INTO prices (description, price) VALUES (?, ?)'
+
+    def __init__(self, db_file: str = None):
+        self.__connection = sqlite3.connect(
+            db_file or self.db_file,
+            cached_statements=self.cached_statements
+        )
+        # 読み込み中の取り込み(書き込み)を妨げないようにWALモードとする
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        with self.__connection:
+            for sql in self.schema:
+                self.__connection.execute(sql)
+
+    def get_descriptions(self) -> List[int]:
+        cursor = chain(
+            self.__connection.execute(self.select_descriptions),
+            self.__connection.execute(self.select_indicator_descriptions)
+        )
+        return [description for description, in cursor]
+
+    def get_description_groups(self) -> List[List[int]]:
+        return group_descriptions(self.get_all_rules())
+
+    def get_all_rules(self) -> List[Rule]:
+        cursor = chain(
+            self.__connection.execute(self.select_rules),
+            self.__connection.execute(self.select_all_indicator_rules)
+        )
+        return [
+            Rule(description, Decimal(price), trigger)
+            for description, price, trigger in cursor
+        ]
+
+    def get_judge_func(self, description: int) -> Callable[[int], bool]:
+        self.__get_rules_from_db(description)
+
+        def judge_func(now_price):
+            return len(self.__get_crossed(description, now_price)) > 0
+        return judge_func
+
+    def get_triggered_descriptions(
+        self,
+        prices: Dict[int, Decimal]
+    ) -> List[int]:
+        # 価格を一時テーブルに入れ、ルールと結合して一括で判定する
+        with self.__connection:
+            self.__insert_prices(prices)
+            cursor = self.__connection.execute(self.select_triggered)
+            return [description for description, in cursor]
+
+    def get_crossed_rules(
+        self,
+        prices: Dict[int, Decimal]
+    ) -> Dict[int, List[Rule]]:
+        # 価格を一時テーブルに入れ、ルールと結合して一括で取得する
+        with self.__connection:
+            self.__insert_prices(prices)
+            cursor = self.__connection.execute(self.select_crossed_rules)
+            crossed: Dict[int, List[Rule]] = {}
+            for description, price, trigger in cursor:
+                crossed.setdefault(description, []).append(
+                    Rule(description, Decimal(price), trigger)
+                )
+            return crossed
+
+    def get_indicator_rules(
+        self,
+        descriptions: List[int]
+    ) -> Dict[int, List[Rule]]:
+        # 銘柄コードを一時テーブルに入れ、ルールと結合して一括で取得する
+        with self.__connection:
+            self.__insert_prices(dict.fromkeys(descriptions, 0))
+            cursor = self.__connection.execute(self.select_indicator_rules)
+            indicator_rules: Dict[int, List[Rule]] = {}
+            for description, price, trigger in cursor:
+                indicator_rules.setdefault(description, []).append(
+                    Rule(description, Decimal(price), trigger)
+                )
+            return indicator_rules
+
+    def make_alert_message(
+        self,
+        description: int,
+        price: Decimal,
+        rules: List[Rule] = None
+    ) -> str:
+        rules = rules or self.__get_crossed(description, price) or \
+            self.__get_rules_from_db(description)
+        return make_alert_message(description, rules)
+
+    def make_fail_message(self, description: int) -> str:
+        return '銘柄コード: {}のDB登録取得が失敗しました。'.format(description)
+
+    def get_error_report(self) -> str:
+        cursor = self.__connection.execute(self.select_import_errors)
+        return '\n'.join(message for message, in cursor)
+
+    def import_csv(self, csv_file: str) -> str:
+        """
+        alert.csv形式のファイルを検証し、ルールを取り込む
+        (既存のルールはすべて置き換える)
+
+        Params
+        -------
+        csv_file: str
+            取り込むCSVファイル
+
+        Returns
+        -------
+        0: str
+            検証エラーの内容(1行1エラー)
+            エラーがない場合は空文字列
+        """
+        # 検証はCSVをDBとする場合と同じものを使う
+        from .csv import CsvAsDb
+        csv_db = CsvAsDb(csv_file)
+        indicator_rules = csv_db.get_indicator_rules(
+            csv_db.get_descriptions()
+        )
+        self.import_rules(
+            csv_db.get_rules(),
+            csv_db.get_error_lines(),
+            list(chain.from_iterable(indicator_rules.values()))
+        )
+        return csv_db.get_error_report()
+
+    def import_rules(
+        self,
+        rules: List[Rule],
+        error_lines: List[str] = (),
+        indicator_rules: List[Rule] = ()
+    ):
+        """
+        検証済みのルールを1トランザクションで取り込む
+        (既存のルールはすべて置き換える)
+
+        Params
+        -------
+        rules: List[Rule]
+            取り込むルール
+        error_lines: List[str]
+            取り込み時の検証エラーの内容
+        indicator_rules: List[Rule]
+            取り込む指標によるルール
+        """
+        with self.__connection:
+            self.__connection.execute('DELETE FROM rules')
+            self.__connection.execute('DELETE FROM indicator_rules')
+            self.__connection.execute('DELETE FROM import_errors')
+            self.__connection.executemany(
+                self.insert_rule,
+                (
+                    (rule.description, str(rule.price), rule.trigger)
+                    for rule in rules
+                )
+            )
+            self.__connection.executemany(
+                self.insert_indicator_rule,
+                (
+                    (rule.description, str(rule.price), rule.trigger)
+                    for rule in indicator_rules
+                )
+            )
+            self.__connection.executemany(
+                self.insert_import_error,
+                ((line, ) for line in error_lines)
+            )
+
+    def __insert_prices(self, prices: Dict[int, Decimal]):
+        # 判定対象の価格で一時テーブルを置き換える
+        self.__connection.execute('DELETE FROM prices')
+        self.__connection.executemany(
+            self.insert_price,
+            ((code, float(price)) for code, price in prices.items())
+        )
+
+    def __get_rules_from_db(self, description: int) -> List[Rule]:
+        # DBから指定銘柄についてのレコードを取得
+        cursor = chain(
+            self.__connection.execute(self.select_rule, (description, )),
+            self.__connection.execute(
+                self.select_indicator_rule,
+                (description, )
+            )
+        )
+        rules = [
+            Rule(description, Decimal(price), trigger)
+            for price, trigger in cursor
+        ]
+
+        if len(rules) == 0:
+            # 指定銘柄のデータがない場合
+            raise DbException(
+                'DBにデータが存在しません。 銘柄コード: {}'.format(description)
+            )
+        return rules
+
+    def __get_crossed(self, description: int, price: Decimal) -> List[Rule]:
+        # 指定銘柄のルールのうち、価格が超えた基準をDBから取得
+        cursor = self.__connection.execute(
+            self.select_crossed,
+            (description, float(price), float(price))
+        )
+        return [
+            Rule(description, Decimal(rule_price), trigger)
+            for rule_price, trigger in cursor
+        ]
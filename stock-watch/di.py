@@ -1,28 +1,181 @@
 from injector import Module
 
+from config import Config
 from db import IDb
 from db import CsvAsDb
+from db import SqliteDb
 from price import IPrice
 from price import PriceByKabutan
+from price import RecordedPrice
+from price import CachedPrice
+from price import PriceByKabutanList
+from price import HedgedPrice
+from price import BreakerPrice
+from history import ColumnarPriceHistory
 from alert import IAlert
 from alert import AlertByLine
+from alert import BreakerAlert
+from alert import QueuedAlert
+from session import PooledSession
 from log import ILogger
 from log import FileLogger
+from state import IAlertState
+from state import SqliteAlertState
+from state import NoAlertState
+from indicator import IIndicator
+from indicator import StreamingIndicator
+from market import IMarketCalendar
+from market import TseCalendar
+from market import NoMarketCalendar
 
 
 class DbDiModule(Module):
     def configure(self, binder):
-        binder.bind(IDb, to=CsvAsDb())
+        binder.bind(IDb, to=self.__make_db(Config()))
+
+    def __make_db(self, config: Config) -> IDb:
+        db_type = config.db_type
+        if db_type == 'sqlite':
+            return SqliteDb()
+        if db_type == 'csv':
+            return CsvAsDb(loader=config.csv_loader)
+        raise ValueError(f'設定ファイルのDB種別が不正です。 DB種別: {db_type}')
 
 
 class PriceDiModule(Module):
     def configure(self, binder):
-        binder.bind(IPrice, to=PriceByKabutan())
+        binder.bind(IPrice, to=self.__make_price(Config()))
+
+    def __make_price(self, config: Config) -> IPrice:
+        concurrency = config.price_concurrency
+        # 並行して取得する銘柄数分の接続は、プールに保持する
+        # (取得し直す要求は、別に同時接続数の上限まで接続する)
+        session = PooledSession(
+            pool_size=max(
+                config.http_pool_size,
+                concurrency * (2 if config.price_hedge else 1)
+            ),
+            retries=config.http_retries,
+            rate=config.http_rate,
+            latency_target=config.http_latency_target,
+            timeout=(config.http_connect_timeout, config.http_read_timeout)
+        )
+        price = PriceByKabutan(
+            concurrency=concurrency,
+            session=session,
+            validator_file=PriceByKabutan.validator_file,
+            url=config.price_url or None,
+            parse_mode=config.price_parse,
+            parse_workers=config.price_parse_workers
+        )
+        if config.price_hedge:
+            # 応答の遅い銘柄は、待たずに取得し直す
+            # (取得元はkabutanの銘柄ページだけのため、同じ取得元に要求し直す)
+            price = HedgedPrice(
+                [price],
+                concurrency=concurrency,
+                quantile=config.price_hedge_quantile
+            )
+        if config.breaker_threshold > 0:
+            # 取得元の障害時は、残りの銘柄を要求せずにすぐ失敗とする
+            price = BreakerPrice(
+                price,
+                concurrency=concurrency,
+                failure_threshold=config.breaker_threshold,
+                recovery_timeout=config.breaker_recovery
+            )
+        urls = config.price_list_urls
+        if urls:
+            # 一覧ページにある銘柄は、まとめて取得する
+            price = PriceByKabutanList(urls, price, session=session)
+        if config.price_history:
+            # 取得した価格を銘柄ごとの履歴ファイルに追記する
+            price = RecordedPrice(price, ColumnarPriceHistory())
+        # キャッシュした価格は取得し直さない (履歴にも追記しない)
+        return self.__make_cache(config, price)
+
+    def __make_cache(self, config: Config, price: IPrice) -> IPrice:
+        price_cache = config.price_cache
+        if price_cache == 'none':
+            return price
+        if price_cache in ('sqlite', 'memory'):
+            return CachedPrice(
+                price,
+                ttl=config.price_cache_ttl,
+                max_entries=config.price_cache_size,
+                max_bytes=config.price_cache_memory * 1024,
+                cache_file=':memory:' if price_cache == 'memory' else None,
+                calendar=MarketCalendarDiModule.make_calendar(config)
+            )
+        raise ValueError(
+            f'設定ファイルの価格のキャッシュ方法が不正です。 キャッシュ方法: {price_cache}'
+        )
 
 
 class AlertDiModule(Module):
     def configure(self, binder):
-        binder.bind(IAlert, to=AlertByLine())
+        binder.bind(IAlert, to=self.__make_alert(Config()))
+
+    def __make_alert(self, config: Config) -> IAlert:
+        session = PooledSession(
+            pool_size=config.http_pool_size,
+            retries=config.http_retries,
+            rate=config.http_rate,
+            latency_target=config.http_latency_target,
+            timeout=(config.http_connect_timeout, config.http_read_timeout)
+        )
+        alert = AlertByLine(session=session)
+        if config.breaker_threshold > 0:
+            # 通知先の障害時は、通知せずにすぐ失敗とする
+            alert = BreakerAlert(
+                alert,
+                failure_threshold=config.breaker_threshold,
+                recovery_timeout=config.breaker_recovery
+            )
+        if config.alert_queue:
+            # 株価チェックの処理は送信を待たず、バックグラウンドで送信する
+            alert = QueuedAlert(
+                alert,
+                retries=config.alert_retries,
+                flush_timeout=config.alert_flush_timeout
+            )
+        return alert
+
+
+class AlertStateDiModule(Module):
+    def configure(self, binder):
+        binder.bind(IAlertState, to=self.__make_alert_state(Config()))
+
+    def __make_alert_state(self, config: Config) -> IAlertState:
+        alert_state = config.alert_state
+        if alert_state == 'sqlite':
+            return SqliteAlertState(rearm_band=config.rearm_band)
+        if alert_state == 'none':
+            return NoAlertState()
+        raise ValueError(
+            f'設定ファイルの通知状態の保持方法が不正です。 保持方法: {alert_state}'
+        )
+
+
+class IndicatorDiModule(Module):
+    def configure(self, binder):
+        binder.bind(IIndicator, to=StreamingIndicator())
+
+
+class MarketCalendarDiModule(Module):
+    def configure(self, binder):
+        binder.bind(IMarketCalendar, to=self.make_calendar(Config()))
+
+    @staticmethod
+    def make_calendar(config: Config) -> IMarketCalendar:
+        market_calendar = config.market_calendar
+        if market_calendar == 'tse':
+            return TseCalendar()
+        if market_calendar == 'none':
+            return NoMarketCalendar()
+        raise ValueError(
+            f'設定ファイルの取引時間の種別が不正です。 種別: {market_calendar}'
+        )
 
 
 class LoggerDiModule(Module):
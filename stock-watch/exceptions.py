@@ -8,3 +8,31 @@ class PriceException(Exception):
 
 class AlertException(Exception):
     pass
+
+
+class PartialAlertException(AlertException):
+    """
+    通知メッセージの一部だけを送信できた
+    (送信できなかったテキストは、undeliveredを送信し直す)
+    """
+
+    def __init__(self, message: str, delivered: int, undelivered: list):
+        super().__init__(message)
+        # 送信できたテキスト数と、送信できなかったテキストのリスト
+        self.delivered = delivered
+        self.undelivered = undelivered
+
+
+class CircuitOpenException(Exception):
+    """
+    取得元・通知先を遮断中のため、要求を送らなかった
+    """
+    pass
+
+
+class PriceCircuitOpenException(PriceException, CircuitOpenException):
+    pass
+
+
+class AlertCircuitOpenException(AlertException, CircuitOpenException):
+    pass
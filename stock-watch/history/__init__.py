@@ -0,0 +1,2 @@
+from .interface import IPriceHistory
+from .columnar import ColumnarPriceHistory
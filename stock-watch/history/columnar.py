@@ -0,0 +1,87 @@
+import mmap
+import os
+import struct
+import time
+from decimal import Decimal
+from typing import Tuple
+
+import numpy as np
+
+from .interface import IPriceHistory
+
+
+class ColumnarPriceHistory(IPriceHistory):
+    """
+    価格の履歴を銘柄ごとに、取得日時・価格の列ごとのファイルに保持する
+
+    各ファイルは固定長(8バイト)の値を追記するだけの配列とし、
+    読み込みはファイルをメモリマップしてコピーせずにNumPyの配列として参照する
+    """
+    history_dir = '../config/history'
+    # 列ごとのファイルの拡張子と、値の形式 (structの書式)
+    columns = (('time', '<q'), ('price', '<d'))
+
+    def __init__(self, history_dir: str = None):
+        self.__history_dir = history_dir or self.history_dir
+        os.makedirs(self.__history_dir, exist_ok=True)
+
+    def append(self, description: int, price: Decimal, timestamp: int = None):
+        if timestamp is None:
+            timestamp = time.time_ns()
+        values = (timestamp, float(price))
+        files = [
+            open(self.__get_file(description, column), 'ab')
+            for column, _ in self.columns
+        ]
+        try:
+            lengths = [
+                f.tell() // struct.calcsize(fmt)
+                for f, (_, fmt) in zip(files, self.columns)
+            ]
+            if len(set(lengths)) > 1:
+                # 追記の途中で中断されていた場合は、短い列に長さを揃える
+                for f, (_, fmt) in zip(files, self.columns):
+                    f.truncate(min(lengths) * struct.calcsize(fmt))
+            for f, value, (_, fmt) in zip(files, values, self.columns):
+                f.write(struct.pack(fmt, value))
+        finally:
+            for f in files:
+                f.close()
+
+    def get_range(
+        self,
+        description: int,
+        start: int = None,
+        end: int = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        times, prices = (
+            self.__map(self.__get_file(description, column), np.dtype(fmt))
+            for column, fmt in self.columns
+        )
+        length = min(len(times), len(prices))
+        first = 0 if start is None \
+            else int(np.searchsorted(times[:length], start, 'left'))
+        last = length if end is None \
+            else int(np.searchsorted(times[:length], end, 'left'))
+        return times[first:last], prices[first:last]
+
+    def __get_file(self, description: int, column: str) -> str:
+        return os.path.join(
+            self.__history_dir,
+            '{}.{}'.format(description, column)
+        )
+
+    @staticmethod
+    def __map(file: str, dtype: np.dtype) -> np.ndarray:
+        # ファイルをメモリマップし、読み取り専用の配列として参照する
+        # (ファイルがない、または空の場合は空の配列)
+        try:
+            with open(file, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return np.empty(0, dtype)
+        return np.frombuffer(
+            buffer,
+            dtype=dtype,
+            count=len(buffer) // dtype.itemsize
+        )
@@ -0,0 +1,52 @@
+from abc import ABCMeta
+from abc import abstractmethod
+from decimal import Decimal
+from typing import Tuple
+
+import numpy as np
+
+
+class IPriceHistory(metaclass=ABCMeta):
+    @abstractmethod
+    def append(self, description: int, price: Decimal, timestamp: int = None):
+        """
+        取得した価格を履歴に追加する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+        price: Decimal
+            価格
+        timestamp: int
+            取得日時 (エポックからのナノ秒、省略時は現在日時)
+        """
+        pass
+
+    @abstractmethod
+    def get_range(
+        self,
+        description: int,
+        start: int = None,
+        end: int = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        指定期間の価格の履歴を取得する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+        start: int
+            期間の開始日時 (エポックからのナノ秒、この日時を含む、省略時は最初から)
+        end: int
+            期間の終了日時 (エポックからのナノ秒、この日時を含まない、省略時は最後まで)
+
+        Returns
+        -------
+        0: np.ndarray
+            取得日時の配列 (int64、昇順)
+        1: np.ndarray
+            価格の配列 (float64)
+        """
+        pass
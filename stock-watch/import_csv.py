@@ -0,0 +1,22 @@
+from sys import argv
+
+from db import SqliteDb
+from db import CsvAsDb
+
+
+def execute(csv_file: str):
+    """
+    alert.csv形式のファイルをSQLiteのDBに取り込む
+
+    Params
+    -------
+    csv_file: str
+        取り込むCSVファイル
+    """
+    error_report = SqliteDb().import_csv(csv_file)
+    if error_report:
+        print(error_report)
+
+
+if __name__ == '__main__':
+    execute(argv[1] if len(argv) > 1 else CsvAsDb.csv_file)
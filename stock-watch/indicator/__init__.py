@@ -0,0 +1,2 @@
+from .interface import IIndicator
+from .streaming import StreamingIndicator
@@ -0,0 +1,49 @@
+from abc import ABCMeta
+from abc import abstractmethod
+from decimal import Decimal
+from typing import Dict
+from typing import List
+
+from db.rule import Rule
+
+
+class IIndicator(metaclass=ABCMeta):
+    @abstractmethod
+    def judge(
+        self,
+        prices: Dict[int, Decimal],
+        rules: Dict[int, List[Rule]]
+    ) -> Dict[int, List[Rule]]:
+        """
+        現在価格で銘柄ごとの指標を更新し、指標によるルールを判定する
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした現在価格
+        rules: Dict[int, List[Rule]]
+            銘柄コードをキーとした、指標によるルール
+
+        Returns
+        -------
+        0: Dict[int, List[Rule]]
+            銘柄コードをキーとした、条件を満たした指標によるルール
+            (条件を満たしたルールのない銘柄は含まない)
+
+        Remarks
+        -------
+        価格1件ごとに指標を更新するため、同じ価格で複数回呼び出さないこと
+        """
+        pass
+
+    def record(self, prices: Dict[int, Decimal]):
+        """
+        指標を更新・判定せずに、最後に取得した価格のみ記録する
+        (大引け後に取得した価格を、翌取引日の前日終値として使う)
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした価格
+        """
+        pass
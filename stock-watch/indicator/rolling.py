@@ -0,0 +1,71 @@
+import math
+from collections import deque
+from typing import Iterable
+from typing import Optional
+
+
+class RollingWindow:
+    """
+    直近の指定件数の価格と、その合計・二乗和を保持する
+    (価格の追加・平均・標準偏差の計算は件数によらず一定の時間で行う)
+    """
+    __slots__ = ('period', 'values', 'total', 'square_total')
+
+    def __init__(self, period: int, values: Iterable[float] = ()):
+        self.period = period
+        self.values = deque(values, maxlen=period)
+        # 保存した価格から合計を求め直すため、誤差は起動ごとに解消される
+        self.total = math.fsum(self.values)
+        self.square_total = math.fsum(value * value for value in self.values)
+
+    def push(self, value: float):
+        if len(self.values) == self.period:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.square_total -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.square_total += value * value
+
+    def is_full(self) -> bool:
+        return len(self.values) == self.period
+
+    def mean(self) -> Optional[float]:
+        # 指定件数に満たない場合はNone
+        if not self.is_full():
+            return None
+        return self.total / self.period
+
+    def std(self) -> Optional[float]:
+        # 母標準偏差 (指定件数に満たない場合はNone)
+        mean = self.mean()
+        if mean is None:
+            return None
+        variance = self.square_total / self.period - mean * mean
+        return math.sqrt(max(variance, 0.0))
+
+
+class ExponentialAverage:
+    """
+    指定期間の指数移動平均を保持する
+    (平滑化係数は 2 / (期間 + 1))
+    """
+    __slots__ = ('period', 'value', 'count')
+
+    def __init__(self, period: int, value: float = None, count: int = 0):
+        self.period = period
+        self.value = value
+        self.count = count
+
+    def push(self, value: float):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += 2 / (self.period + 1) * (value - self.value)
+        self.count += 1
+
+    def mean(self) -> Optional[float]:
+        # 期間分の価格に満たない場合はNone
+        if self.count < self.period:
+            return None
+        return self.value
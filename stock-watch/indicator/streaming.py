@@ -0,0 +1,297 @@
+import json
+import sqlite3
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from decimal import Decimal
+from typing import Dict
+from typing import List
+
+from db.rule import Rule
+from market import TseCalendar
+from .interface import IIndicator
+from .rolling import ExponentialAverage
+from .rolling import RollingWindow
+
+
+class IndicatorState:
+    """
+    銘柄ごとの指標の状態
+
+    Attributes
+    -------
+    date: str
+        最後に価格を取得した日付
+    last: float
+        最後に取得した価格
+    fetched: str
+        最後に価格を取得した日時 (ISO形式)
+    close: float
+        前日終値 (前の日付の大引け後に取得した価格、不明な場合はNone)
+    windows: Dict[int, RollingWindow]
+        期間をキーとした、単純移動平均・ボリンジャーバンド用の価格
+    averages: Dict[int, ExponentialAverage]
+        期間をキーとした、指数移動平均
+    """
+    __slots__ = ('date', 'last', 'fetched', 'close', 'windows', 'averages')
+
+    def __init__(self, data: dict = None):
+        data = data or {}
+        self.date = data.get('date')
+        self.last = data.get('last')
+        self.fetched = data.get('fetched')
+        self.close = data.get('close')
+        self.windows = {
+            int(period): RollingWindow(int(period), values)
+            for period, values in data.get('windows', {}).items()
+        }
+        self.averages = {
+            int(period): ExponentialAverage(int(period), value, count)
+            for period, (value, count) in data.get('averages', {}).items()
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'date': self.date,
+            'last': self.last,
+            'fetched': self.fetched,
+            'close': self.close,
+            'windows': {
+                period: list(window.values)
+                for period, window in self.windows.items()
+            },
+            'averages': {
+                period: [average.value, average.count]
+                for period, average in self.averages.items()
+            },
+        }
+
+
+class StreamingIndicator(IIndicator):
+    """
+    銘柄ごとの指標を、価格1件ごとに差分で更新する
+
+    指標の状態はSQLiteのファイルに銘柄ごとに保持し、
+    次回の起動では履歴から計算し直さずに続きから更新する
+    (状態の読み込み・書き込みは、それぞれ1回の問い合わせ・
+    1トランザクションでまとめて行う)
+
+    移動平均・ボリンジャーバンドの期間は、価格を取得した回数で数える
+    """
+    state_file = '../config/indicator_state.db'
+    # ボリンジャーバンドの幅(σ)
+    band_width = 2
+    # 前日終値の日付の区切りとする時間帯 (日本時間)
+    jst = timezone(timedelta(hours=9))
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS indicator_state ('
+        ' description INTEGER PRIMARY KEY,'
+        ' state TEXT NOT NULL'
+        ')',
+        'CREATE TEMP TABLE IF NOT EXISTS targets ('
+        ' description INTEGER PRIMARY KEY'
+        ')',
+    )
+
+    select_state = \
+        'SELECT s.description, s.state FROM targets t' \
+        ' JOIN indicator_state s ON s.description = t.description'
+    insert_target = 'INSERT INTO targets (description) VALUES (?)'
+    upsert_state = \
+        'INSERT OR REPLACE INTO indicator_state (description, state)' \
+        ' VALUES (?, ?)'
+
+    def __init__(
+        self,
+        state_file: str = None,
+        calendar: TseCalendar = None
+    ):
+        """
+        Params
+        -------
+        state_file: str
+            指標の状態を保持するファイル
+        calendar: TseCalendar
+            前日終値の判定に使う取引時間 (未指定の場合、東証の取引時間)
+        """
+        self.__calendar = calendar or TseCalendar()
+        self.__connection = sqlite3.connect(state_file or self.state_file)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        with self.__connection:
+            for sql in self.schema:
+                self.__connection.execute(sql)
+
+    def judge(
+        self,
+        prices: Dict[int, Decimal],
+        rules: Dict[int, List[Rule]]
+    ) -> Dict[int, List[Rule]]:
+        descriptions = [
+            description for description in rules if description in prices
+        ]
+        if not descriptions:
+            return {}
+        states = self.__get_states(descriptions)
+        now = datetime.now(self.jst)
+
+        crossed = {}
+        for description in descriptions:
+            state = states.setdefault(description, IndicatorState())
+            self.__roll_date(state, now)
+            code_crossed = self.__update(
+                state,
+                rules[description],
+                float(prices[description])
+            )
+            state.fetched = now.isoformat()
+            if code_crossed:
+                crossed[description] = code_crossed
+
+        self.__save_states(states)
+        return crossed
+
+    def __update(
+        self,
+        state: IndicatorState,
+        rules: List[Rule],
+        price: float
+    ) -> List[Rule]:
+        previous = state.last
+
+        # ルールで使う期間の指標だけを保持する
+        window_periods = {
+            int(rule.price) for rule in rules
+            if rule.trigger.startswith(('sma_', 'bollinger_'))
+        }
+        average_periods = {
+            int(rule.price) for rule in rules
+            if rule.trigger.startswith('ema_')
+        }
+        state.windows = {
+            period: state.windows.get(period) or RollingWindow(period)
+            for period in window_periods
+        }
+        state.averages = {
+            period: state.averages.get(period) or ExponentialAverage(period)
+            for period in average_periods
+        }
+
+        # 価格を加える前後の移動平均を比べて、上抜け・下抜けを判定する
+        # (ボリンジャーバンドは、価格を加える前の直近の価格から求める)
+        before = {
+            ('sma', period): window.mean()
+            for period, window in state.windows.items()
+        }
+        before.update({
+            ('std', period): window.std()
+            for period, window in state.windows.items()
+        })
+        before.update({
+            ('ema', period): average.mean()
+            for period, average in state.averages.items()
+        })
+        for window in state.windows.values():
+            window.push(price)
+        for average in state.averages.values():
+            average.push(price)
+        state.last = price
+
+        return [
+            rule for rule in rules
+            if self.__is_crossed(rule, state, price, previous, before)
+        ]
+
+    def record(self, prices: Dict[int, Decimal]):
+        if not prices:
+            return
+        states = self.__get_states(list(prices))
+        now = datetime.now(self.jst)
+        for description, price in prices.items():
+            state = states.setdefault(description, IndicatorState())
+            self.__roll_date(state, now)
+            state.last = float(price)
+            state.fetched = now.isoformat()
+        self.__save_states(states)
+
+    def __roll_date(self, state: IndicatorState, now: datetime):
+        # 日付が変わった場合、前の日付の大引け後に取得した価格を前日終値とする
+        # (大引け前に取得した価格しかない場合、前日終値は不明とする)
+        today = now.date().isoformat()
+        if state.date == today:
+            return
+        state.close = state.last if self.__is_after_close(state.fetched) \
+            else None
+        state.date = today
+
+    def __is_after_close(self, fetched: str) -> bool:
+        if fetched is None:
+            return False
+        fetched = datetime.fromisoformat(fetched).astimezone(self.jst)
+        day = fetched.date()
+        return self.__calendar.is_trading_day(day) and \
+            fetched.time() >= self.__calendar.get_close_time(day)
+
+    def __is_crossed(
+        self,
+        rule: Rule,
+        state: IndicatorState,
+        price: float,
+        previous: float,
+        before: dict
+    ) -> bool:
+        kind, direction = rule.trigger.rsplit('_', 1)
+        if kind == 'change':
+            if not state.close:
+                return False
+            change = (price - state.close) / state.close * 100
+            if direction == 'over':
+                return change >= float(rule.price)
+            return -change >= float(rule.price)
+
+        period = int(rule.price)
+        if kind == 'bollinger':
+            mean = before[('sma', period)]
+            if mean is None:
+                return False
+            width = self.band_width * before[('std', period)]
+            if direction == 'over':
+                return price > mean + width
+            return price < mean - width
+
+        # 前回の価格が移動平均の反対側にあり、今回の価格が移動平均を超えた場合
+        before_mean = before[(kind, period)]
+        after_mean = state.windows[period].mean() if kind == 'sma' \
+            else state.averages[period].mean()
+        if previous is None or before_mean is None or after_mean is None:
+            return False
+        if direction == 'over':
+            return previous <= before_mean and price > after_mean
+        return previous >= before_mean and price < after_mean
+
+    def __get_states(
+        self,
+        descriptions: List[int]
+    ) -> Dict[int, IndicatorState]:
+        # 判定対象の銘柄の指標の状態をまとめて取得
+        with self.__connection:
+            self.__connection.execute('DELETE FROM targets')
+            self.__connection.executemany(
+                self.insert_target,
+                ((description, ) for description in descriptions)
+            )
+            cursor = self.__connection.execute(self.select_state)
+            return {
+                description: IndicatorState(json.loads(state))
+                for description, state in cursor
+            }
+
+    def __save_states(self, states: Dict[int, IndicatorState]):
+        with self.__connection:
+            self.__connection.executemany(
+                self.upsert_state,
+                (
+                    (description, json.dumps(state.to_dict()))
+                    for description, state in states.items()
+                )
+            )
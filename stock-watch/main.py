@@ -7,12 +7,19 @@ from db import IDb
 from price import IPrice
 from alert import IAlert
 from log import ILogger
+from state import IAlertState
+from indicator import IIndicator
+from market import IMarketCalendar
 from exceptions import PriceException
 from exceptions import DbException
 from exceptions import AlertException
+from exceptions import CircuitOpenException
 from di import DbDiModule
 from di import PriceDiModule
 from di import AlertDiModule
+from di import AlertStateDiModule
+from di import IndicatorDiModule
+from di import MarketCalendarDiModule
 from di import LoggerDiModule
 
 
@@ -20,41 +27,153 @@ class Main:
     end_message = '株価チェックが完了しました'
     fail_get_descriptions = 'DBからの対象銘柄取得に失敗しました'
     no_alert_description_message = '通知対象銘柄はありませんでした'
+    stats_message = '株価の取得状況: {}'
+    alert_stats_message = '通知の送信状況: {}'
+    undelivered_message = '{}件の通知を送信できませんでした\n{}'
+    market_closed_message = '休場日・取引開始前のため、株価チェックを行いませんでした'
+    fail_summary_message = \
+        '株価の取得元を遮断中のため、{}銘柄の株価を取得できませんでした (銘柄コード: {})'
+    # まとめた通知に載せる銘柄コードの数
+    fail_summary_limit = 20
 
     @inject
-    def __init__(self, db: IDb, price: IPrice, alert: IAlert, logger: ILogger):
+    def __init__(
+        self,
+        db: IDb,
+        price: IPrice,
+        alert: IAlert,
+        state: IAlertState,
+        indicator: IIndicator,
+        calendar: IMarketCalendar,
+        logger: ILogger
+    ):
         self.__db = db
         self.__price = price
         self.__alert = alert
+        self.__state = state
+        self.__indicator = indicator
+        self.__calendar = calendar
         self.__logger = logger
+        # 最後にまとめて送信する通知メッセージ
+        self.__outbox = []
+        # 通知した銘柄コードをキーとした、通知メッセージ
+        # (送信できたかは、最後にまとめて送信待ちがなくなった時点で分かる)
+        self.__alerted = {}
 
     def execute(self):
+        # 前の取引日の終値から価格が変わらない場合は、何もせずに終了する
+        # (昼休み・大引け後は、キャッシュした価格を使って判定する)
+        action = self.__calendar.get_action()
+        if action == IMarketCalendar.skip:
+            self.__logger.info(self.market_closed_message)
+            return
+
         try:
             # 対象銘柄グループを取得
             description_groups = self.__db.get_description_groups()
+            rules = self.__db.get_all_rules()
         except DbException:
             self.send_message(self.fail_get_descriptions)
+            self.flush()
             exit()
+        # DBデータの検証エラーは起動時にまとめて出力
+        error_report = self.__db.get_error_report()
+        if error_report:
+            self.__logger.error(error_report)
+        # ルールから削除された基準は、通知状態から削除する
+        self.__state.prune(rules)
 
+        # 取得元を遮断中のため取得しなかった銘柄 (最後に1件の通知にまとめる)
+        skipped = []
+        # 通知の送信に失敗した銘柄
+        undelivered_descriptions = []
         # 株価を取得
         for description_group in description_groups:
-            alert_target_descriptions = []
-            for description in description_group:
+            # (まとめて取得できる銘柄はまとめて取得し、残りの銘柄は
+            # 並行して取得して、銘柄コードの順に受け取る)
+            fetched = dict(self.__price.get_many(description_group))
+            missing = [
+                description for description in description_group
+                if description not in fetched
+            ]
+            futures = self.__price.iter_data(missing)
+            for description, future in zip(missing, futures):
                 try:
-                    price = self.__price.get_data(description)
-                except PriceException:
-                    self.fail(description)
+                    fetched[description] = future.result()
+                except PriceException as ex:
+                    if isinstance(ex, CircuitOpenException):
+                        skipped.append(description)
+                    else:
+                        self.fail(description)
                     continue
+            # 最後の結果を返した後の処理(保存など)も行われるよう、最後まで読む
+            for _ in futures:
+                pass
+            prices = {
+                description: fetched[description]
+                for description in description_group
+                if description in fetched
+            }
 
-                # 条件を満たした場合アラート対象とする
-                judge_func = self.__db.get_judge_func(description)
-                if judge_func(price):
-                    alert_target_descriptions.append(description)
+            # 条件を満たした銘柄をまとめて判定する
+            triggered_descriptions = \
+                self.__db.get_triggered_descriptions(prices)
+            crossed = self.__db.get_crossed_rules({
+                description: prices[description]
+                for description in triggered_descriptions
+            })
+            # 指標によるルールを判定し、価格による判定結果に加える
+            # (昼休み・大引け後は取得済みの価格のため、同じ価格で指標を更新せず、
+            # 翌取引日の前日終値とするため価格のみ記録する)
+            indicator_crossed = {}
+            indicator_rules = self.__db.get_indicator_rules(list(prices))
+            if action != IMarketCalendar.reuse:
+                indicator_crossed = \
+                    self.__indicator.judge(prices, indicator_rules)
+            else:
+                self.__indicator.record({
+                    description: prices[description]
+                    for description in indicator_rules
+                })
+            for description, rules in indicator_crossed.items():
+                crossed[description] = crossed.get(description, []) + rules
+            # 通知済みでない基準を超えた銘柄だけを、アラート対象とする
+            alert_target_descriptions = self.__state.judge(prices, crossed)
             # アラートの送信
-            self.alert(alert_target_descriptions)
+            sent = self.alert(
+                {
+                    description: prices[description]
+                    for description in alert_target_descriptions
+                },
+                crossed
+            )
+            if not sent:
+                undelivered_descriptions.extend(alert_target_descriptions)
+
+        if skipped:
+            self.fail_summary(skipped)
+
+        # 取得失敗・終了メッセージを、まとめて送信
+        self.__outbox.append(self.end_message)
+        undelivered = self.flush()
 
-        # 終了メッセージの出力
-        self.send_message(self.end_message)
+        # 通知できなかった銘柄は、新たに超えた基準を次回も通知対象とする
+        # (バックグラウンドで送信する場合は、送信待ちがなくなるまで保存しない
+        # 戻った基準を未通知に戻す状態の変化は、通知の成否によらず保存する)
+        undelivered_descriptions.extend(
+            self.get_undelivered_descriptions(undelivered)
+        )
+        self.__state.commit(undelivered_descriptions)
+
+        # 価格の取得状況・通知の送信状況をログに出力
+        for message, stats in (
+            (self.stats_message, self.__price.get_stats()),
+            (self.alert_stats_message, self.__alert.get_stats()),
+        ):
+            if stats:
+                self.__logger.info(message.format(', '.join(
+                    f'{key}={value}' for key, value in stats.items()
+                )))
 
     def send_message(self, message: str):
         try:
@@ -62,22 +181,77 @@ class Main:
         except AlertException as ex:
             self.__logger.exception(ex)
 
-    def alert(self, descriptions: list):
-        messages = \
-            [self.__db.make_alert_message(code) for code in descriptions]
-        message = '\n'.join(messages)
-        if not message:
-            message = self.no_alert_description_message
+    def send_messages(self, messages: list):
         try:
-            self.__alert.send_message(message)
+            self.__alert.send_messages(messages)
         except AlertException as ex:
             self.__logger.exception(ex)
 
-    def fail(self, description: int):
+    def flush(self) -> list:
+        """
+        ためておいた通知メッセージを、まとめて送信する
+        (バックグラウンドで送信する場合は、期限まで送信を待ち、
+        送信できなかったメッセージをログに出力して返す)
+        """
+        messages, self.__outbox = self.__outbox, []
+        if messages:
+            self.send_messages(messages)
+        undelivered = self.__alert.flush()
+        if undelivered:
+            self.__logger.error(self.undelivered_message.format(
+                len(undelivered),
+                '\n'.join(undelivered)
+            ))
+        return undelivered
+
+    def get_undelivered_descriptions(self, undelivered: list) -> list:
+        """
+        送信できなかったテキストから、通知できなかった銘柄を取得する
+        (通知先がまとめた・分けたテキストも、行で突き合わせる)
+        """
+        lines = {
+            line
+            for text in undelivered for line in text.split('\n')
+            if line.strip()
+        }
+        return [
+            description
+            for description, message in self.__alerted.items()
+            if any(line in lines for line in message.split('\n'))
+        ]
+
+    def alert(self, prices: dict, crossed: dict = None) -> bool:
+        # 超えた基準・条件を満たした指標が分かっている場合は、それを通知する
+        crossed = crossed or {}
+        messages = [
+            self.__db.make_alert_message(code, price, crossed.get(code))
+            for code, price in prices.items()
+        ]
+        self.__alerted.update(zip(prices, messages))
+        if not messages:
+            messages = [self.no_alert_description_message]
         try:
-            self.__alert.send_message(self.__db.make_fail_message(description))
+            # 通知先で、送信回数が少なくなるようにまとめる
+            self.__alert.send_messages(messages)
         except AlertException as ex:
             self.__logger.exception(ex)
+            return False
+        return True
+
+    def fail_summary(self, descriptions: list):
+        codes = ', '.join(
+            str(description)
+            for description in descriptions[:self.fail_summary_limit]
+        )
+        if len(descriptions) > self.fail_summary_limit:
+            codes += ' ...'
+        message = self.fail_summary_message.format(len(descriptions), codes)
+        self.__logger.error(message)
+        self.__outbox.append(message)
+
+    def fail(self, description: int):
+        # 取得失敗のメッセージは、終了時にまとめて送信する
+        self.__outbox.append(self.__db.make_fail_message(description))
 
 
 def execute():
@@ -86,6 +260,9 @@ def execute():
             DbDiModule(),
             PriceDiModule(),
             AlertDiModule(),
+            AlertStateDiModule(),
+            IndicatorDiModule(),
+            MarketCalendarDiModule(),
             LoggerDiModule()
         ])
     main = injector.get(Main)
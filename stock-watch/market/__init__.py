@@ -0,0 +1,3 @@
+from .interface import IMarketCalendar
+from .tse import TseCalendar
+from .none import NoMarketCalendar
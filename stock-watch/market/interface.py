@@ -0,0 +1,69 @@
+from abc import ABCMeta
+from abc import abstractmethod
+from datetime import datetime
+
+
+class IMarketCalendar(metaclass=ABCMeta):
+    # 株価チェックの実行方法
+    # fetch: 取引時間中のため、株価を取得する
+    # reuse: 昼休み・大引け後のため、取得済みの価格を使う
+    #        (キャッシュにない場合のみ取得する)
+    # skip: 休場日・取引開始前のため、株価チェックを行わない
+    fetch = 'fetch'
+    reuse = 'reuse'
+    skip = 'skip'
+
+    @abstractmethod
+    def is_open(self, now: datetime) -> bool:
+        """
+        取引時間中(価格が変わりうる時間)かどうかを判定する
+
+        Params
+        -------
+        now: datetime
+            判定する日時
+
+        Returns
+        -------
+        0: bool
+            取引時間中かどうか
+
+        """
+        pass
+
+    @abstractmethod
+    def get_next_open(self, now: datetime) -> datetime:
+        """
+        次に取引が始まる日時を取得する
+
+        Params
+        -------
+        now: datetime
+            基準とする日時
+
+        Returns
+        -------
+        0: datetime
+            次に取引が始まる日時
+            (取引時間中の場合は、基準とする日時)
+
+        """
+        pass
+
+    @abstractmethod
+    def get_action(self, now: datetime = None) -> str:
+        """
+        株価チェックの実行方法を判定する
+
+        Params
+        -------
+        now: datetime
+            判定する日時 (未指定の場合は現在日時)
+
+        Returns
+        -------
+        0: str
+            実行方法 (fetch, reuse, skip)
+
+        """
+        pass
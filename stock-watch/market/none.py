@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from .interface import IMarketCalendar
+
+
+class NoMarketCalendar(IMarketCalendar):
+    """
+    取引時間を考慮せず、常に取引時間中とする
+    """
+
+    def is_open(self, now: datetime) -> bool:
+        return True
+
+    def get_next_open(self, now: datetime) -> datetime:
+        return now
+
+    def get_action(self, now: datetime = None) -> str:
+        return self.fetch
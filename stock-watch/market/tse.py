@@ -0,0 +1,100 @@
+import csv
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from datetime import timezone
+from os import path
+from typing import Dict
+from typing import Optional
+
+from .interface import IMarketCalendar
+
+
+class TseCalendar(IMarketCalendar):
+    """
+    東京証券取引所の取引時間
+
+    取引時間は前場(9:00-11:30)・後場(12:30-大引け)とし、
+    土日と、休業日の一覧に記載された日は休場とする
+    (休業日の一覧はパッケージに同梱し、オフラインで判定する)
+    """
+    holiday_file = path.join(path.dirname(__file__), 'holidays.csv')
+    jst = timezone(timedelta(hours=9))
+    open_time = time(9, 0)
+    break_start = time(11, 30)
+    break_end = time(12, 30)
+    # 大引けの時刻 (変更された日と、変更後の時刻)
+    close_times = (
+        (date.min, time(15, 0)),
+        (date(2024, 11, 5), time(15, 30)),
+    )
+
+    def __init__(self, holiday_file: str = None):
+        # 日付をキーとした大引けの時刻 (終日休場の場合はNone)
+        self.__holidays: Dict[date, Optional[time]] = {}
+        with open(holiday_file or self.holiday_file, encoding='utf-8') as f:
+            lines = (line for line in f if not line.startswith('#'))
+            for row in csv.DictReader(lines):
+                close = row['close'].strip()
+                self.__holidays[date.fromisoformat(row['date'])] = \
+                    time.fromisoformat(close) if close else None
+
+    def is_trading_day(self, day: date) -> bool:
+        if day.weekday() >= 5:
+            return False
+        return day not in self.__holidays or \
+            self.__holidays[day] is not None
+
+    def get_close_time(self, day: date) -> time:
+        """
+        大引けの時刻を取得する (半日立会の場合は、その大引けの時刻)
+        """
+        close = self.__holidays.get(day)
+        if close is not None:
+            return close
+        for changed, close_time in self.close_times:
+            if day >= changed:
+                close = close_time
+        return close
+
+    def is_open(self, now: datetime) -> bool:
+        now = now.astimezone(self.jst)
+        day = now.date()
+        if not self.is_trading_day(day):
+            return False
+        current = now.time()
+        close = self.get_close_time(day)
+        if close <= self.break_start:
+            # 半日立会の場合は、前場のみ
+            return self.open_time <= current < close
+        return self.open_time <= current < self.break_start or \
+            self.break_end <= current < close
+
+    def get_next_open(self, now: datetime) -> datetime:
+        now = now.astimezone(self.jst)
+        if self.is_open(now):
+            return now
+        day = now.date()
+        current = now.time()
+        if self.is_trading_day(day):
+            if current < self.open_time:
+                return datetime.combine(day, self.open_time, tzinfo=self.jst)
+            if self.break_start <= current < self.break_end and \
+                    self.get_close_time(day) > self.break_start:
+                return datetime.combine(day, self.break_end, tzinfo=self.jst)
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, self.open_time, tzinfo=self.jst)
+
+    def get_action(self, now: datetime = None) -> str:
+        now = (now or datetime.now(self.jst)).astimezone(self.jst)
+        if self.is_open(now):
+            return self.fetch
+        day = now.date()
+        if not self.is_trading_day(day) or now.time() < self.open_time:
+            # 前の取引日の終値から変わっていない
+            return self.skip
+        # 昼休み・大引け後は、取得済みの価格を使う
+        return self.reuse
@@ -1,2 +1,7 @@
 from .interface import IPrice
 from .kabutan import PriceByKabutan
+from .recorded import RecordedPrice
+from .cached import CachedPrice
+from .kabutan_list import PriceByKabutanList
+from .hedged import HedgedPrice
+from .breaker import BreakerPrice
@@ -0,0 +1,216 @@
+from concurrent.futures import Future
+from concurrent.futures import wait
+from decimal import Decimal
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import requests
+
+from breaker import CircuitBreaker
+from exceptions import PriceCircuitOpenException
+from exceptions import PriceException
+from .interface import IPrice
+
+
+class BreakerPrice(IPrice):
+    """
+    取得元の障害時に、価格の取得を遮断する
+
+    連続して取得元の障害(接続できない・タイムアウト・5xx・429)で失敗した場合は、
+    取得元に要求せずにすぐ失敗とし(PriceCircuitOpenException)、
+    最後に取得できた銘柄で回復を確認する
+    (上場廃止の銘柄の404・ページの解析の失敗などは、銘柄ごとの失敗として数えない)
+
+    iter_dataは、取得元のiter_data(受信と解析のパイプラインなど)で取得し、
+    遮断を一定の銘柄数ずつ判定する
+    """
+    # 遮断を判定する銘柄数 (並行して取得する銘柄数の倍数)
+    # (遮断した時点で、要求済みの銘柄は最大でこの2倍)
+    batch_factor = 4
+    # 取得元の障害とする、HTTPのステータスコード (5xx以外)
+    failure_status_codes = (429, )
+
+    def __init__(
+        self,
+        price: IPrice,
+        concurrency: int = 1,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0
+    ):
+        """
+        Params
+        -------
+        price: IPrice
+            価格の取得元
+        concurrency: int
+            並行して取得する銘柄数
+        failure_threshold: int
+            遮断する、連続して失敗した回数
+        recovery_timeout: float
+            回復を確認する間隔(秒)
+        """
+        self.__price = price
+        self.__concurrency = max(concurrency, 1)
+        self.__last_failed: int = None
+        self.__last_succeeded: int = None
+        self.__breaker = CircuitBreaker(
+            failure_threshold,
+            recovery_timeout,
+            probe=self.__probe
+        )
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    def get_data(self, description: int) -> Decimal:
+        if not self.__breaker.allow():
+            raise PriceCircuitOpenException(
+                f'取得元を遮断中のため、取得しませんでした。 銘柄コード: {description}'
+            )
+        try:
+            price = self.__price.get_data(description)
+        except PriceException as ex:
+            self.__record_exception(description, ex)
+            raise
+        self.__record_success(description)
+        return price
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        # 遮断した時点で残りの銘柄を要求せずに済むよう、一定の銘柄数ずつ要求し、
+        # 2つ前の銘柄の結果が出るまで、次の銘柄は要求しない
+        size = self.__concurrency * self.batch_factor
+        batches = []
+        for i in range(0, len(descriptions), size):
+            if len(batches) >= 2:
+                yield from self.__finish(*batches.pop(0))
+            batches.append(self.__start(descriptions[i:i + size]))
+        for batch in batches:
+            yield from self.__finish(*batch)
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        # まとめて取得できなかった銘柄は、1銘柄ずつの取得で判定する
+        if self.__breaker.state != CircuitBreaker.closed:
+            return {}
+        return self.__price.get_many(descriptions)
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = self.__price.get_stats()
+        stats.update(self.__breaker.get_stats())
+        return stats
+
+    def __start(
+        self,
+        descriptions: List[int]
+    ) -> Tuple[List[Future], Iterator[Future]]:
+        # 遮断中の銘柄は要求せず、残りの銘柄を取得元のiter_dataで要求する
+        allowed = [self.__breaker.allow() for _ in descriptions]
+        results = iter(self.__price.iter_data([
+            description
+            for description, allow in zip(descriptions, allowed)
+            if allow
+        ]))
+        futures = []
+        for description, allow in zip(descriptions, allowed):
+            if allow:
+                future = next(results)
+                future.add_done_callback(
+                    lambda future, description=description:
+                        self.__record(description, future)
+                )
+            else:
+                future = Future()
+                future.set_exception(PriceCircuitOpenException(
+                    '取得元を遮断中のため、取得しませんでした。 '
+                    f'銘柄コード: {description}'
+                ))
+            futures.append(future)
+        return futures, results
+
+    def __finish(
+        self,
+        futures: List[Future],
+        results: Iterator[Future]
+    ) -> Iterator[Future]:
+        yield from futures
+        wait(futures)
+        # 取得元のiter_dataの終了処理(検証情報の保存など)を行う
+        for _ in results:
+            pass
+
+    def __record(self, description: int, future: Future):
+        if future.cancelled():
+            # 取得元の応答がないまま取り消した場合は、どちらにも数えない
+            return
+        ex = future.exception()
+        if ex is not None:
+            self.__record_exception(description, ex)
+        else:
+            self.__record_success(description)
+
+    def __record_exception(self, description: int, ex: BaseException):
+        if not self.is_provider_failure(ex):
+            # 取得元は応答しているため、成功として数える
+            self.__record_success(description)
+            return
+        self.__last_failed = description
+        self.__breaker.record_failure()
+
+    def __record_success(self, description: int):
+        self.__last_succeeded = description
+        self.__breaker.record_success()
+
+    def __probe(self):
+        # 銘柄ごとの理由で失敗し続ける銘柄で確認しないよう、
+        # 最後に取得できた銘柄で確認する
+        description = self.__last_succeeded
+        if description is None:
+            description = self.__last_failed
+        try:
+            self.__price.get_data(description)
+        except PriceException as ex:
+            if self.is_provider_failure(ex):
+                raise
+
+    @classmethod
+    def is_provider_failure(cls, ex: BaseException) -> bool:
+        """
+        取得元の障害による失敗かを判定する
+
+        Params
+        -------
+        ex: BaseException
+            取得に失敗した例外 (PriceExceptionの場合、元の例外で判定する)
+
+        Returns
+        -------
+        0: bool
+            接続できない・タイムアウト・5xx・429の場合True
+        """
+        seen = set()
+        while ex is not None and id(ex) not in seen:
+            seen.add(id(ex))
+            if isinstance(ex, requests.exceptions.HTTPError):
+                response = ex.response
+                return response is not None and (
+                    response.status_code >= 500 or
+                    response.status_code in cls.failure_status_codes
+                )
+            if isinstance(ex, (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.RetryError,
+                ConnectionError,
+                TimeoutError,
+            )):
+                return True
+            # PriceExceptionは、元の例外を引数・原因に持つ
+            cause = ex.__cause__
+            if cause is None and ex.args and \
+                    isinstance(ex.args[0], BaseException):
+                cause = ex.args[0]
+            ex = cause
+        return False
@@ -0,0 +1,261 @@
+import sqlite3
+import sys
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from datetime import timedelta
+from decimal import Decimal
+from threading import Lock
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from market import IMarketCalendar
+from market import TseCalendar
+from .interface import IPrice
+
+
+class CachedPrice(IPrice):
+    """
+    取得した価格を、有効期限までキャッシュする
+
+    取引時間中に取得した価格は、取得から有効期間(秒)の間有効とし、
+    取引時間外(昼休み・大引け後・取引開始前・休場日)に取得した価格は、
+    値が変わらないため次の取引開始まで有効とする
+
+    キャッシュは件数・メモリ使用量の上限を超えた場合、
+    最も長く使われていない価格から削除する(LRU)
+    また、次回の起動でも使えるようSQLiteのファイルに保持する
+    """
+    cache_file = '../config/price_cache.db'
+    jst = TseCalendar.jst
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS price_cache ('
+        ' description INTEGER PRIMARY KEY,'
+        ' price TEXT NOT NULL,'
+        ' expires REAL NOT NULL'
+        ')',
+    )
+
+    select_cache = \
+        'SELECT description, price, expires FROM price_cache' \
+        ' WHERE expires > ? ORDER BY expires'
+    delete_expired = 'DELETE FROM price_cache WHERE expires <= ?'
+    upsert_cache = \
+        'INSERT OR REPLACE INTO price_cache (description, price, expires)' \
+        ' VALUES (?, ?, ?)'
+    delete_cache = 'DELETE FROM price_cache WHERE description = ?'
+
+    def __init__(
+        self,
+        price: IPrice,
+        ttl: float = 0.0,
+        max_entries: int = 10000,
+        max_bytes: int = 1024 * 1024,
+        cache_file: str = None,
+        calendar: IMarketCalendar = None
+    ):
+        """
+        Params
+        -------
+        price: IPrice
+            価格の取得元
+        ttl: float
+            取引時間中に取得した価格の有効期間(秒)
+        max_entries: int
+            キャッシュする価格の件数の上限
+        max_bytes: int
+            キャッシュする価格のメモリ使用量の上限(バイト)
+        cache_file: str
+            キャッシュを保持するファイル
+            (":memory:"の場合、ファイルに保持しない)
+        calendar: IMarketCalendar
+            取引時間 (未指定の場合、東京証券取引所の取引時間)
+        """
+        self.__price = price
+        self.__ttl = timedelta(seconds=ttl)
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__calendar = calendar or TseCalendar()
+        # 銘柄コードをキーとした(価格, 有効期限)を、使われた順に保持する
+        self.__entries: OrderedDict[int, Tuple[Decimal, float]] = OrderedDict()
+        self.__bytes = 0
+        self.__lock = Lock()
+        self.__stats = {
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'cache_evictions': 0,
+        }
+        self.__connection = sqlite3.connect(
+            cache_file or self.cache_file,
+            check_same_thread=False
+        )
+        with self.__connection:
+            for sql in self.schema:
+                self.__connection.execute(sql)
+        self.__load()
+
+    def get_data(self, description: int) -> Decimal:
+        now = datetime.now(self.jst)
+        price = self.__get_cache(description, now.timestamp())
+        if price is not None:
+            return price
+        price = self.__price.get_data(description)
+        self.__set_caches({description: price}, now)
+        return price
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        now = datetime.now(self.jst)
+        cached = {}
+        for description in descriptions:
+            price = self.__get_cache(description, now.timestamp())
+            if price is not None:
+                cached[description] = price
+        misses = [
+            description for description in descriptions
+            if description not in cached
+        ]
+        futures = dict(zip(misses, self.__price.iter_data(misses)))
+
+        # キャッシュした価格と取得した価格を、銘柄コードの順に返す
+        # (呼び出し元は最後まで読むとは限らないため、取得した価格は
+        # 返す前にキャッシュする)
+        for description in descriptions:
+            if description in cached:
+                future = Future()
+                future.set_result(cached[description])
+            else:
+                future = futures[description]
+                if future.exception() is None:
+                    self.__set_caches({description: future.result()}, now)
+            yield future
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        now = datetime.now(self.jst)
+        prices = {}
+        for description in descriptions:
+            # キャッシュにない銘柄は、続けてiter_dataで取得される場合があるため、
+            # ここではキャッシュミスとして数えない
+            price = self.__get_cache(description, now.timestamp(), False)
+            if price is not None:
+                prices[description] = price
+        fetched = self.__price.get_many([
+            description for description in descriptions
+            if description not in prices
+        ])
+        with self.__lock:
+            self.__stats['cache_misses'] += len(fetched)
+        self.__set_caches(fetched, now)
+        prices.update(fetched)
+        return prices
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = self.__price.get_stats()
+        with self.__lock:
+            stats.update(self.__stats)
+            stats['cache_entries'] = len(self.__entries)
+            stats['cache_bytes'] = self.__bytes
+        return stats
+
+    def get_expires(self, fetched: datetime) -> datetime:
+        """
+        価格の有効期限を取得する
+
+        Params
+        -------
+        fetched: datetime
+            価格を取得した日時
+
+        Returns
+        -------
+        0: datetime
+            有効期限
+        """
+        fetched = fetched.astimezone(self.jst)
+        if self.__calendar.is_open(fetched):
+            return fetched + self.__ttl
+        # 取引時間外に取得した価格は、次の取引開始まで変わらない
+        return max(
+            fetched + self.__ttl,
+            self.__calendar.get_next_open(fetched)
+        )
+
+    def __get_cache(
+        self,
+        description: int,
+        now: float,
+        count_miss: bool = True
+    ) -> Decimal:
+        with self.__lock:
+            entry = self.__entries.get(description)
+            if entry is None or entry[1] <= now:
+                if count_miss:
+                    self.__stats['cache_misses'] += 1
+                return None
+            self.__entries.move_to_end(description)
+            self.__stats['cache_hits'] += 1
+            return entry[0]
+
+    def __set_caches(self, prices: Dict[int, Decimal], now: datetime):
+        if not prices:
+            return
+        expires = self.get_expires(now).timestamp()
+        with self.__lock:
+            for description, price in prices.items():
+                self.__put(description, price, expires)
+            evicted = self.__evict()
+            with self.__connection:
+                self.__connection.executemany(
+                    self.upsert_cache,
+                    (
+                        (description, str(price), expires)
+                        for description, price in prices.items()
+                        if description in self.__entries
+                    )
+                )
+                self.__connection.executemany(
+                    self.delete_cache,
+                    ((description, ) for description in evicted)
+                )
+
+    def __put(self, description: int, price: Decimal, expires: float):
+        old = self.__entries.pop(description, None)
+        if old is not None:
+            self.__bytes -= self.__get_size(description, old[0])
+        self.__entries[description] = (price, expires)
+        self.__bytes += self.__get_size(description, price)
+
+    def __evict(self) -> List[int]:
+        # 件数・メモリ使用量の上限を超えた分を、使われていない順に削除する
+        evicted = []
+        while self.__entries and (
+            len(self.__entries) > self.__max_entries
+            or self.__bytes > self.__max_bytes
+        ):
+            description, (price, _) = self.__entries.popitem(last=False)
+            self.__bytes -= self.__get_size(description, price)
+            evicted.append(description)
+        self.__stats['cache_evictions'] += len(evicted)
+        return evicted
+
+    @staticmethod
+    def __get_size(description: int, price: Decimal) -> int:
+        # キー・値・有効期限と、それらを保持するタプルの大きさ
+        return sys.getsizeof(description) + sys.getsizeof(price) + \
+            sys.getsizeof(0.0) + sys.getsizeof((price, 0.0))
+
+    def __load(self):
+        now = datetime.now(self.jst).timestamp()
+        with self.__connection:
+            self.__connection.execute(self.delete_expired, (now, ))
+            cursor = self.__connection.execute(self.select_cache, (now, ))
+            for description, price, expires in cursor:
+                self.__put(description, Decimal(price), expires)
+            evicted = self.__evict()
+            self.__connection.executemany(
+                self.delete_cache,
+                ((description, ) for description in evicted)
+            )
+        self.__stats['cache_evictions'] = 0
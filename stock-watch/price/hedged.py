@@ -0,0 +1,286 @@
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from decimal import Decimal
+from threading import Lock
+from typing import Dict
+from typing import Iterator
+from typing import List
+
+from .interface import IPrice
+from exceptions import PriceException
+
+
+class LatencyHistogram:
+    """
+    取得にかかった時間の分布
+
+    時間は倍々に区切った区間ごとの件数で数え、
+    分位点は区間の上限で近似する
+    """
+    # 区間の上限(秒)
+    bounds = (
+        0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 6.4, 12.8
+    )
+
+    def __init__(self):
+        # 最後の区間は、上限を超えたもの
+        self.__counts = [0] * (len(self.bounds) + 1)
+        self.__total = 0
+        self.__lock = Lock()
+
+    @property
+    def count(self) -> int:
+        return self.__total
+
+    def add(self, seconds: float):
+        with self.__lock:
+            self.__counts[bisect_left(self.bounds, seconds)] += 1
+            self.__total += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        分位点を取得する
+
+        Params
+        -------
+        q: float
+            分位 (0〜1)
+
+        Returns
+        -------
+        0: float
+            分位点(秒) (件数がない場合はNone、上限を超えた場合はinf)
+        """
+        with self.__lock:
+            if not self.__total:
+                return None
+            rank = q * self.__total
+            cumulative = 0
+            for bound, count in zip(self.bounds, self.__counts):
+                cumulative += count
+                if cumulative >= rank:
+                    return bound
+            return float('inf')
+
+
+class HedgedPrice(IPrice):
+    """
+    複数の取得元から、最初に取得できた価格を返す
+
+    取得元は指定された順に使い、最初の取得元が一定時間内に応答しない場合は、
+    次の取得元にも同じ銘柄を要求する(ヘッジ)
+    取得元が1つの場合(既定の構成では、kabutanの銘柄ページのみ)は、
+    同じ取得元にもう一度要求する
+    (get_hedge_dataで、応答の遅い要求の接続の空きを待たずに要求する)
+    最初に取得できた正しい価格を返し、残りの要求は取り消す
+    (送信済みの要求は、結果を使わない)
+
+    ヘッジするまでの時間は、取得元ごとにかかった時間の分布の分位点(既定は95%)とし、
+    失敗した場合は待たずに次の取得元に要求する
+
+    iter_dataは、最初の取得元のiter_data(受信と解析のパイプラインなど)で取得し、
+    一定時間内に完了しない銘柄をヘッジする
+    (取得元で送信を待つ時間を含めないよう、並行して取得する銘柄数ずつ要求し、
+    かかった時間は、要求した時点からの時間で数える)
+    """
+    # 分布の件数がこれより少ない間は、既定の時間でヘッジする
+    min_samples = 20
+    default_delay = 1.0
+    # ヘッジするまでの時間の下限・上限(秒)
+    min_delay = 0.05
+    max_delay = 5.0
+
+    def __init__(
+        self,
+        providers: List[IPrice],
+        concurrency: int = 1,
+        quantile: float = 0.95
+    ):
+        """
+        Params
+        -------
+        providers: List[IPrice]
+            優先する順の、価格の取得元
+        concurrency: int
+            並行して取得する銘柄数
+        quantile: float
+            ヘッジするまでの時間とする、かかった時間の分位 (0〜1)
+        """
+        if not providers:
+            raise ValueError('価格の取得元が指定されていません。')
+        self.__providers = list(providers)
+        self.__histograms = [LatencyHistogram() for _ in self.__providers]
+        self.__attempts = max(len(self.__providers), 2)
+        self.__concurrency = max(concurrency, 1)
+        self.__quantile = quantile
+        self.__executor = ThreadPoolExecutor(
+            max_workers=self.__concurrency * self.__attempts
+        )
+        # iter_dataで、要求した銘柄の結果をそれぞれ待ち、ヘッジするスレッド
+        self.__watchers = ThreadPoolExecutor(max_workers=self.__concurrency)
+        # ヘッジした・ヘッジした要求が先に応答した・失敗して次の取得元に要求した回数
+        self.__stats = {'hedged': 0, 'hedge_wins': 0, 'fallbacks': 0}
+        self.__stats_lock = Lock()
+
+    def get_data(self, description: int) -> Decimal:
+        return self.__get_data(description)
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        size = self.__concurrency
+        for i in range(0, len(descriptions), size):
+            batch = descriptions[i:i + size]
+            results = self.__providers[0].iter_data(batch)
+            started = time.monotonic()
+            # 銘柄ごとに、要求した時点から一定時間内に完了しなければヘッジする
+            # (結果を読まれる順を待たずに、並行して待つ)
+            futures = [
+                self.__watchers.submit(
+                    self.__get_data,
+                    description,
+                    self.__track(0, first, started),
+                    started
+                )
+                for description, first in zip(batch, results)
+            ]
+            yield from futures
+            wait(futures)
+            # 取得元のiter_dataの終了処理(検証情報の保存など)を行う
+            for _ in results:
+                pass
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        # まとめて取得できなかった銘柄は、次の取得元から取得する
+        prices = {}
+        for provider in self.__providers:
+            missing = [
+                description for description in descriptions
+                if description not in prices
+            ]
+            if not missing:
+                break
+            prices.update(provider.get_many(missing))
+        return prices
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = {}
+        for provider in self.__providers:
+            stats.update(provider.get_stats())
+        with self.__stats_lock:
+            stats.update(self.__stats)
+        stats['hedge_delay_ms'] = int(self.get_delay(0) * 1000)
+        return stats
+
+    def get_delay(self, index: int) -> float:
+        """
+        取得元に要求してから、ヘッジするまでの時間を取得する
+
+        Params
+        -------
+        index: int
+            取得元の順番
+
+        Returns
+        -------
+        0: float
+            ヘッジするまでの時間(秒)
+        """
+        histogram = self.__histograms[index]
+        if histogram.count < self.min_samples:
+            return self.default_delay
+        delay = histogram.quantile(self.__quantile)
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def __get_data(
+        self,
+        description: int,
+        first: Future = None,
+        started: float = None
+    ) -> Decimal:
+        # 要求の結果と、何回目の要求か
+        # (最初の要求の結果が指定された場合は、それを最初の要求とし、
+        # 要求した時点からヘッジするまでの時間を数える)
+        pending: Dict[Future, int] = {}
+        errors = []
+        for attempt in range(self.__attempts):
+            if attempt:
+                self.__count('hedged' if pending else 'fallbacks')
+            index = attempt % len(self.__providers)
+            if attempt == 0 and first is not None:
+                future = first
+            else:
+                future = self.__submit(index, description, attempt)
+                started = None
+            pending[future] = attempt
+
+            # 最後の要求では、すべての結果が出るまで待つ
+            timeout = self.get_delay(index) \
+                if attempt + 1 < self.__attempts else None
+            deadline = (started or time.monotonic()) + (timeout or 0)
+            while pending:
+                if timeout is not None:
+                    timeout = max(deadline - time.monotonic(), 0)
+                done = wait(
+                    pending,
+                    timeout=timeout,
+                    return_when=FIRST_COMPLETED
+                )[0]
+                if not done:
+                    # 応答を待たずに、次の取得元に要求する
+                    break
+                for future in done:
+                    answered = pending.pop(future)
+                    try:
+                        price = self.__validate(future.result())
+                    except PriceException as ex:
+                        errors.append(ex)
+                        continue
+                    for rest in pending:
+                        # 最初の取得元のiter_dataの結果は、取得元が完了する
+                        if rest is not first:
+                            rest.cancel()
+                    if answered:
+                        self.__count('hedge_wins')
+                    return price
+
+        raise PriceException(
+            f'すべての取得元で価格を取得できませんでした。 銘柄コード: {description}'
+        ) from (errors[-1] if errors else None)
+
+    def __submit(self, index: int, description: int, attempt: int) -> Future:
+        provider = self.__providers[index]
+        # 同じ取得元への2回目以降の要求は、取得し直しとして要求する
+        get_data = provider.get_data if attempt < len(self.__providers) \
+            else provider.get_hedge_data
+        return self.__track(
+            index,
+            self.__executor.submit(get_data, description)
+        )
+
+    def __track(
+        self,
+        index: int,
+        future: Future,
+        started: float = None
+    ) -> Future:
+        # かかった時間は、要求した時点から数える
+        started = started or time.monotonic()
+
+        def record(future: Future):
+            # 取り消さなかった要求は、結果を使わない場合もかかった時間を数える
+            if not future.cancelled() and future.exception() is None:
+                self.__histograms[index].add(time.monotonic() - started)
+        future.add_done_callback(record)
+        return future
+
+    def __validate(self, price: Decimal) -> Decimal:
+        if price is None or not price > 0:
+            raise PriceException(f'価格が不正です。 価格: {price}')
+        return price
+
+    def __count(self, key: str):
+        with self.__stats_lock:
+            self.__stats[key] += 1
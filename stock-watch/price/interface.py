@@ -1,6 +1,12 @@
 from abc import ABCMeta
 from abc import abstractmethod
+from concurrent.futures import Future
 from decimal import Decimal
+from typing import Dict
+from typing import Iterator
+from typing import List
+
+from exceptions import PriceException
 
 
 class IPrice(metaclass=ABCMeta):
@@ -26,3 +32,91 @@ class IPrice(metaclass=ABCMeta):
 
         """
         pass
+
+    def get_hedge_data(self, description: int) -> Decimal:
+        """
+        応答の遅い要求を待たずに、同じ銘柄の価格を取得し直す(ヘッジ)
+
+        Params
+        -------
+        description: int
+            銘柄コード
+
+        Returns
+        -------
+        0: decimal.Decimal
+            価格
+
+        Remarks
+        -------
+        既定ではget_dataと同じ
+        (同時接続数を制限する実装では、遅い要求の空きを待たないようにオーバーライドする)
+        取得できなかった場合には、例外発生
+
+        """
+        return self.get_data(description)
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        """
+        指定された銘柄コードの価格を、銘柄コードの順に取得する
+
+        Params
+        -------
+        descriptions: List[int]
+            銘柄コードのリスト
+
+        Returns
+        -------
+        0: Iterator[concurrent.futures.Future]
+            銘柄コードの順の、価格の取得結果
+            (resultで価格を返す。取得できなかった場合にはPriceExceptionが発生)
+
+        Remarks
+        -------
+        既定では1銘柄ずつ順に取得する
+        (まとめて取得できる実装では、オーバーライドする)
+
+        """
+        for description in descriptions:
+            future = Future()
+            try:
+                future.set_result(self.get_data(description))
+            except PriceException as ex:
+                future.set_exception(ex)
+            yield future
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        """
+        指定された銘柄コードの価格を、まとめて取得する
+
+        Params
+        -------
+        descriptions: List[int]
+            銘柄コードのリスト
+
+        Returns
+        -------
+        0: Dict[int, Decimal]
+            銘柄コードをキーとした価格
+            (まとめて取得できなかった銘柄は含まない)
+
+        Remarks
+        -------
+        既定ではまとめて取得しない (空を返す)
+        含まれなかった銘柄は、iter_dataで1銘柄ずつ取得する
+
+        """
+        return {}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        価格の取得状況の統計を取得する
+
+        Returns
+        -------
+        0: Dict[str, int]
+            統計の項目名をキーとした値
+            (統計のない実装では空)
+
+        """
+        return {}
@@ -1,21 +1,209 @@
+import codecs
+import hashlib
+import os
+import re
+import sqlite3
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from threading import BoundedSemaphore
+from threading import Lock
+from threading import local
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from urllib.parse import urlsplit
 
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 from lxml import html as lxml_html
 
 from .interface import IPrice
 from exceptions import PriceException
+from session import PooledSession
+
+
+class Validator(NamedTuple):
+    """
+    前回取得したページの検証情報
+
+    Attributes
+    -------
+    etag: str
+        ETagヘッダの値
+    last_modified: str
+        Last-Modifiedヘッダの値
+    digest: bytes
+        価格の要素の周辺のハッシュ値
+    price: Decimal
+        前回取得した価格
+    """
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: Optional[bytes]
+    price: Decimal
 
 
 class PriceByKabutan(IPrice):
+    """
+    kabutanのページから価格を取得する
+
+    複数の銘柄は、ホストごとの同時接続数を上限として並行して取得する
+    (接続はセッションのプールから使い回す)
+
+    ページは少しずつ受信し、価格の要素を受信した時点で残りの受信をやめる
+    また、前回取得したページの検証情報(ETag・Last-Modified)で条件付きで取得し、
+    更新されていない場合・価格の要素の周辺が変わっていない場合は、
+    ページを解析せずに前回の価格を返す
+
+    解析方法(parse_mode)が"thread"・"process"の場合、受信と解析を分け、
+    受信したページ(価格の要素の周辺)をスレッド・プロセスのプールで解析する
+    (解析待ちのページ数には上限を設け、上限に達した場合は受信を待たせる)
+    """
+    url = 'https://kabutan.jp/stock/?code={}'
+    validator_file = '../config/price_validators.db'
+
+    price_id_pattern = re.compile(r'id\s*=\s*["\']?stockinfo_i1\b')
+    price_xpath = etree.XPath('//*[@id="stockinfo_i1"]/div[2]/span[2]')
+    price_pattern = re.compile(r'[0-9][0-9,]*(\.[0-9]+)?円')
+    # 価格の要素を探す、価格の要素の開始位置からの範囲(文字数)
+    scan_size = 4096
+    # lxmlのパーサはスレッド間で共有できないため、スレッドごとに作る
+    parsers = local()
+    # ページを受信する単位(バイト)
+    chunk_size = 8192
+    # 価格の要素より後の残りがこれ以下の場合、接続を使い回せるよう読み切る
+    drain_limit = 16 * 1024
+    # 解析方法
+    parse_modes = ('inline', 'thread', 'process')
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS validators ('
+        ' description INTEGER PRIMARY KEY,'
+        ' etag TEXT,'
+        ' last_modified TEXT,'
+        ' digest BLOB,'
+        ' price TEXT NOT NULL'
+        ')',
+    )
+
+    select_validators = \
+        'SELECT description, etag, last_modified, digest, price' \
+        ' FROM validators'
+    upsert_validator = \
+        'INSERT OR REPLACE INTO validators' \
+        ' (description, etag, last_modified, digest, price)' \
+        ' VALUES (?, ?, ?, ?, ?)'
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        session: PooledSession = None,
+        validator_file: str = None,
+        url: str = None,
+        parse_mode: str = 'inline',
+        parse_workers: int = 0
+    ):
+        """
+        Params
+        -------
+        concurrency: int
+            ホストごとの同時接続数の上限
+            (取得し直す(ヘッジ)要求は、別に同じ数まで接続する)
+        session: PooledSession
+            リクエストを送信するセッション
+        validator_file: str
+            ページの検証情報を保持するファイル
+            (未指定の場合、起動中のみ保持する)
+        url: str
+            銘柄ページのURL ({}を銘柄コードに置き換える)
+            (未指定の場合、kabutanのページ)
+        parse_mode: str
+            解析方法
+            "inline": 受信したスレッドで解析する
+            "thread": 解析用のスレッドのプールで解析する
+            "process": 解析用のプロセスのプールで解析する
+        parse_workers: int
+            解析用のプールのスレッド・プロセス数 (0の場合、CPU数)
+        """
+        if parse_mode not in self.parse_modes:
+            raise ValueError(f'解析方法が不正です。 解析方法: {parse_mode}')
+        self.__url = url or self.url
+        self.__parse_mode = parse_mode
+        self.__parse_workers = parse_workers or os.cpu_count() or 1
+        self.__parse_executor: Executor = None
+        self.__parse_lock = Lock()
+        # 解析待ちのページ数の上限
+        self.__parse_slots = BoundedSemaphore(self.__parse_workers * 2)
+        self.__concurrency = max(concurrency, 1)
+        self.__session = session or PooledSession(pool_size=self.__concurrency)
+        self.__host_slots: Dict[str, BoundedSemaphore] = {}
+        # 取得し直す要求は、応答の遅い要求の接続の空きを待たないように別に数える
+        self.__hedge_slots: Dict[str, BoundedSemaphore] = {}
+        self.__host_slots_lock = Lock()
+        # 受信を途中でやめたページ数と、受信した・受信せずに済んだバイト数
+        # (Content-Lengthがなく、受信せずに済んだバイト数が分からないページ数)
+        # (更新されていない・価格の要素の周辺が変わっていないページ数)
+        self.__transfer = {
+            'pages': 0,
+            'aborted': 0,
+            'bytes_read': 0,
+            'bytes_saved': 0,
+            'bytes_saved_unknown': 0,
+            'not_modified': 0,
+            'unchanged': 0,
+        }
+        self.__transfer_lock = Lock()
+        self.__validators: Dict[int, Validator] = {}
+        self.__updated_validators: Dict[int, Validator] = {}
+        self.__validators_lock = Lock()
+        self.__connection = sqlite3.connect(
+            validator_file or ':memory:',
+            check_same_thread=False
+        )
+        self.__load_validators()
+
     def get_data(self, description: int) -> Decimal:
         try:
-            return self.extract_price(
-                self.get_html(description)
-            )
-        except Exception as ex:
-            raise PriceException(ex) from ex
+            return self.__get_data(description)
+        finally:
+            self.__save_validators()
+
+    def get_hedge_data(self, description: int) -> Decimal:
+        try:
+            return self.__get_data(description, hedge=True)
+        finally:
+            self.__save_validators()
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        if not descriptions:
+            return
+        if self.__parse_mode != 'inline':
+            yield from self.__iter_data_by_pipeline(descriptions)
+            return
+        workers = min(self.__concurrency, len(descriptions))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.__get_data, description)
+                for description in descriptions
+            ]
+            self.__save_validators_when_done(futures)
+            # 取得の完了順ではなく、銘柄コードの順に返す
+            yield from futures
+
+    def close(self):
+        """
+        解析用のプールを終了する
+        """
+        if self.__parse_executor is not None:
+            self.__parse_executor.shutdown()
+            self.__parse_executor = None
 
     def get_html(self, description: int) -> str:
         """
@@ -29,12 +217,30 @@ class PriceByKabutan(IPrice):
         Returns
         -------
         0: str
-            取得したhtml
+            取得したhtml (ページの全体)
+
+        Remarks
+        -------
+        価格の取得とは異なり、価格の要素を受信した時点で受信をやめず、
+        検証情報による条件付きの取得も行わない
+        (ベンチマークのページの保存などに使う)
         """
-        url = 'https://kabutan.jp/stock/?code={}'.format(description)
-        response = requests.get(url)
+        url = self.__url.format(description)
+        with self.__get_host_slot(url, False):
+            response = self.__session.get(url)
+        response.raise_for_status()
         return response.text
 
+    def get_stats(self) -> Dict[str, int]:
+        with self.__transfer_lock:
+            stats = dict(self.__transfer)
+        stats.update(self.__session.get_stats())
+        return stats
+
+    @property
+    def session(self) -> PooledSession:
+        return self.__session
+
     def extract_price(self, html: str) -> Decimal:
         """
         htmlから価格を抽出する
@@ -49,9 +255,370 @@ class PriceByKabutan(IPrice):
         0: Decimal
             価格
         """
+        return self.__to_price(self.extract_price_text(html))
+
+    @classmethod
+    def extract_price_text(cls, html: str, scan_size: int = None) -> str:
+        """
+        htmlから価格の文字列を抽出する
+        (プロセスのプールで解析できるよう、インスタンスの状態を使わない)
+
+        Params
+        -------
+        html: str
+            抽出元html (価格の要素の周辺だけの場合もある)
+        scan_size: int
+            価格の要素を探す範囲(文字数) (未指定の場合、scan_size)
+
+        Returns
+        -------
+        0: str
+            価格の文字列 (例: 1,585円)
+        """
+        # 価格の要素の周辺だけを解析し、解析できなかった場合はページ全体を解析する
+        fragment = cls.__find_fragment(html, True, scan_size)
+        text = cls.__parse_fragment(fragment) if fragment else None
+        if text is None:
+            text = cls.extract_price_text_by_soup(html)
+        return text
+
+    @classmethod
+    def extract_price_text_by_soup(cls, html: str) -> str:
+        """
+        htmlの全体を解析して、価格の文字列を抽出する
+
+        Params
+        -------
+        html: str
+            抽出元html
+
+        Returns
+        -------
+        0: str
+            価格の文字列 (例: 1,585円)
+        """
         soup = BeautifulSoup(html, 'html.parser')
         lxml_data = lxml_html.fromstring(str(soup))
-        xpath = '//*[@id="stockinfo_i1"]/div[2]/span[2]'
-        element = lxml_data.xpath(xpath)[0]
-        price = element.text.replace('円', '').replace(',', '')
-        return Decimal(price)
+        element = cls.price_xpath(lxml_data)[0]
+        return element.text
+
+    def __iter_data_by_pipeline(
+        self,
+        descriptions: List[int]
+    ) -> Iterator[Future]:
+        # 受信用のスレッドは解析を待たずに次の銘柄を受信し、
+        # 解析の結果で、銘柄ごとのFutureを完了する
+        futures = [Future() for _ in descriptions]
+        self.__save_validators_when_done(futures)
+        workers = min(self.__concurrency, len(descriptions))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for description, future in zip(descriptions, futures):
+                executor.submit(self.__fetch_stage, description, future)
+            # 取得の完了順ではなく、銘柄コードの順に返す
+            yield from futures
+
+    def __fetch_stage(self, description: int, future: Future):
+        try:
+            with self.__validators_lock:
+                validator = self.__validators.get(description)
+            html, response, digest, _ = \
+                self.__download(description, validator, False)
+            if html is None:
+                future.set_result(validator.price)
+                return
+            # 解析待ちのページ数が上限に達している場合は、空くまで待つ
+            self.__parse_slots.acquire()
+            try:
+                parsed = self.__get_parse_executor().submit(
+                    PriceByKabutan.extract_price_text,
+                    html,
+                    self.scan_size
+                )
+            except Exception:
+                self.__parse_slots.release()
+                raise
+        except Exception as ex:
+            future.set_exception(PriceException(ex))
+            return
+        parsed.add_done_callback(
+            lambda parsed: self.__parse_stage_done(
+                parsed, description, response, digest, future
+            )
+        )
+
+    def __parse_stage_done(
+        self,
+        parsed: Future,
+        description: int,
+        response: requests.Response,
+        digest: bytes,
+        future: Future
+    ):
+        self.__parse_slots.release()
+        try:
+            price = self.__to_price(parsed.result())
+        except Exception as ex:
+            future.set_exception(PriceException(ex))
+            return
+        self.__set_validator(description, Validator(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest,
+            price
+        ))
+        future.set_result(price)
+
+    def __get_parse_executor(self) -> Executor:
+        with self.__parse_lock:
+            if self.__parse_executor is None:
+                executor_class = ProcessPoolExecutor \
+                    if self.__parse_mode == 'process' else ThreadPoolExecutor
+                self.__parse_executor = \
+                    executor_class(max_workers=self.__parse_workers)
+            return self.__parse_executor
+
+    def __get_data(self, description: int, hedge: bool = False) -> Decimal:
+        try:
+            with self.__validators_lock:
+                validator = self.__validators.get(description)
+            html, response, digest, text = \
+                self.__download(description, validator, hedge=hedge)
+            if html is None:
+                # 更新されていない・価格の要素の周辺が変わっていない場合
+                return validator.price
+            price = self.__to_price(text) if text is not None \
+                else self.extract_price(html)
+            self.__set_validator(description, Validator(
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                digest,
+                price
+            ))
+            return price
+        except Exception as ex:
+            raise PriceException(ex) from ex
+
+    def __download(
+        self,
+        description: int,
+        validator: Validator = None,
+        parse: bool = True,
+        hedge: bool = False
+    ) -> Tuple[Optional[str], requests.Response, bytes, Optional[str]]:
+        # 前回の検証情報がある場合は、条件付きで取得する
+        headers = {}
+        if validator is not None:
+            if validator.etag:
+                headers['If-None-Match'] = validator.etag
+            if validator.last_modified:
+                headers['If-Modified-Since'] = validator.last_modified
+
+        url = self.__url.format(description)
+        with self.__get_host_slot(url, hedge):
+            response = self.__session.get(url, headers=headers, stream=True)
+            try:
+                if response.status_code == 304 and validator is not None:
+                    self.__count('not_modified')
+                    return None, response, None, None
+                response.raise_for_status()
+                html, digest, text = self.__read_until_price(
+                    response,
+                    validator.digest if validator is not None else None,
+                    parse
+                )
+                return html, response, digest, text
+            finally:
+                response.close()
+
+    def __read_until_price(
+        self,
+        response: requests.Response,
+        last_digest: Optional[bytes],
+        parse: bool = True
+    ) -> Tuple[Optional[str], Optional[bytes], Optional[str]]:
+        # 解析しない場合は、価格の文字列がありそうな要素の周辺を返し、
+        # なさそうな場合はページの全体を返す (解析はパイプラインで行う)
+        # 文字コードの指定がない場合、kabutanのページと同じUTF-8とする
+        encoding = 'utf-8'
+        if 'charset' in response.headers.get('Content-Type', ''):
+            encoding = response.encoding
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        html = ''
+        digest = None
+        text = None
+        unchanged = False
+        # 解析せずに、価格の要素の周辺だけで受信をやめたか
+        found = False
+        chunks = response.iter_content(self.chunk_size)
+        while True:
+            chunk = next(chunks, None)
+            final = chunk is None
+            html += decoder.decode(chunk or b'', final=final)
+            # 価格の要素の周辺を受信した時点で、1回だけ判定する
+            fragment = self.__find_fragment(html, final) \
+                if digest is None else None
+            if fragment is not None:
+                digest = hashlib.blake2b(
+                    fragment.encode('utf-8'),
+                    digest_size=16
+                ).digest()
+                unchanged = digest == last_digest
+                if not unchanged and not parse:
+                    if self.price_pattern.search(fragment):
+                        html = fragment
+                        found = True
+                        break
+                elif not unchanged:
+                    text = self.__parse_fragment(fragment)
+                if unchanged or text is not None:
+                    break
+            if final:
+                break
+
+        # 圧縮されている場合も、実際に受信したバイト数で数える
+        bytes_read = response.raw.tell()
+        length = response.headers.get('Content-Length')
+        rest = int(length) - bytes_read if length is not None else None
+        aborted = False
+        if (unchanged or found or text is not None) and rest != 0:
+            if rest is not None and rest <= self.drain_limit:
+                for _ in chunks:
+                    pass
+                bytes_read = response.raw.tell()
+            else:
+                aborted = True
+
+        with self.__transfer_lock:
+            self.__transfer['pages'] += 1
+            self.__transfer['bytes_read'] += bytes_read
+            if aborted:
+                self.__transfer['aborted'] += 1
+                if rest is None:
+                    # チャンク形式などで、ページの大きさが分からない場合
+                    self.__transfer['bytes_saved_unknown'] += 1
+                else:
+                    self.__transfer['bytes_saved'] += rest
+            if unchanged:
+                self.__transfer['unchanged'] += 1
+        if unchanged:
+            return None, digest, None
+        return html, digest, text
+
+    @classmethod
+    def __find_fragment(
+        cls,
+        html: str,
+        final: bool,
+        scan_size: int = None
+    ) -> Optional[str]:
+        # 価格の要素の開始位置から、解析する範囲の文字列を取得する
+        # (受信の途中の場合、範囲の全体を受信するまではNone)
+        scan_size = cls.scan_size if scan_size is None else scan_size
+        match = cls.price_id_pattern.search(html)
+        if match is None:
+            return None
+        start = html.rfind('<', 0, match.start())
+        if start < 0:
+            return None
+        if not final and len(html) < start + scan_size:
+            return None
+        return html[start:start + scan_size]
+
+    @classmethod
+    def __parse_fragment(cls, fragment: str) -> Optional[str]:
+        # 要素の途中で切らないよう、タグの終わりまでを解析する
+        # (価格の文字列が途中で切れた場合は、要素の文字列が空となる)
+        end = fragment.rfind('>') + 1
+        if end <= 0:
+            return None
+        try:
+            root = lxml_html.document_fromstring(
+                fragment[:end],
+                parser=cls.__get_parser()
+            )
+        except (etree.ParserError, ValueError):
+            return None
+        elements = cls.price_xpath(root)
+        if not elements or elements[0].text is None:
+            return None
+        text = elements[0].text.strip()
+        if not cls.price_pattern.fullmatch(text):
+            return None
+        return text
+
+    @staticmethod
+    def __to_price(text: str) -> Decimal:
+        return Decimal(text.replace('円', '').replace(',', ''))
+
+    @classmethod
+    def __get_parser(cls) -> lxml_html.HTMLParser:
+        parser = getattr(cls.parsers, 'parser', None)
+        if parser is None:
+            parser = lxml_html.HTMLParser()
+            cls.parsers.parser = parser
+        return parser
+
+    def __get_host_slot(self, url: str, hedge: bool) -> BoundedSemaphore:
+        host = urlsplit(url).netloc
+        slots = self.__hedge_slots if hedge else self.__host_slots
+        with self.__host_slots_lock:
+            if host not in slots:
+                slots[host] = BoundedSemaphore(self.__concurrency)
+            return slots[host]
+
+    def __count(self, key: str):
+        with self.__transfer_lock:
+            self.__transfer[key] += 1
+
+    def __set_validator(self, description: int, validator: Validator):
+        with self.__validators_lock:
+            self.__validators[description] = validator
+            self.__updated_validators[description] = validator
+
+    def __load_validators(self):
+        with self.__connection:
+            for sql in self.schema:
+                self.__connection.execute(sql)
+            cursor = self.__connection.execute(self.select_validators)
+            for description, etag, last_modified, digest, price in cursor:
+                self.__validators[description] = Validator(
+                    etag, last_modified, digest, Decimal(price)
+                )
+
+    def __save_validators_when_done(self, futures: List[Future]):
+        # 呼び出し元は最後まで読むとは限らないため、最後の銘柄を取得した時点で
+        # (最後に返すFutureとは限らない)、まとめて書き込む
+        remaining = [len(futures)]
+        lock = Lock()
+
+        def done(_: Future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self.__save_validators()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def __save_validators(self):
+        # 変わった検証情報だけを、まとめて書き込む
+        with self.__validators_lock:
+            updated = self.__updated_validators
+            self.__updated_validators = {}
+            if not updated:
+                return
+            with self.__connection:
+                self.__connection.executemany(
+                    self.upsert_validator,
+                    (
+                        (
+                            description,
+                            validator.etag,
+                            validator.last_modified,
+                            validator.digest,
+                            str(validator.price)
+                        )
+                        for description, validator in updated.items()
+                    )
+                )
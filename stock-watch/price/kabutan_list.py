@@ -0,0 +1,178 @@
+import re
+from concurrent.futures import Future
+from decimal import Decimal
+from threading import Lock
+from typing import Dict
+from typing import Iterator
+from typing import List
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from .interface import IPrice
+from session import PooledSession
+
+
+class PriceByKabutanList(IPrice):
+    """
+    kabutanの一覧ページ(ランキング・検索結果など)から、
+    複数の銘柄の価格をまとめて取得する
+
+    一覧ページの各行から、銘柄ページへのリンクで銘柄コードを、
+    見出しが「株価」の列で価格を読み取る
+    (株価の列が数値でない行(売買のない銘柄など)・一覧ページにない銘柄は、
+    1銘柄ずつ取得する取得元から取得する)
+
+    一覧ページは、1回の株価チェック(インスタンス)の間は1回だけ取得し、
+    銘柄グループごとの取得では、取得済みのページの価格を使う
+    """
+    table_xpath = etree.XPath('//table')
+    header_xpath = etree.XPath(
+        './/tr[not(.//a[contains(@href, "code=")])][th]'
+    )
+    row_xpath = etree.XPath('.//tr[.//a[contains(@href, "code=")]]')
+    cell_xpath = etree.XPath('./td|./th')
+    price_header = '株価'
+    link_xpath = etree.XPath('.//a[contains(@href, "code=")]/@href')
+    code_pattern = re.compile(r'code=([0-9]+)\b')
+    price_pattern = re.compile(r'[0-9][0-9,]*(\.[0-9]+)?')
+
+    def __init__(
+        self,
+        urls: List[str],
+        price: IPrice,
+        session: PooledSession = None
+    ):
+        """
+        Params
+        -------
+        urls: List[str]
+            価格をまとめて取得する一覧ページのURL
+        price: IPrice
+            一覧ページにない銘柄の取得元
+        session: PooledSession
+            リクエストを送信するセッション
+        """
+        self.__urls = urls
+        self.__price = price
+        self.__session = session or PooledSession()
+        self.__stats = {'bulk_pages': 0, 'bulk_prices': 0}
+        self.__lock = Lock()
+        # URLをキーとした、取得済みのページの価格 (取得できなかった場合はNone)
+        self.__pages: Dict[str, Dict[int, Decimal]] = {}
+
+    def get_data(self, description: int) -> Decimal:
+        return self.__price.get_data(description)
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        return self.__price.iter_data(descriptions)
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        targets = set(descriptions)
+        prices = {}
+        for url in self.__urls:
+            if len(prices) == len(targets):
+                # すべての銘柄の価格を取得できた場合、残りのページは取得しない
+                break
+            page_prices = self.__get_cached_page_prices(url)
+            if page_prices is None:
+                # 取得できなかったページの銘柄は、1銘柄ずつ取得する
+                continue
+            for description, price in page_prices.items():
+                if description in targets:
+                    prices.setdefault(description, price)
+        with self.__lock:
+            self.__stats['bulk_prices'] += len(prices)
+        return prices
+
+    def clear_pages(self):
+        """
+        取得済みのページを破棄し、次の取得でページを取得し直す
+        """
+        with self.__lock:
+            self.__pages.clear()
+
+    def __get_cached_page_prices(self, url: str) -> Dict[int, Decimal]:
+        with self.__lock:
+            if url in self.__pages:
+                return self.__pages[url]
+        try:
+            page_prices = self.get_page_prices(url)
+        except Exception:
+            # 取得できなかったページも、同じ株価チェックの間は取得し直さない
+            page_prices = None
+        with self.__lock:
+            return self.__pages.setdefault(url, page_prices)
+
+    def get_page_prices(self, url: str) -> Dict[int, Decimal]:
+        """
+        一覧ページの銘柄の価格を取得する
+
+        Params
+        -------
+        url: str
+            一覧ページのURL
+
+        Returns
+        -------
+        0: Dict[int, Decimal]
+            銘柄コードをキーとした価格
+        """
+        response = self.__session.get(url)
+        response.raise_for_status()
+        with self.__lock:
+            self.__stats['bulk_pages'] += 1
+        return self.extract_prices(response.content)
+
+    def extract_prices(self, html: bytes) -> Dict[int, Decimal]:
+        """
+        一覧ページのhtmlから、銘柄の価格を抽出する
+
+        Params
+        -------
+        html: bytes
+            抽出元html
+
+        Returns
+        -------
+        0: Dict[int, Decimal]
+            銘柄コードをキーとした価格
+        """
+        root = lxml_html.document_fromstring(html)
+        prices = {}
+        for table in self.table_xpath(root):
+            # 見出しから株価の列を探す (株価の列がない表は読み取らない)
+            column = self.__find_price_column(table)
+            if column is None:
+                continue
+            for row in self.row_xpath(table):
+                cells = self.cell_xpath(row)
+                description = self.__find_description(cells)
+                if description is None or len(cells) <= column:
+                    continue
+                text = cells[column].text_content().strip()
+                # 株価が数値でない行は、1銘柄ずつ取得する
+                if self.price_pattern.fullmatch(text):
+                    prices[description] = Decimal(text.replace(',', ''))
+        return prices
+
+    def __find_price_column(self, table) -> int:
+        for header in self.header_xpath(table):
+            for index, cell in enumerate(self.cell_xpath(header)):
+                if cell.text_content().strip() == self.price_header:
+                    return index
+        return None
+
+    def __find_description(self, cells) -> int:
+        for cell in cells:
+            for href in self.link_xpath(cell):
+                match = self.code_pattern.search(href)
+                if match is not None:
+                    return int(match.group(1))
+        return None
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = self.__price.get_stats()
+        with self.__lock:
+            stats.update(self.__stats)
+        return stats
@@ -0,0 +1,46 @@
+from concurrent.futures import Future
+from decimal import Decimal
+from typing import Dict
+from typing import Iterator
+from typing import List
+
+from history import IPriceHistory
+from .interface import IPrice
+
+
+class RecordedPrice(IPrice):
+    """
+    取得した価格を、価格の履歴に追加する
+    """
+
+    def __init__(self, price: IPrice, history: IPriceHistory):
+        self.__price = price
+        self.__history = history
+
+    def get_data(self, description: int) -> Decimal:
+        price = self.__price.get_data(description)
+        self.__append(description, price)
+        return price
+
+    def iter_data(self, descriptions: List[int]) -> Iterator[Future]:
+        futures = self.__price.iter_data(descriptions)
+        for description, future in zip(descriptions, futures):
+            if future.exception() is None:
+                self.__append(description, future.result())
+            yield future
+
+    def get_many(self, descriptions: List[int]) -> Dict[int, Decimal]:
+        prices = self.__price.get_many(descriptions)
+        for description, price in prices.items():
+            self.__append(description, price)
+        return prices
+
+    def get_stats(self) -> Dict[str, int]:
+        return self.__price.get_stats()
+
+    def __append(self, description: int, price: Decimal):
+        try:
+            self.__history.append(description, price)
+        except OSError:
+            # 履歴の保存に失敗しても、価格の取得は成功とする
+            pass
@@ -0,0 +1 @@
+from .pooled import PooledSession
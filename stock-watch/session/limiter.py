@@ -0,0 +1,234 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from threading import Condition
+from threading import Lock
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    トークンバケットで、リクエストの送信間隔を制限する
+
+    トークンは毎秒rate個ずつburst個まで貯まり、
+    リクエストごとに1個使う (足りない場合は貯まるまで待つ)
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        Params
+        -------
+        rate: float
+            1秒あたりのリクエスト数の上限 (0以下の場合、制限しない)
+        burst: float
+            連続して送信できるリクエスト数 (未指定の場合、rateと同じ)
+        """
+        self.__rate = rate
+        self.__burst = max(burst or rate, 1.0)
+        self.__tokens = self.__burst
+        self.__updated = time.monotonic()
+        self.__lock = Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    def acquire(self):
+        if self.__rate <= 0:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(
+                self.__burst,
+                self.__tokens + (now - self.__updated) * self.__rate
+            )
+            self.__updated = now
+            # 先にトークンを予約し、足りない分が貯まるまでロックの外で待つ
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AimdController:
+    """
+    同時に送信するリクエスト数の上限を、応答の状況に合わせて調整する
+
+    応答が正常で目標時間内の場合は上限を少しずつ増やし(加算増加)、
+    429・5xx・接続エラー・目標時間超過の場合は半分に減らす(乗算減少)
+    また、Retry-Afterが指定された場合は、その時刻まで送信を止める
+    """
+    # 上限を減らす割合
+    decrease = 0.5
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_target: float = 2.0
+    ):
+        """
+        Params
+        -------
+        max_limit: int
+            同時に送信するリクエスト数の上限の最大値
+        min_limit: int
+            同時に送信するリクエスト数の上限の最小値
+        latency_target: float
+            応答時間の目標(秒) (0以下の場合、応答時間では調整しない)
+        """
+        self.__max_limit = max(max_limit, 1)
+        self.__min_limit = max(min(min_limit, self.__max_limit), 1)
+        self.__latency_target = latency_target
+        self.__limit = float(self.__max_limit)
+        self.__in_flight = 0
+        self.__blocked_until = 0.0
+        # 最後に上限を減らした時刻 (同じ時期の失敗で何度も減らさない)
+        self.__decreased = 0.0
+        self.__condition = Condition()
+        self.__stats = {'throttled': 0, 'server_errors': 0, 'decreases': 0}
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        with self.__condition:
+            while True:
+                wait = self.__blocked_until - time.monotonic()
+                if wait <= 0 and self.__in_flight < int(self.__limit):
+                    break
+                self.__condition.wait(wait if wait > 0 else None)
+            self.__in_flight += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__in_flight -= 1
+                self.__condition.notify_all()
+
+    def record(
+        self,
+        started: float,
+        status_code: Optional[int],
+        retry_after: Optional[float] = None
+    ):
+        """
+        応答の状況を記録し、上限を調整する
+
+        Params
+        -------
+        started: float
+            リクエストを送信した時刻 (time.monotonic)
+        status_code: int
+            ステータスコード (接続エラーの場合はNone)
+        retry_after: float
+            Retry-Afterで指定された待ち時間(秒)
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self.__condition:
+            if retry_after:
+                self.__blocked_until = max(
+                    self.__blocked_until,
+                    now + retry_after
+                )
+            if status_code == 429:
+                self.__stats['throttled'] += 1
+            elif status_code is not None and status_code >= 500:
+                self.__stats['server_errors'] += 1
+
+            failed = status_code is None or status_code == 429 or \
+                status_code >= 500
+            slow = 0 < self.__latency_target < latency
+            if failed or slow:
+                if started >= self.__decreased:
+                    self.__limit = max(
+                        self.__min_limit,
+                        self.__limit * self.decrease
+                    )
+                    self.__decreased = now
+                    self.__stats['decreases'] += 1
+            else:
+                # 上限分の応答が返るごとに、上限を1ずつ増やす
+                self.__limit = min(
+                    self.__max_limit,
+                    self.__limit + 1 / self.__limit
+                )
+            self.__condition.notify_all()
+
+    def get_stats(self) -> Dict[str, float]:
+        with self.__condition:
+            stats = dict(self.__stats)
+            stats['concurrency_limit'] = int(self.__limit)
+            stats['in_flight'] = self.__in_flight
+            return stats
+
+
+class RateLimiter:
+    """
+    リクエストの送信間隔(トークンバケット)と、
+    同時に送信するリクエスト数(AIMD)を制限する
+
+    セッションを使うすべてのスレッドで共有する
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        max_concurrency: int = 10,
+        latency_target: float = 2.0
+    ):
+        self.__bucket = TokenBucket(rate)
+        self.__controller = AimdController(
+            max_concurrency,
+            latency_target=latency_target
+        )
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        with self.__controller.acquire():
+            self.__bucket.acquire()
+            yield
+
+    def record(
+        self,
+        started: float,
+        status_code: Optional[int],
+        retry_after: Optional[float] = None
+    ):
+        self.__controller.record(started, status_code, retry_after)
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = self.__controller.get_stats()
+        stats['rate_limit'] = self.__bucket.rate
+        return stats
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-Afterヘッダの値(秒数・日時)を、待ち時間(秒)に変換する
+
+    Params
+    -------
+    value: str
+        Retry-Afterヘッダの値
+
+    Returns
+    -------
+    0: float
+        待ち時間(秒) (値がない・不正な場合はNone)
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,180 @@
+import random
+import time
+from threading import Lock
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .limiter import RateLimiter
+from .limiter import parse_retry_after
+
+
+class PooledSession:
+    """
+    接続を使い回すHTTPセッション
+
+    ホストごとに接続をプールして再利用し(keep-alive)、
+    一時的なエラーは指数バックオフ(ジッタ付き)で再試行する
+    また、送信間隔と同時に送信するリクエスト数を、
+    応答の状況(応答時間・429・5xx・Retry-After)に合わせて制限する
+
+    Attributes
+    -------
+    retry_status_codes: tuple
+        再試行するHTTPステータスコード
+    backoff: float
+        1回目の再試行までの待ち時間の上限(秒)
+    max_backoff: float
+        再試行までの待ち時間の上限(秒)
+    max_retry_after: float
+        Retry-Afterに従って再試行する待ち時間の上限(秒)
+        (これより長い場合は、再試行せずにレスポンスを返す)
+    default_timeout: tuple
+        呼び出し元が指定しない場合の、接続・読み込みのタイムアウト(秒)
+    """
+    retry_status_codes = (429, 500, 502, 503, 504)
+    backoff = 0.5
+    max_backoff = 10.0
+    max_retry_after = 60.0
+    default_timeout = (5.0, 30.0)
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        retries: int = 3,
+        rate: float = 0.0,
+        latency_target: float = 0.0,
+        timeout: tuple = None
+    ):
+        """
+        Params
+        -------
+        pool_size: int
+            ホストごとに保持する接続数
+            (同時に送信するリクエスト数の上限とする)
+        retries: int
+            一時的なエラーの再試行回数
+        rate: float
+            1秒あたりのリクエスト数の上限 (0以下の場合、制限しない)
+        latency_target: float
+            応答時間の目標(秒)
+            (超えた場合は同時に送信するリクエスト数を減らす。0以下の場合、判定しない)
+        timeout: tuple
+            呼び出し元が指定しない場合の、接続・読み込みのタイムアウト(秒)
+            (未指定の場合、default_timeout)
+        """
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
+        self.__adapter = adapter
+        self.__retries = max(retries, 0)
+        self.__timeout = timeout or self.default_timeout
+        self.__limiter = RateLimiter(rate, pool_size, latency_target)
+        self.__lock = Lock()
+        self.__requests = 0
+        self.__retried = 0
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        リクエストを送信する
+
+        Remarks
+        -------
+        接続エラー・タイムアウトは、再試行回数を超えた場合に例外発生
+        再試行するステータスコードは、再試行回数を超えた場合に最後のレスポンスを返す
+        タイムアウトを指定しない場合は、セッションのタイムアウトとする
+        (応答しない接続で、待ち続けないようにする)
+
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.__timeout
+        attempt = 0
+        while True:
+            with self.__lock:
+                self.__requests += 1
+            retry_after = None
+            with self.__limiter.acquire():
+                started = time.monotonic()
+                try:
+                    response = self.__session.request(method, url, **kwargs)
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout
+                ):
+                    self.__limiter.record(started, None)
+                    if attempt >= self.__retries:
+                        raise
+                else:
+                    retry_after = parse_retry_after(
+                        response.headers.get('Retry-After')
+                    )
+                    self.__limiter.record(
+                        started,
+                        response.status_code,
+                        retry_after
+                    )
+                    if response.status_code not in self.retry_status_codes \
+                            or attempt >= self.__retries \
+                            or (retry_after or 0) > self.max_retry_after:
+                        return response
+                    response.close()
+            self.__wait(attempt, retry_after)
+            attempt += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        接続の再利用状況を取得する
+
+        Returns
+        -------
+        0: Dict[str, int]
+            requests: 送信したリクエスト数 (再試行を含む)
+            retries: 再試行したリクエスト数
+            connections: 新しく確立した接続数
+            reused: 確立済みの接続を再利用したリクエスト数
+            rate_limit: 1秒あたりのリクエスト数の上限
+            concurrency_limit: 現在の同時に送信するリクエスト数の上限
+            in_flight: 送信中のリクエスト数
+            throttled: 429を受け取った回数
+            server_errors: 5xxを受け取った回数
+            decreases: 同時に送信するリクエスト数を減らした回数
+        """
+        connections = 0
+        pooled_requests = 0
+        pools = self.__adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+        with self.__lock:
+            stats = {
+                'requests': self.__requests,
+                'retries': self.__retried,
+                'connections': connections,
+                'reused': max(pooled_requests - connections, 0),
+            }
+        stats.update(self.__limiter.get_stats())
+        return stats
+
+    def close(self):
+        self.__session.close()
+
+    def __wait(self, attempt: int, retry_after: float = None):
+        # 待ち時間の上限を倍々に増やし、その範囲でランダムに待つ
+        # (同時に失敗したリクエストの再試行が重ならないようにする)
+        # Retry-Afterが指定された場合は、少なくともその時間は待つ
+        with self.__lock:
+            self.__retried += 1
+        limit = min(self.backoff * 2 ** attempt, self.max_backoff)
+        time.sleep(max(random.uniform(0, limit), retry_after or 0))
@@ -0,0 +1,3 @@
+from .clock import SimulatedClock
+from .market import RandomWalkMarket
+from .server import KabutanServer
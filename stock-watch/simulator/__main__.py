@@ -0,0 +1,107 @@
+"""
+kabutanの代わりの模擬サーバを起動する
+
+使い方 (stock-watchディレクトリで実行)
+    python -m simulator [--port 8080] [--latency 0.05] [--error-rate 0.01] ...
+    (config.iniのprice_urlに、表示されたURLを指定する)
+"""
+import argparse
+import glob
+from os import path
+
+from .market import RandomWalkMarket
+from .server import KabutanServer
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード')
+    parser.add_argument(
+        '--volatility', type=float, default=0.002,
+        help='1回の値動きの標準偏差 (対数収益率)'
+    )
+    parser.add_argument(
+        '--tick', type=float, default=1.0, help='価格が動く、模擬時計の間隔(秒)'
+    )
+    parser.add_argument(
+        '--clock-step', type=float, default=0.1,
+        help='銘柄ページの要求ごとに進める、模擬時計の時間(秒)'
+    )
+    parser.add_argument(
+        '--latency', type=float, default=0.0, help='応答までの遅延(秒)'
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=0.0, help='ランダムな遅延の上限(秒)'
+    )
+    parser.add_argument(
+        '--tail-rate', type=float, default=0.0,
+        help='tail-latencyだけ遅らせる割合'
+    )
+    parser.add_argument(
+        '--tail-latency', type=float, default=1.0, help='遅らせる時間(秒)'
+    )
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0, help='503を返す割合'
+    )
+    parser.add_argument(
+        '--throttle-rate', type=float, default=0.0, help='429を返す割合'
+    )
+    parser.add_argument(
+        '--retry-after', type=int, default=1, help='429のRetry-After(秒)'
+    )
+    parser.add_argument(
+        '--etag', action='store_true', help='ETagを返し、304に対応する'
+    )
+    parser.add_argument(
+        '--corpus', help='模擬市場の代わりに返す、保存したページのディレクトリ'
+    )
+    return parser.parse_args(args)
+
+
+def make_server(args: argparse.Namespace) -> KabutanServer:
+    market = RandomWalkMarket(
+        seed=args.seed,
+        volatility=args.volatility,
+        tick_interval=args.tick
+    )
+    return KabutanServer(
+        market,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        etag=args.etag,
+        seed=args.seed,
+        clock_step=args.clock_step,
+        pages=load_pages(args.corpus) if args.corpus else None
+    )
+
+
+def load_pages(directory: str) -> list:
+    # 銘柄ページ(価格の要素のあるページ)だけを返す
+    pages = []
+    for file in sorted(glob.glob(path.join(directory, '*.html'))):
+        with open(file, 'rb') as f:
+            page = f.read()
+        if b'stockinfo_i1' in page:
+            pages.append(page)
+    return pages
+
+
+if __name__ == '__main__':
+    server = make_server(parse_args())
+    print('price_url =', server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.get_stats())
+        server.server_close()
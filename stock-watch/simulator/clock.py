@@ -0,0 +1,34 @@
+from threading import Lock
+
+
+class SimulatedClock:
+    """
+    模擬市場の時計
+
+    実時間によらず、advanceで進めた分だけ時間が進む
+    (同じ進め方であれば、何度実行しても同じ時刻になる)
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+        Params
+        -------
+        start: float
+            開始時刻(秒)
+        """
+        self.__now = start
+        self.__lock = Lock()
+
+    def now(self) -> float:
+        """
+        現在の時刻(秒)
+        """
+        with self.__lock:
+            return self.__now
+
+    def advance(self, seconds: float):
+        """
+        時刻を指定された時間進める
+        """
+        with self.__lock:
+            self.__now += seconds
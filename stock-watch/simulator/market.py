@@ -0,0 +1,127 @@
+import math
+import random
+from decimal import Decimal
+from threading import Lock
+from typing import Dict
+from typing import Tuple
+
+from .clock import SimulatedClock
+
+
+class RandomWalkMarket:
+    """
+    銘柄ごとの価格を、ランダムウォークで動かす模擬市場
+
+    価格は模擬時計の一定時間(tick_interval)ごとに、対数で正規分布に従って動く
+    銘柄ごとの初値と各回の値動きは、(シード, 銘柄コード, 動かした回数)
+    だけで決まるため、取得する順番・スレッドによらず、
+    同じシードであれば何度実行しても同じ価格になる
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        volatility: float = 0.002,
+        tick_interval: float = 1.0,
+        min_price: int = 100,
+        max_price: int = 10000,
+        clock: SimulatedClock = None
+    ):
+        """
+        Params
+        -------
+        seed: int
+            乱数のシード
+        volatility: float
+            1回の値動きの標準偏差 (対数収益率)
+        tick_interval: float
+            価格が動く、模擬時計の間隔(秒)
+        min_price: int
+            初値の下限(円)
+        max_price: int
+            初値の上限(円)
+        clock: SimulatedClock
+            模擬時計 (未指定の場合、stepで進める時計)
+        """
+        self.__seed = seed
+        self.__volatility = volatility
+        self.__tick_interval = tick_interval
+        self.__min_price = min_price
+        self.__max_price = max_price
+        self.clock = clock or SimulatedClock()
+        # 銘柄コードをキーとした、(価格を動かした回数, 対数の価格)
+        # (次の取得で、続きの回数から計算するためだけに保持する)
+        self.__states: Dict[int, Tuple[int, float]] = {}
+        self.__lock = Lock()
+
+    @property
+    def tick(self) -> int:
+        """
+        これまでに価格が動いた回数
+        """
+        # (模擬時計を小数の時間ずつ進めた場合の誤差で、1回少なく数えないようにする)
+        return int(self.clock.now() / self.__tick_interval + 1e-9)
+
+    def step(self, count: int = 1):
+        """
+        模擬時計を進め、すべての銘柄の価格を指定された回数動かす
+        """
+        self.clock.advance(count * self.__tick_interval)
+
+    def get_price(self, description: int) -> Decimal:
+        """
+        現在の価格を取得する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+
+        Returns
+        -------
+        0: Decimal
+            価格(円) (1円単位)
+        """
+        return self.get_quote(description)[0]
+
+    def get_quote(self, description: int) -> Tuple[Decimal, Decimal]:
+        """
+        現在の価格と、前日終値(初値)を取得する
+
+        Params
+        -------
+        description: int
+            銘柄コード
+
+        Returns
+        -------
+        0: Decimal
+            価格(円) (1円単位)
+        1: Decimal
+            前日終値(円) (1円単位)
+        """
+        tick = self.tick
+        close = self.__get_open(description)
+        with self.__lock:
+            count, log_price = \
+                self.__states.get(description, (0, math.log(close)))
+        if count > tick:
+            # 保持している回数より前の価格は、初値から計算し直す
+            count, log_price = 0, math.log(close)
+        for count in range(count + 1, tick + 1):
+            log_price += self.__get_move(description, count)
+        with self.__lock:
+            if tick >= self.__states.get(description, (0, ))[0]:
+                self.__states[description] = (tick, log_price)
+        price = math.exp(log_price)
+        return Decimal(max(round(price), 1)), Decimal(round(close))
+
+    def __get_open(self, description: int) -> float:
+        # 初値 (前日終値) は、シードと銘柄コードで決まる
+        rng = random.Random(f'{self.__seed}:{description}')
+        return float(rng.randint(self.__min_price, self.__max_price))
+
+    def __get_move(self, description: int, tick: int) -> float:
+        # tick回目の値動き (対数収益率) は、シード・銘柄コード・回数で決まる
+        rng = random.Random(f'{self.__seed}:{description}:{tick}')
+        return rng.gauss(0, self.__volatility)
@@ -0,0 +1,323 @@
+import hashlib
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from threading import Lock
+from threading import Thread
+from typing import Dict
+from typing import List
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+from .market import RandomWalkMarket
+
+
+class KabutanHandler(BaseHTTPRequestHandler):
+    """
+    kabutanの銘柄ページと同じ形のページを返す
+    """
+    # keep-aliveで接続を維持する
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server: KabutanServer = self.server
+        url = urlsplit(self.path)
+        codes = parse_qs(url.query).get('code', [''])
+        if url.path != '/stock/' or not codes[0].isdigit():
+            self.__send(404, b'not found')
+            return
+        description = int(codes[0])
+
+        server.advance_clock()
+        delay, fault = server.draw_fault(description)
+        if delay > 0:
+            time.sleep(delay)
+        if fault == 429:
+            self.__send(429, b'too many requests', {
+                'Retry-After': str(server.retry_after)
+            })
+            return
+        if fault:
+            self.__send(fault, b'server error')
+            return
+
+        body = server.make_page(description)
+        headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if server.etag:
+            digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+            etag = f'"{digest}"'
+            if self.headers.get('If-None-Match') == etag:
+                server.count('not_modified')
+                self.__send(304, b'', {'ETag': etag})
+                return
+            headers['ETag'] = etag
+        self.__send(200, body, headers)
+
+    def __send(
+        self,
+        status: int,
+        body: bytes,
+        headers: Dict[str, str] = None
+    ):
+        self.server.count('requests')
+        try:
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            # 受信を途中でやめたクライアントには、残りを送らない
+            self.wfile.write(body)
+            self.server.count('bytes_sent', len(body))
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count('aborted')
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KabutanServer(ThreadingHTTPServer):
+    """
+    kabutanの代わりに、模擬市場の価格のページを返すHTTPサーバ
+
+    本物のサイトにアクセスせずに、価格の取得を負荷試験するために使う
+    応答の遅延・エラー(5xx)・429を、指定された割合で起こす
+    (遅延・エラーは、(シード, 銘柄コード, 銘柄ごとの要求の回数)で決まるため、
+    要求の順番・スレッドによらず、同じシードであれば同じように起こる)
+
+    使い方
+        server = KabutanServer(RandomWalkMarket(seed=1), latency=0.05)
+        server.start()
+        price = PriceByKabutan(url=server.url)
+        ...
+        server.stop()
+    """
+    daemon_threads = True
+
+    page_head = (
+        '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n'
+        '<title>{description} 株価</title>\n</head>\n<body>\n'
+        '<div id="header"><ul>\n'
+    )
+    page_head_item = \
+        '<li><a href="/themes/?theme={0}">テーマ{0}</a></li>\n'
+    # 価格の要素は、本物のページと同じ構造とする
+    page_stockinfo = (
+        '</ul></div>\n'
+        '<div id="main">\n'
+        '<div id="stockinfo_i1">\n'
+        '  <div class="si_i1_1">\n'
+        '    <h2><span class="market">東証Ｐ</span>{description}&nbsp;'
+        '模擬銘柄{description}</h2>\n'
+        '    <div class="si_i1_dl1"><dl><dt>業種</dt><dd>'
+        '<a href="/themes/?industry=1">模擬業種</a></dd></dl></div>\n'
+        '  </div>\n'
+        '  <div class="si_i1_2">\n'
+        '    <span class="kabuka_title">株価</span>'
+        '<span class="kabuka">{price:,}円</span>\n'
+        '    <dl class="si_i1_dl2"><dt>前日比</dt><dd>'
+        '<span class="{direction}">{change:+,}</span></dd><dd>'
+        '<span class="{direction}">{rate:+.2f}</span>%</dd></dl>\n'
+        '  </div>\n'
+        '</div>\n'
+        '<div id="kobetsu_left"><table class="stock_kabuka_dwm"><tbody>\n'
+    )
+    page_tail_item = (
+        '<tr><th scope="row">{0}</th><td>1,000</td><td>1,000</td>'
+        '<td>1,000</td><td>1,000</td><td class="up">+0</td><td>0</td></tr>\n'
+    )
+    page_tail = '</tbody></table></div>\n</div>\n</body>\n</html>\n'
+
+    def __init__(
+        self,
+        market: RandomWalkMarket = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 1.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        etag: bool = False,
+        head_size: int = 28 * 1024,
+        tail_size: int = 116 * 1024,
+        seed: int = 0,
+        pages: List[bytes] = None,
+        clock_step: float = 0.0
+    ):
+        """
+        Params
+        -------
+        market: RandomWalkMarket
+            価格を返す模擬市場
+        host: str
+            待ち受けるアドレス
+        port: int
+            待ち受けるポート (0の場合、空いているポート)
+        latency: float
+            応答までの遅延(秒)
+        jitter: float
+            遅延に加える、ランダムな遅延の上限(秒)
+        tail_rate: float
+            遅延に加えて、tail_latency待つ割合 (0〜1)
+        tail_latency: float
+            tail_rateの割合で加える遅延(秒)
+        error_rate: float
+            5xxを返す割合 (0〜1)
+        throttle_rate: float
+            429を返す割合 (0〜1)
+        retry_after: int
+            429のRetry-Afterで指定する秒数
+        etag: bool
+            ETagを返し、条件付きの取得で更新がない場合に304を返すか
+        head_size: int
+            価格の要素より前の大きさ(バイト) (本物のページに合わせる)
+        tail_size: int
+            価格の要素より後の大きさ(バイト) (本物のページに合わせる)
+        seed: int
+            遅延・エラーを起こす乱数のシード
+        pages: List[bytes]
+            模擬市場の価格の代わりに返す、保存したページ
+            (銘柄コードに応じて順に返す。価格は動かない)
+        clock_step: float
+            銘柄ページの要求ごとに進める、模擬市場の時計の時間(秒)
+            (0の場合、market.stepを呼び出した時だけ価格が動く)
+        """
+        super().__init__((host, port), KabutanHandler)
+        self.market = market or RandomWalkMarket()
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.etag = etag
+        self.pages = pages
+        self.clock_step = clock_step
+        self.__head = self.__make_filler(self.page_head_item, head_size)
+        self.__tail = self.__make_filler(self.page_tail_item, tail_size)
+        self.__seed = seed
+        # 銘柄コードをキーとした、要求の回数
+        self.__attempts: Dict[int, int] = {}
+        self.__attempts_lock = Lock()
+        self.__stats = {
+            'requests': 0,
+            'errors': 0,
+            'throttled': 0,
+            'not_modified': 0,
+            'aborted': 0,
+            'bytes_sent': 0,
+        }
+        self.__stats_lock = Lock()
+        self.__thread: Thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        PriceByKabutanのurlと同じ形の、銘柄ページのURL
+        """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/stock/?code={{}}'
+
+    def start(self):
+        """
+        別スレッドで待ち受けを始める
+        """
+        self.__thread = Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # 受信を途中でやめたクライアントが切断した場合は、数えるだけにする
+        error = sys.exc_info()[1]
+        if isinstance(error, (BrokenPipeError, ConnectionResetError)):
+            self.count('aborted')
+            return
+        super().handle_error(request, client_address)
+
+    def make_page(self, description: int) -> bytes:
+        if self.pages:
+            return self.pages[description % len(self.pages)]
+        price, close = self.market.get_quote(description)
+        change = price - close
+        return ''.join((
+            self.page_head.format(description=description),
+            self.__head,
+            self.page_stockinfo.format(
+                description=description,
+                price=price,
+                change=change,
+                rate=change / close * 100,
+                direction='up' if change >= 0 else 'down'
+            ),
+            self.__tail,
+            self.page_tail,
+        )).encode('utf-8')
+
+    def advance_clock(self):
+        """
+        要求ごとに、模擬市場の時計を進める
+        """
+        if self.clock_step > 0:
+            self.market.clock.advance(self.clock_step)
+
+    def draw_fault(self, description: int) -> Tuple[float, int]:
+        """
+        銘柄ページの要求に加える遅延と、起こすエラーを決める
+
+        Params
+        -------
+        description: int
+            銘柄コード
+
+        Returns
+        -------
+        0: float
+            応答までの遅延(秒)
+        1: int
+            起こすエラーのステータスコード (起こさない場合は0)
+        """
+        with self.__attempts_lock:
+            attempt = self.__attempts.get(description, 0)
+            self.__attempts[description] = attempt + 1
+        rng = random.Random(f'{self.__seed}:{description}:{attempt}')
+        delay = self.latency + rng.uniform(0, self.jitter)
+        if rng.random() < self.tail_rate:
+            delay += self.tail_latency
+
+        roll = rng.random()
+        if roll < self.throttle_rate:
+            self.count('throttled')
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            self.count('errors')
+            return delay, 503
+        return delay, 0
+
+    def count(self, key: str, value: int = 1):
+        with self.__stats_lock:
+            self.__stats[key] += value
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    def __make_filler(self, item: str, size: int) -> str:
+        # 指定された大きさになるまで、要素を繰り返す
+        items = []
+        total = 0
+        while total < size:
+            text = item.format(len(items))
+            items.append(text)
+            total += len(text.encode('utf-8'))
+        return ''.join(items)
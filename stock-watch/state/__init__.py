@@ -0,0 +1,3 @@
+from .interface import IAlertState
+from .sqlite import SqliteAlertState
+from .none import NoAlertState
@@ -0,0 +1,70 @@
+from abc import ABCMeta
+from abc import abstractmethod
+from decimal import Decimal
+from typing import Dict
+from typing import Iterable
+from typing import List
+
+from db.rule import Rule
+
+
+class IAlertState(metaclass=ABCMeta):
+    @abstractmethod
+    def judge(
+        self,
+        prices: Dict[int, Decimal],
+        crossed: Dict[int, List[Rule]]
+    ) -> List[int]:
+        """
+        基準ごとの通知状態から、新たに基準を超えた銘柄を判定する
+
+        Params
+        -------
+        prices: Dict[int, Decimal]
+            銘柄コードをキーとした現在価格
+        crossed: Dict[int, List[Rule]]
+            銘柄コードをキーとした、価格が超えた基準のルール
+
+        Returns
+        -------
+        0: List[int]
+            通知済みでない基準を超えた銘柄コードのリスト
+            (pricesの順序を保つ)
+
+        Remarks
+        -------
+        判定後の状態はcommitを呼ぶまで保存されない
+        (続けて別の銘柄を判定した場合は、まとめて保存する)
+        """
+        pass
+
+    @abstractmethod
+    def commit(self, undelivered: Iterable[int] = ()):
+        """
+        前回のcommitより後のjudgeで判定した通知状態を保存する
+
+        Params
+        -------
+        undelivered: Iterable[int]
+            通知できなかった銘柄コード
+            (新たに超えた基準は通知済みとせず、次回も通知対象とする
+            戻った基準を未通知に戻す状態の変化は、通知の成否によらず保存する)
+        """
+        pass
+
+    def prune(self, rules: Iterable[Rule]):
+        """
+        ルールから削除された基準の通知状態を削除する
+        (ルールを読み込んだ時に呼ぶ)
+
+        Params
+        -------
+        rules: Iterable[Rule]
+            現在の全てのルール (指標によるルールを含む)
+
+        Remarks
+        -------
+        既定では何もしない
+        (通知状態を保持する実装では、オーバーライドする)
+        """
+        pass
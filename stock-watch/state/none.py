@@ -0,0 +1,25 @@
+from decimal import Decimal
+from typing import Dict
+from typing import Iterable
+from typing import List
+
+from db.rule import Rule
+from .interface import IAlertState
+
+
+class NoAlertState(IAlertState):
+    """
+    通知状態を保持せず、基準を超えている間は毎回通知する
+    """
+
+    def judge(
+        self,
+        prices: Dict[int, Decimal],
+        crossed: Dict[int, List[Rule]]
+    ) -> List[int]:
+        return [
+            description for description in prices if crossed.get(description)
+        ]
+
+    def commit(self, undelivered: Iterable[int] = ()):
+        pass
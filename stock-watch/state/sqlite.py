@@ -0,0 +1,159 @@
+import sqlite3
+from decimal import Decimal
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from db.rule import Rule
+from .interface import IAlertState
+
+
+class SqliteAlertState(IAlertState):
+    """
+    基準ごとの通知状態をSQLiteのファイルに保持する
+
+    基準を超えた時点(未通知→通知済み)でのみ通知し、
+    価格が基準から再通知幅を超えて戻った時点で未通知に戻す
+    (通知できなかった銘柄は、新たに超えた基準だけを未通知のままとする)
+    ルールから削除された基準の通知状態は、pruneで削除する
+
+    状態の読み込み・書き込みは、判定対象の銘柄を一時テーブルに入れ、
+    それぞれ1回の問い合わせ・1トランザクションでまとめて行う
+    """
+    state_file = '../config/alert_state.db'
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS fired ('
+        ' description INTEGER NOT NULL,'
+        ' price TEXT NOT NULL,'
+        ' trigger TEXT NOT NULL,'
+        ' PRIMARY KEY (description, price, trigger)'
+        ') WITHOUT ROWID',
+        'CREATE TEMP TABLE IF NOT EXISTS targets ('
+        ' description INTEGER PRIMARY KEY'
+        ')',
+    )
+
+    select_fired = \
+        'SELECT f.description, f.price, f.trigger' \
+        ' FROM targets t JOIN fired f ON f.description = t.description'
+    delete_fired = \
+        'DELETE FROM fired WHERE description IN' \
+        ' (SELECT description FROM targets)'
+    insert_fired = \
+        'INSERT INTO fired (description, price, trigger) VALUES (?, ?, ?)'
+    insert_target = 'INSERT INTO targets (description) VALUES (?)'
+    select_all_fired = 'SELECT description, price, trigger FROM fired'
+    delete_rule = \
+        'DELETE FROM fired' \
+        ' WHERE description = ? AND price = ? AND trigger = ?'
+
+    def __init__(self, state_file: str = None, rearm_band: float = 0.0):
+        self.__connection = sqlite3.connect(state_file or self.state_file)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        with self.__connection:
+            for sql in self.schema:
+                self.__connection.execute(sql)
+        # 再通知幅(%)は基準価格に対する割合とする
+        band = Decimal(repr(rearm_band)) / 100
+        self.__over_rate = 1 - band
+        self.__under_rate = 1 + band
+        # 状態の変わった銘柄の、判定後・判定前の通知済みの基準
+        self.__pending: Dict[int, Tuple[Set[Rule], Set[Rule]]] = {}
+
+    def judge(
+        self,
+        prices: Dict[int, Decimal],
+        crossed: Dict[int, List[Rule]]
+    ) -> List[int]:
+        fired = self.__get_fired(list(prices))
+
+        descriptions = []
+        pending = self.__pending
+        for description, price in prices.items():
+            code_fired = fired.get(description, set())
+            code_crossed = set(crossed.get(description, ()))
+            if code_crossed - code_fired:
+                descriptions.append(description)
+
+            # 超えている基準と、戻り幅の内にある通知済みの基準を通知済みとする
+            # (条件を満たしている指標によるルールは、超えている基準に含まれる)
+            new_fired = code_crossed | {
+                rule for rule in code_fired
+                if not self.__is_rearmed(rule, price)
+            }
+            if new_fired != code_fired:
+                # 状態の変わった銘柄だけを書き込む
+                pending[description] = (new_fired, code_fired)
+            else:
+                pending.pop(description, None)
+        return descriptions
+
+    def commit(self, undelivered: Iterable[int] = ()):
+        undelivered = set(undelivered)
+        changes: Dict[int, Set[Rule]] = {}
+        for description, (new_fired, code_fired) in self.__pending.items():
+            if description in undelivered:
+                # 通知できなかった銘柄は、新たに超えた基準を通知済みとしない
+                # (未通知に戻した基準は、通知の成否によらず未通知とする)
+                new_fired = new_fired & code_fired
+                if new_fired == code_fired:
+                    continue
+            changes[description] = new_fired
+        self.__pending = {}
+        if not changes:
+            return
+        with self.__connection:
+            self.__set_targets(list(changes))
+            self.__connection.execute(self.delete_fired)
+            self.__connection.executemany(
+                self.insert_fired,
+                (
+                    (rule.description, str(rule.price), rule.trigger)
+                    for rules in changes.values()
+                    for rule in rules
+                )
+            )
+
+    def prune(self, rules: Iterable[Rule]):
+        # 基準価格は表記によらず比較するため、Decimalに戻して突き合わせる
+        # (2700と2700.0は同じ基準とする)
+        rules = set(rules)
+        with self.__connection:
+            removed = [
+                (description, price, trigger)
+                for description, price, trigger
+                in self.__connection.execute(self.select_all_fired)
+                if Rule(description, Decimal(price), trigger) not in rules
+            ]
+            self.__connection.executemany(self.delete_rule, removed)
+
+    def __get_fired(self, descriptions: List[int]) -> Dict[int, Set[Rule]]:
+        # 判定対象の銘柄の通知済みの基準をまとめて取得
+        with self.__connection:
+            self.__set_targets(descriptions)
+            cursor = self.__connection.execute(self.select_fired)
+            fired: Dict[int, Set[Rule]] = {}
+            for description, price, trigger in cursor:
+                fired.setdefault(description, set()).add(
+                    Rule(description, Decimal(price), trigger)
+                )
+            return fired
+
+    def __set_targets(self, descriptions: List[int]):
+        self.__connection.execute('DELETE FROM targets')
+        self.__connection.executemany(
+            self.insert_target,
+            ((description, ) for description in descriptions)
+        )
+
+    def __is_rearmed(self, rule: Rule, price: Decimal) -> bool:
+        # 基準から戻り幅を超えて戻った場合、未通知に戻す
+        if rule.trigger == 'over':
+            return price < rule.price * self.__over_rate
+        if rule.trigger == 'under':
+            return price > rule.price * self.__under_rate
+        # 指標によるルールは、条件を満たさなくなった時点で未通知に戻す
+        return True
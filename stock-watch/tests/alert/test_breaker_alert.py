@@ -0,0 +1,33 @@
+import pytest
+
+from alert import BreakerAlert
+from alert import IAlert
+from breaker import CircuitBreaker
+from exceptions import AlertCircuitOpenException
+from exceptions import AlertException
+
+
+def test_fail_fast_when_open(mocker):
+    """
+    連続して通知に失敗した場合、通知先に送らずにすぐ失敗とし、
+    一定時間後の通知で回復を確認すること
+
+    """
+    monotonic_mock = mocker.patch('breaker.circuit.time.monotonic')
+    monotonic_mock.return_value = 100.0
+    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock.send_messages.side_effect = AlertException('error')
+    alert = BreakerAlert(alert_mock, failure_threshold=2, recovery_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(AlertException):
+            alert.send_message('message')
+    with pytest.raises(AlertCircuitOpenException):
+        alert.send_message('message')
+    assert alert_mock.send_messages.call_count == 2
+
+    monotonic_mock.return_value = 130.0
+    alert_mock.send_messages.side_effect = None
+    alert.send_message('message')
+    assert alert_mock.send_messages.call_count == 3
+    assert alert.breaker.state == CircuitBreaker.closed
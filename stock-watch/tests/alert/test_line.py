@@ -5,7 +5,9 @@ import requests
 
 from alert import AlertByLine
 from exceptions import AlertException
+from exceptions import PartialAlertException
 from config import Config
+from session import PooledSession
 
 
 def test_send_message_correctly(mocker):
@@ -19,7 +21,11 @@ def test_send_message_correctly(mocker):
     """
     response = requests.Response()
     response.status_code = 200
-    post_mock = mocker.patch('alert.line.requests.post', return_value=response)
+    post_mock = mocker.patch.object(
+        PooledSession,
+        'post',
+        return_value=response
+    )
 
     user_id = 'uuu_id'
     channel_access_token = 'c_a_token'
@@ -54,7 +60,10 @@ def test_send_message_correctly(mocker):
     assert post_mock.call_count == 1
     positional_args, named_args = post_mock.call_args
     assert positional_args[0] == expected_url
-    assert named_args['headers'] == expected_headers
+    # 再試行用のキーは、リクエストごとに生成される
+    headers = dict(named_args['headers'])
+    assert headers.pop('X-Line-Retry-Key')
+    assert headers == expected_headers
     assert named_args['data'] == json.dumps(expected_data)
 
 
@@ -71,7 +80,7 @@ def test_when_an_error_occurs_in_send_message_api(mocker):
     response = requests.Response()
     response.status_code = 500
     response._content = b'{"message": "api error detail"}'
-    mocker.patch('alert.line.requests.post', return_value=response)
+    mocker.patch.object(PooledSession, 'post', return_value=response)
 
     user_id = 'uuu_id'
     channel_access_token = 'c_a_token'
@@ -94,3 +103,158 @@ def test_when_an_error_occurs_in_send_message_api(mocker):
     expected_message = \
         'api error: status_code => 500 message => api error detail'
     assert str(ex.value) == expected_message
+
+
+@pytest.fixture
+def post_mock(mocker):
+    """
+    LINEの設定とメッセージ送信APIのmock
+    """
+    response = requests.Response()
+    response.status_code = 200
+    post_mock = mocker.patch.object(
+        PooledSession,
+        'post',
+        return_value=response
+    )
+    config_mock = mocker.Mock(spec=Config)
+    config_mock.user_id = 'uuu_id'
+    config_mock.channel_access_token = 'c_a_token'
+    mocker.patch('alert.line.Config', return_value=config_mock)
+    return post_mock
+
+
+def get_pushed_texts(post_mock) -> list:
+    """
+    テスト用関数
+    送信ごとのテキストのリストを取得する
+    """
+    return [
+        [message['text'] for message in json.loads(kwargs['data'])['messages']]
+        for _, kwargs in post_mock.call_args_list
+    ]
+
+
+def test_send_messages_in_one_push(post_mock):
+    """
+    複数のメッセージが、1回の送信の1つのテキストにまとめられ、
+    減らせた送信回数が記録されること
+
+    """
+    alert_by_line = AlertByLine()
+    messages = [f'alert {i}' for i in range(12)]
+    alert_by_line.send_messages(messages)
+
+    assert get_pushed_texts(post_mock) == [['\n'.join(messages)]]
+    stats = alert_by_line.get_stats()
+    assert stats['alert_messages'] == 12
+    assert stats['alert_pushes'] == 1
+    assert stats['alert_calls_saved'] == 11
+
+
+def test_send_messages_over_texts_per_push(mocker, post_mock):
+    """
+    テキストの数が1回の送信の上限を超える場合、複数回に分けて送信されること
+
+    """
+    mocker.patch.object(AlertByLine, 'max_text_length', 10)
+    alert_by_line = AlertByLine()
+    messages = [f'alert {i}' for i in range(7)]
+    alert_by_line.send_messages(messages)
+
+    assert get_pushed_texts(post_mock) == \
+        [messages[:5], messages[5:]]
+    assert alert_by_line.get_stats()['alert_calls_saved'] == 5
+
+
+def test_split_long_message(mocker, post_mock):
+    """
+    文字数の上限を超えるメッセージが、行の区切りで分けられること
+    (1行で上限を超える場合は、上限の文字数で分けられ、空の行は送信されない)
+
+    """
+    mocker.patch.object(AlertByLine, 'max_text_length', 10)
+    alert_by_line = AlertByLine()
+
+    assert alert_by_line.pack_messages(['aaaa\nbbbb\ncccc', '']) == \
+        [['aaaa\nbbbb', 'cccc']]
+    assert alert_by_line.pack_messages(['a' * 25, 'bb']) == \
+        [['a' * 10, 'a' * 10, 'a' * 5 + '\nbb']]
+    assert alert_by_line.pack_messages([]) == []
+
+
+def test_resend_only_undelivered(mocker, post_mock):
+    """
+    途中の送信に失敗した場合、送信できなかったテキストが例外で返され、
+    それを送信し直すと、失敗した送信と同じ再試行用のキーが使われること
+    (既に受け付けられていた場合(409)は、送信できたものとする)
+
+    """
+    mocker.patch.object(AlertByLine, 'max_text_length', 10)
+    ok = requests.Response()
+    ok.status_code = 200
+    error = requests.Response()
+    error.status_code = 500
+    error._content = b'{"message": "api error detail"}'
+    conflict = requests.Response()
+    conflict.status_code = 409
+    post_mock.side_effect = [ok, error, conflict]
+
+    alert_by_line = AlertByLine()
+    messages = [f'alert {i}' for i in range(7)]
+    with pytest.raises(PartialAlertException) as ex:
+        alert_by_line.send_messages(messages)
+    assert ex.value.delivered == 5
+    assert ex.value.undelivered == messages[5:]
+
+    alert_by_line.send_messages(ex.value.undelivered)
+    keys = [
+        kwargs['headers']['X-Line-Retry-Key']
+        for _, kwargs in post_mock.call_args_list
+    ]
+    assert keys[1] == keys[2]
+    assert keys[0] != keys[1]
+    assert get_pushed_texts(post_mock) == \
+        [messages[:5], messages[5:], messages[5:]]
+    # 409の送信も、送信した回数に数える
+    stats = alert_by_line.get_stats()
+    assert stats['alert_pushes'] == 2
+    assert stats['alert_calls_saved'] == 9 - 2
+
+
+def test_retry_keys_are_deleted(mocker, post_mock):
+    """
+    送信できた・既に受け付けられていた(409)送信内容の再試行用のキーは削除され、
+    保持するキーの数が上限を超えた場合は、古いものから削除されること
+
+    """
+    mocker.patch.object(AlertByLine, 'max_retry_keys', 2)
+    ok = requests.Response()
+    ok.status_code = 200
+    error = requests.Response()
+    error.status_code = 500
+    error._content = b'{"message": "api error detail"}'
+    conflict = requests.Response()
+    conflict.status_code = 409
+
+    def push(alert_by_line, message, response) -> str:
+        post_mock.side_effect = [response]
+        try:
+            alert_by_line.send_message(message)
+        except PartialAlertException:
+            pass
+        return post_mock.call_args[1]['headers']['X-Line-Retry-Key']
+
+    alert_by_line = AlertByLine()
+    # 送信できた場合・409の場合は、次の送信で新しいキーが使われる
+    first = push(alert_by_line, 'a', error)
+    assert push(alert_by_line, 'a', conflict) == first
+    assert push(alert_by_line, 'a', error) != first
+    second = push(alert_by_line, 'b', error)
+    assert push(alert_by_line, 'b', ok) == second
+    assert push(alert_by_line, 'b', error) != second
+
+    # 上限を超えた場合は、最も古い'a'のキーが削除される
+    keys = {message: push(alert_by_line, message, error) for message in 'cd'}
+    assert push(alert_by_line, 'a', error) not in keys.values()
+    assert push(alert_by_line, 'd', error) == keys['d']
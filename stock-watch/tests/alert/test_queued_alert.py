@@ -0,0 +1,155 @@
+import time
+from threading import Event
+
+import pytest
+
+from alert import IAlert
+from alert import QueuedAlert
+from exceptions import AlertException
+from exceptions import PartialAlertException
+
+
+class RecordingAlert(IAlert):
+    """
+    テスト用の通知先
+    送信されたメッセージを、送信ごとに記録する
+    """
+
+    def __init__(self, delay: float = 0, failures: int = 0):
+        self.batches = []
+        self.delay = delay
+        self.failures = failures
+        self.released = Event()
+
+    def send_message(self, message: str):
+        self.send_messages([message])
+
+    def send_messages(self, messages):
+        # 待っている送信は、テストの終了時に解放する
+        self.released.wait(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise AlertException('error')
+        self.batches.append(list(messages))
+
+
+@pytest.fixture
+def short_retry_interval(mocker):
+    mocker.patch.object(QueuedAlert, 'retry_interval', 0.01)
+
+
+def test_send_without_waiting():
+    """
+    送信を待たずに戻り、バックグラウンドでまとめて送信されること
+
+    """
+    target = RecordingAlert(delay=0.2)
+    alert = QueuedAlert(target)
+    try:
+        started = time.monotonic()
+        for i in range(5):
+            alert.send_message(f'alert {i}')
+        assert time.monotonic() - started < 0.1
+
+        assert alert.flush(timeout=5) == []
+        assert target.batches == [[f'alert {i}' for i in range(5)]]
+        stats = alert.get_stats()
+        assert stats['alert_queued'] == 5
+        assert stats['alert_delivered'] == 5
+        assert stats['alert_pending'] == 0
+    finally:
+        alert.close()
+
+
+def test_retry(short_retry_interval):
+    """
+    送信に失敗した場合、再試行して送信されること
+
+    """
+    target = RecordingAlert(failures=2)
+    alert = QueuedAlert(target, retries=2)
+    try:
+        alert.send_messages(['alert 1', 'alert 2'])
+        assert alert.flush(timeout=5) == []
+        assert target.batches == [['alert 1', 'alert 2']]
+        assert alert.get_stats()['alert_retries'] == 2
+    finally:
+        alert.close()
+
+
+def test_retry_only_undelivered(mocker, short_retry_interval):
+    """
+    一部だけを送信できた場合、送信できなかったテキストだけを再試行すること
+
+    """
+    target = mocker.Mock(spec=IAlert)
+    target.send_messages.side_effect = [
+        PartialAlertException('error', 1, ['alert 2']),
+        None,
+    ]
+    target.get_stats.return_value = {}
+    alert = QueuedAlert(target, retries=1)
+    try:
+        alert.send_messages(['alert 1', 'alert 2'])
+        assert alert.flush(timeout=5) == []
+        assert target.send_messages.call_args_list == [
+            mocker.call(['alert 1', 'alert 2']),
+            mocker.call(['alert 2']),
+        ]
+        assert alert.get_stats()['alert_delivered'] == 2
+    finally:
+        alert.close()
+
+
+def test_undelivered_after_retries(short_retry_interval):
+    """
+    再試行しても送信できなかったメッセージが、flushで返されること
+
+    """
+    target = RecordingAlert(failures=10)
+    alert = QueuedAlert(target, retries=1)
+    try:
+        alert.send_messages(['alert 1', 'alert 2'])
+        assert alert.flush(timeout=5) == ['alert 1', 'alert 2']
+        assert alert.get_stats()['alert_undelivered'] == 2
+        # 返したメッセージは、次のflushでは返さない
+        assert alert.flush(timeout=5) == []
+    finally:
+        alert.close()
+
+
+def test_flush_deadline():
+    """
+    期限までに送信できなかった送信中・送信待ちのメッセージが、
+    期限を過ぎるとすぐに返されること
+
+    """
+    target = RecordingAlert(delay=10)
+    alert = QueuedAlert(target, flush_timeout=0.2)
+    try:
+        alert.send_message('alert 1')
+        # 最初のメッセージの送信中に、次のメッセージを依頼する
+        time.sleep(QueuedAlert.linger * 4)
+        alert.send_message('alert 2')
+
+        started = time.monotonic()
+        assert alert.flush() == ['alert 1', 'alert 2']
+        assert time.monotonic() - started < 5
+        stats = alert.get_stats()
+        assert stats['alert_undelivered'] == 2
+        assert stats['alert_pending'] == 0
+    finally:
+        target.released.set()
+        alert.close()
+    assert alert.get_stats()['alert_delivered'] == 0
+
+
+def test_send_after_close():
+    """
+    送信を終了した後は、例外が発生すること
+
+    """
+    alert = QueuedAlert(RecordingAlert())
+    alert.close()
+    with pytest.raises(AlertException):
+        alert.send_message('alert 1')
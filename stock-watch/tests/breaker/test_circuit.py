@@ -0,0 +1,108 @@
+import time
+from threading import Event
+
+import pytest
+
+from breaker import CircuitBreaker
+
+
+@pytest.fixture
+def set_monotonic(mocker):
+    """
+    time.monotonicの返す時刻を設定する
+    """
+    monotonic_mock = mocker.patch('breaker.circuit.time.monotonic')
+
+    def set_monotonic(now: float):
+        monotonic_mock.return_value = now
+    set_monotonic(100.0)
+    return set_monotonic
+
+
+def test_open_after_threshold():
+    """
+    連続して失敗した回数が閾値に達した場合に遮断し、
+    途中で成功した場合は失敗の回数を数え直すこと
+
+    """
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.closed
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.open
+    assert not breaker.allow()
+    assert not breaker.allow()
+    assert breaker.get_stats() == {
+        'breaker_opened': 1,
+        'breaker_rejected': 2,
+    }
+
+
+def test_half_open(set_monotonic):
+    """
+    確認用の関数がない場合、一定時間後に1件だけ要求を通し、
+    成功した場合は遮断をやめ、失敗した場合は遮断を続けること
+
+    """
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    set_monotonic(129.0)
+    assert not breaker.allow()
+
+    set_monotonic(130.0)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.half_open
+    # 確認中は、他の要求を通さない
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.open
+
+    set_monotonic(159.0)
+    assert not breaker.allow()
+    set_monotonic(160.0)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.closed
+    assert breaker.allow()
+
+
+def test_probe_in_background():
+    """
+    確認用の関数がある場合、回復するまで一定時間ごとに確認し、
+    回復した時点で遮断をやめること
+
+    """
+    results = [Exception('error'), Exception('error'), None]
+    probed = Event()
+
+    def probe():
+        result = results.pop(0)
+        if not results:
+            probed.set()
+        if result is not None:
+            raise result
+
+    breaker = CircuitBreaker(
+        failure_threshold=1,
+        recovery_timeout=0.01,
+        probe=probe
+    )
+    try:
+        breaker.record_failure()
+        assert not breaker.allow()
+        assert probed.wait(5)
+        for _ in range(100):
+            if breaker.state == CircuitBreaker.closed:
+                break
+            time.sleep(0.01)
+        assert breaker.state == CircuitBreaker.closed
+        assert breaker.allow()
+        assert results == []
+    finally:
+        breaker.close()
@@ -1,19 +1,47 @@
+import os
+import shutil
+import time
 from typing import Callable
+from decimal import Decimal
 from os import path
 
 import pytest
 
 from db import CsvAsDb
+from db.rule import Rule
 from exceptions import DbException
+from log import ILogger
+
+
+@pytest.fixture(params=['pandas', 'stream', 'snapshot'])
+def loader(request, mocker) -> str:
+    """
+    CSVの読み込み方法を切り替えて、
+    いずれの読み込み方法でも同じ結果となることを確認する
+    ('snapshot'の場合は、保存済みのスナップショットから読み込む)
+    """
+    use_snapshot = request.param == 'snapshot'
+    mocker.patch(
+        'db.csv.CsvAsDb.loader',
+        'stream' if use_snapshot else request.param
+    )
+    mocker.patch('db.csv.CsvAsDb.use_snapshot', use_snapshot)
+    return request.param
 
 
 @pytest.fixture
-def make_object_func(mocker) -> Callable[[str], CsvAsDb]:
+def make_object_func(mocker, loader, tmp_path) -> Callable[[str], CsvAsDb]:
     """
     引数で指定したファイルをDBとして、
     CsvAsDbオブジェクトを生成する
     """
     def make_object_func(file: str) -> CsvAsDb:
+        if loader == 'snapshot':
+            # 1回目の生成でスナップショットを作成し、2回目で読み込む
+            file = shutil.copy(file, tmp_path)
+            mocker.patch('db.csv.CsvAsDb.csv_file', file)
+            CsvAsDb()
+            mocker.patch.dict('db.csv.loaders', {'stream': None})
         mocker.patch('db.csv.CsvAsDb.csv_file', file)
         return CsvAsDb()
     return make_object_func
@@ -54,6 +82,27 @@ def object_by_only_numeric(make_object_func):
     )
 
 
+@pytest.fixture
+def object_by_ladder(make_object_func):
+    return make_object_func(
+        '{}/{}'.format(path.dirname(__file__), 'test_ladder.csv')
+    )
+
+
+@pytest.fixture
+def object_by_indicator(make_object_func):
+    return make_object_func(
+        '{}/{}'.format(path.dirname(__file__), 'test_indicator.csv')
+    )
+
+
+@pytest.fixture
+def object_by_decimal_price(make_object_func):
+    return make_object_func(
+        '{}/{}'.format(path.dirname(__file__), 'test_decimal.csv')
+    )
+
+
 def test_get_descriptions(object_by_normal_file):
     """
     正常に銘柄コードのリストが取得できること
@@ -83,32 +132,27 @@ def test_get_descriptions_from_only_numeric_file(object_by_only_numeric):
     assert result == [12345, 8267, 1333]
 
 
-def test_get_description(object_by_normal_file, mocker):
+def test_get_description(object_by_normal_file):
     """
     正常に銘柄コードグループのリストが取得できること
+    (不正データの銘柄は含まれない)
 
     """
-    # mock
-    descriptions = [136, 639, 543254, 453]
-    triggers = ['under', 'over', 'over', 'under']
-    mocker.patch.object(
-        object_by_normal_file,
-        'get_descriptions',
-        return_value=descriptions
-    )
-    mock__get_price_triger_from_db = \
-        mocker.patch.object(
-            object_by_normal_file,
-            '_CsvAsDb__get_price_trigger_from_db'
-        )
-    mock__get_price_triger_from_db.side_effect = \
-        lambda description: (0, triggers[descriptions.index(description)])
-
-    # exec
     result = object_by_normal_file.get_description_groups()
 
-    # confirm
-    assert result == [[639, 543254], [136, 453]]
+    assert result == [[1333, 12345], [8267]]
+
+
+def test_get_description_groups_by_ladder(object_by_ladder):
+    """
+    複数のルールを持つ銘柄について、
+    以上・以下の両方のルールを持つ銘柄は3つ目のグループとなり、
+    各銘柄はいずれか1つのグループにのみ属すること
+
+    """
+    result = object_by_ladder.get_description_groups()
+
+    assert result == [[1333], [12345], [8267]]
 
 
 def test_get_judge_func_trigger_over(object_by_normal_file):
@@ -153,19 +197,29 @@ def test_get_judge_func_trigger_under(object_by_normal_file):
     assert result_func(test_param3) is False
 
 
-def test_get_judge_func_exception_by_duplicate(
-    object_by_duplicate_description
-):
+def test_get_judge_func_by_duplicate(object_by_duplicate_description):
     """
-    DBにて指定銘柄データが重複していた場合、
-    正常にDbExceptionがraiseされること
+    DBにて指定銘柄データが複数行ある場合、
+    いずれかの基準を超えた場合に発火する判定メソッドが返却されること
 
     """
-    with pytest.raises(DbException) as ex:
-        object_by_duplicate_description.get_judge_func(1333)
+    result_func = object_by_duplicate_description.get_judge_func(1333)
+    assert result_func(1999) is True
+    assert result_func(2400) is True
+    assert result_func(2501) is True
 
-    message = 'DBデータが不正です。 銘柄コード: 1333'
-    assert str(ex.value) == message
+
+def test_get_judge_func_by_ladder(object_by_ladder):
+    """
+    複数の基準価格を持つ銘柄について、
+    いずれの基準も超えていない場合のみ発火しないこと
+
+    """
+    result_func = object_by_ladder.get_judge_func(8267)
+    assert result_func(2700) is True
+    assert result_func(2701) is False
+    assert result_func(3199) is False
+    assert result_func(3200) is True
 
 
 def test_get_judge_func_exception_by_invalid_trigger(object_by_bad_trigger):
@@ -215,7 +269,7 @@ def test_make_alert_message_trigger_over(object_by_normal_file):
     (トリガーが以上の場合)
 
     """
-    result = object_by_normal_file.make_alert_message(12345)
+    result = object_by_normal_file.make_alert_message(12345, Decimal(134))
 
     message = '銘柄コード: 12345 が 価格: 134.0 円を上回りました。'
     assert result == message
@@ -227,7 +281,7 @@ def test_make_alert_message_trigger_under(object_by_normal_file):
     (トリガーが以下の場合)
 
     """
-    result = object_by_normal_file.make_alert_message(8267)
+    result = object_by_normal_file.make_alert_message(8267, Decimal(2700))
 
     message = '銘柄コード: 8267 が 価格: 2,700.0 円を下回りました。'
     assert result == message
@@ -239,25 +293,56 @@ def test_make_alert_message_not_existing_description(object_by_normal_file):
     DbExceptionが返ること
     """
     with pytest.raises(DbException) as ex:
-        object_by_normal_file.make_alert_message(9999999999)
+        object_by_normal_file.make_alert_message(9999999999, Decimal(1))
 
     message = 'DBにデータが存在しません。 銘柄コード: 9999999999'
     assert str(ex.value) == message
 
 
-def test_make_alert_message_exception_by_duplicate(
-    object_by_duplicate_description
-):
+def test_make_alert_message_by_ladder_under(object_by_ladder):
     """
-    DBにて指定銘柄データが重複していた場合、
-    正常にDbExceptionがraiseされること
+    価格が複数の基準を超えた場合、
+    超えたすべての基準価格がメッセージに含まれること
 
     """
-    with pytest.raises(DbException) as ex:
-        object_by_duplicate_description.make_alert_message(1333)
+    result = object_by_ladder.make_alert_message(8267, Decimal(2400))
 
-    message = 'DBデータが不正です。 銘柄コード: 1333'
-    assert str(ex.value) == message
+    message = '銘柄コード: 8267 が 価格: 2,700.0 円, 2,500.0 円を下回りました。'
+    assert result == message
+
+    result = object_by_ladder.make_alert_message(8267, Decimal(2600))
+
+    message = '銘柄コード: 8267 が 価格: 2,700.0 円を下回りました。'
+    assert result == message
+
+
+def test_make_alert_message_by_ladder_over(object_by_ladder):
+    """
+    以上のルールが複数ある場合、超えた基準価格が昇順で含まれること
+    (全く同じ内容の行は1つにまとめられる)
+
+    """
+    result = object_by_ladder.make_alert_message(1333, Decimal(2300))
+
+    message = '銘柄コード: 1333 が 価格: 2,000.0 円, 2,200.5 円を上回りました。'
+    assert result == message
+
+
+def test_make_alert_message_by_duplicate(object_by_duplicate_description):
+    """
+    以上・以下の両方の基準を超えた場合、
+    トリガー条件ごとに1行のメッセージとなること
+
+    """
+    result = object_by_duplicate_description.make_alert_message(
+        1333,
+        Decimal(2300)
+    )
+
+    message = \
+        '銘柄コード: 1333 が 価格: 2,000.0 円を上回りました。\n' \
+        '銘柄コード: 1333 が 価格: 2,500.0 円を下回りました。'
+    assert result == message
 
 
 def test_make_alert_message_exception_by_invalid_trigger(
@@ -269,7 +354,7 @@ def test_make_alert_message_exception_by_invalid_trigger(
 
     """
     with pytest.raises(DbException) as ex:
-        object_by_bad_trigger.make_alert_message(12345)
+        object_by_bad_trigger.make_alert_message(12345, Decimal(1))
 
     message = 'DBデータが不正です。 銘柄コード: 12345'
     assert str(ex.value) == message
@@ -282,7 +367,7 @@ def test_make_alert_message_exception_by_invalid_price(object_by_bad_price):
 
     """
     with pytest.raises(DbException) as ex:
-        object_by_bad_price.make_alert_message(7452)
+        object_by_bad_price.make_alert_message(7452, Decimal(1))
 
     message = 'DBデータが不正です。 銘柄コード: 7452'
     assert str(ex.value) == message
@@ -294,12 +379,62 @@ def test_make_alert_message_by_only_numeric_file(object_by_only_numeric):
     正常にアラートメッセージが取得できること
 
     """
-    result = object_by_only_numeric.make_alert_message(8267)
+    result = object_by_only_numeric.make_alert_message(8267, Decimal(2000))
 
     message = '銘柄コード: 8267 が 価格: 2,700.0 円を下回りました。'
     assert result == message
 
 
+def test_get_judge_func_by_decimal_price(object_by_decimal_price):
+    """
+    小数の価格が設定されたCSVファイルを元にした
+    トリガー条件判定メソッドが返却されること
+
+    """
+    result_func = object_by_decimal_price.get_judge_func(1333)
+    assert result_func(Decimal('1999.8')) is False
+    assert result_func(Decimal('1999.9')) is True
+    assert result_func(2000) is True
+
+
+def test_make_alert_message_by_decimal_price(object_by_decimal_price):
+    """
+    小数の価格が設定されたCSVファイルを元にして、
+    正常にアラートメッセージが取得できること
+
+    """
+    result = object_by_decimal_price.make_alert_message(8267, Decimal(2700))
+
+    message = '銘柄コード: 8267 が 価格: 2,700.5 円を下回りました。'
+    assert result == message
+
+
+def test_get_error_report(object_by_normal_file):
+    """
+    不正な行が検証エラーレポートにまとめて出力されること
+
+    """
+    result = object_by_normal_file.get_error_report()
+
+    message = 'DBデータが不正です。 2件目 銘柄コード: 5555 (価格不正, トリガー不正)'
+    assert result == message
+
+
+def test_get_error_report_by_duplicate(object_by_duplicate_description):
+    """
+    重複する銘柄が存在しても、エラーとならないこと
+
+    """
+    assert object_by_duplicate_description.get_error_report() == ''
+
+
+def test_get_error_report_by_only_numeric_file(object_by_only_numeric):
+    """
+    エラー行の全くないファイルの場合、空文字列が返ること
+
+    """
+    assert object_by_only_numeric.get_error_report() == ''
+
 
 def test_make_fail_message(object_by_normal_file):
     """
@@ -310,3 +445,263 @@ def test_make_fail_message(object_by_normal_file):
 
     message = '銘柄コード: 1333のDB登録取得が失敗しました。'
     assert result == message
+
+
+def test_get_triggered_descriptions(object_by_normal_file):
+    """
+    複数銘柄の価格について、トリガー条件を満たす銘柄が
+    渡した順序で一括で返却されること
+    (不正データの銘柄、存在しない銘柄は含まれない)
+
+    """
+    prices = {
+        12345: Decimal(134),
+        8267: Decimal(2701),
+        1333: Decimal(2000),
+        5555: Decimal(1),
+        9999999999: Decimal(1),
+    }
+    result = object_by_normal_file.get_triggered_descriptions(prices)
+    assert result == [12345, 1333]
+
+
+def test_get_crossed_rules(object_by_ladder):
+    """
+    複数銘柄の価格について、価格が超えた基準のルールが
+    渡した順序で一括で返却されること
+
+    """
+    prices = {
+        1333: Decimal(2300),
+        8267: Decimal(2600),
+        12345: Decimal(135),
+        9999: Decimal(1),
+    }
+    assert object_by_ladder.get_crossed_rules(prices) == {
+        1333: [
+            Rule(1333, Decimal(2000), 'over'),
+            Rule(1333, Decimal('2200.5'), 'over'),
+        ],
+        8267: [Rule(8267, Decimal(2700), 'under')],
+    }
+
+
+def test_get_indicator_rules(object_by_indicator):
+    """
+    指標によるルールが銘柄ごとに取得できること
+    (期間が2以上の整数でないルールを持つ銘柄、存在しない銘柄は含まれない)
+
+    """
+    result = object_by_indicator.get_indicator_rules(
+        [8267, 1333, 7203, 5555, 6666, 9999]
+    )
+    assert result == {
+        8267: [Rule(8267, Decimal(25), 'sma_over')],
+        1333: [Rule(1333, Decimal(3), 'change_under')],
+        7203: [Rule(7203, Decimal(20), 'bollinger_over')],
+    }
+
+
+def test_get_description_groups_by_indicator(object_by_indicator):
+    """
+    指標によるルールのみを持つ銘柄も、
+    上昇・下落の方向でグループに分けられること
+
+    """
+    result = object_by_indicator.get_description_groups()
+    assert result == [[7203], [1333], [8267]]
+
+
+def test_get_all_rules_by_indicator(object_by_indicator):
+    """
+    指標によるルールを含む、全てのルールが取得できること
+    (不正データの銘柄のルールは含まれない)
+
+    """
+    result = object_by_indicator.get_all_rules()
+    assert sorted(result) == sorted([
+        Rule(8267, Decimal(2700), 'under'),
+        Rule(8267, Decimal(25), 'sma_over'),
+        Rule(1333, Decimal(3), 'change_under'),
+        Rule(7203, Decimal(20), 'bollinger_over'),
+    ])
+
+
+def test_get_error_report_by_indicator(object_by_indicator):
+    """
+    期間が2以上の整数でない指標によるルールが、エラーレポートに含まれること
+
+    """
+    assert object_by_indicator.get_error_report() == \
+        'DBデータが不正です。 5件目 銘柄コード: 5555 (価格不正)\n' \
+        'DBデータが不正です。 6件目 銘柄コード: 6666 (価格不正)'
+
+
+def test_make_alert_message_with_rules(object_by_indicator):
+    """
+    お知らせ対象のルールを指定した場合、
+    価格によらずそのルールでメッセージが作成されること
+
+    """
+    result = object_by_indicator.make_alert_message(
+        8267,
+        Decimal(2600),
+        [Rule(8267, Decimal(25), 'sma_over')]
+    )
+    assert result == '銘柄コード: 8267 が 25期間の単純移動平均を上抜けました。'
+
+
+def write_csv(file, content: str, mtime_ns: int):
+    """
+    テスト用関数
+    CSVファイルを書き込み、更新日時を設定する
+    """
+    file.write_text(content)
+    os.utime(file, ns=(mtime_ns, mtime_ns))
+
+
+def test_reload_if_changed(tmp_path, loader):
+    """
+    CSVファイルが変更された場合、追加・変更・削除が反映されること
+
+    """
+    file = tmp_path / 'alert.csv'
+    write_csv(
+        file,
+        'description,price,trigger\n8267,2700,under\n1333,2000,over\n',
+        10 ** 9
+    )
+    db = CsvAsDb(str(file))
+
+    # 変更がない場合は読み込み直さない
+    assert db.reload_if_changed() is False
+
+    write_csv(
+        file,
+        'description,price,trigger\n'
+        '8267,2500,under\n7203,3000,over\n5555,uu,pp\n',
+        2 * 10 ** 9
+    )
+    assert db.reload_if_changed() is True
+
+    assert db.get_descriptions() == [8267, 7203, 5555]
+    assert db.get_triggered_descriptions(
+        {8267: Decimal(2600), 7203: Decimal(3000), 1333: Decimal(2000)}
+    ) == [7203]
+    message = '銘柄コード: 8267 が 価格: 2,500.0 円を下回りました。'
+    assert db.make_alert_message(8267, Decimal(2500)) == message
+    with pytest.raises(DbException):
+        db.get_judge_func(1333)
+    assert db.get_error_report() == \
+        'DBデータが不正です。 3件目 銘柄コード: 5555 (価格不正, トリガー不正)'
+
+
+def test_reload_if_changed_by_invalid_columns(tmp_path, loader):
+    """
+    読み込み直したCSVファイルの項目が不正な場合、
+    変更前のルールが維持され、エラーレポートに追加されること
+
+    """
+    file = tmp_path / 'alert.csv'
+    write_csv(file, 'description,price,trigger\n8267,2700,under\n', 10 ** 9)
+    db = CsvAsDb(str(file))
+
+    write_csv(file, 'descripion,price,trigger\n8267,2500,under\n', 2 * 10 ** 9)
+    assert db.reload_if_changed() is False
+
+    assert db.get_triggered_descriptions({8267: Decimal(2700)}) == [8267]
+    assert db.get_error_report() == 'DBファイルに項目が存在しません。 項目: description'
+
+
+def test_start_watching(tmp_path, loader):
+    """
+    変更の確認を開始すると、バックグラウンドでCSVファイルの変更が反映されること
+
+    """
+    file = tmp_path / 'alert.csv'
+    write_csv(file, 'description,price,trigger\n8267,2700,under\n', 10 ** 9)
+    db = CsvAsDb(str(file))
+    db.start_watching(0.01)
+    try:
+        write_csv(
+            file,
+            'description,price,trigger\n8267,2700,under\n1333,2000,over\n',
+            2 * 10 ** 9
+        )
+        for _ in range(200):
+            if db.get_descriptions() == [8267, 1333]:
+                break
+            time.sleep(0.01)
+        assert db.get_descriptions() == [8267, 1333]
+    finally:
+        db.stop_watching()
+
+
+def test_start_watching_keeps_running_after_error(tmp_path, loader, mocker):
+    """
+    CSVファイルを読めない間(置き換え中など)も、変更前のルールが維持され、
+    エラーをログに出力して確認を続けること
+
+    """
+    file = tmp_path / 'alert.csv'
+    write_csv(file, 'description,price,trigger\n8267,2700,under\n', 10 ** 9)
+    db = CsvAsDb(str(file))
+    logger_mock = mocker.Mock(spec=ILogger)
+    file.unlink()
+    db.start_watching(0.01, logger_mock)
+    try:
+        for _ in range(200):
+            if logger_mock.exception.called:
+                break
+            time.sleep(0.01)
+        assert isinstance(
+            logger_mock.exception.call_args[0][0],
+            FileNotFoundError
+        )
+        assert db.get_descriptions() == [8267]
+
+        write_csv(
+            file,
+            'description,price,trigger\n8267,2700,under\n1333,2000,over\n',
+            2 * 10 ** 9
+        )
+        for _ in range(200):
+            if db.get_descriptions() == [8267, 1333]:
+                break
+            time.sleep(0.01)
+        assert db.get_descriptions() == [8267, 1333]
+    finally:
+        db.stop_watching()
+
+
+def test_reload_does_not_change_previous_index(tmp_path, loader):
+    """
+    読み込み直した場合、変更前の索引は変更されずに入れ替えられること
+    (読み込み直す前に取得した判定メソッドは、変更前のルールで判定する)
+
+    """
+    file = tmp_path / 'alert.csv'
+    write_csv(file, 'description,price,trigger\n8267,2700,under\n', 10 ** 9)
+    db = CsvAsDb(str(file))
+    judge_func = db.get_judge_func(8267)
+
+    write_csv(file, 'description,price,trigger\n8267,2500,under\n', 2 * 10 ** 9)
+    assert db.reload_if_changed() is True
+
+    assert judge_func(2600) is True
+    assert db.get_judge_func(8267)(2600) is False
+
+
+def test_invalid_loader():
+    """
+    CSVの読み込み方法が不正な場合、DbExceptionが発生すること
+
+    """
+    with pytest.raises(DbException) as ex:
+        CsvAsDb(
+            '{}/{}'.format(path.dirname(__file__), 'test_normal.csv'),
+            'unknown'
+        )
+
+    message = 'CSVの読み込み方法が不正です。 読み込み方法: unknown'
+    assert str(ex.value) == message
@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+import pytest
+
+from db.index import RuleIndex
+from db.rule import Rule
+
+
+@pytest.fixture
+def rule_index():
+    return RuleIndex([
+        Rule(8267, Decimal('2700'), 'under'),
+        Rule(1333, Decimal('2000.5'), 'over'),
+        Rule(12345, Decimal('134'), 'over'),
+    ])
+
+
+def test_get(rule_index):
+    """
+    銘柄コードからルールが取得できること
+    存在しない銘柄の場合は空のリストが返ること
+
+    """
+    assert rule_index.get(1333) == [Rule(1333, Decimal('2000.5'), 'over')]
+    assert rule_index.get(9999) == []
+
+
+def test_get_crossed():
+    """
+    価格が超えたすべての基準が取得できること
+
+    """
+    rule_index = RuleIndex([
+        Rule(8267, Decimal(2700), 'under'),
+        Rule(8267, Decimal(3200), 'over'),
+        Rule(8267, Decimal(2500), 'under'),
+        Rule(8267, Decimal(3400), 'over'),
+    ])
+
+    assert rule_index.get_crossed(8267, Decimal(3000)) == []
+    assert rule_index.get_crossed(8267, Decimal(2600)) == [
+        Rule(8267, Decimal(2700), 'under'),
+    ]
+    assert rule_index.get_crossed(8267, Decimal(2500)) == [
+        Rule(8267, Decimal(2500), 'under'),
+        Rule(8267, Decimal(2700), 'under'),
+    ]
+    assert rule_index.get_crossed(8267, Decimal(3400)) == [
+        Rule(8267, Decimal(3200), 'over'),
+        Rule(8267, Decimal(3400), 'over'),
+    ]
+    assert rule_index.get_crossed(9999, Decimal(1)) == []
+
+
+def test_judge_ladder():
+    """
+    複数の基準を持つ銘柄について、いずれかを超えた場合に発火すること
+
+    """
+    rule_index = RuleIndex([
+        Rule(8267, Decimal(2700), 'under'),
+        Rule(8267, Decimal(3200), 'over'),
+        Rule(8267, Decimal(2500), 'under'),
+    ])
+
+    assert rule_index.judge({8267: Decimal(3000)}) == []
+    assert rule_index.judge({8267: Decimal(2700)}) == [8267]
+    assert rule_index.judge({8267: Decimal(3300)}) == [8267]
+
+
+def test_judge_boundary(rule_index):
+    """
+    基準価格ちょうどの場合は、以上・以下ともに発火すること
+
+    """
+    prices = {
+        8267: Decimal('2700'),
+        1333: Decimal('2000.5'),
+        12345: Decimal('133.9'),
+    }
+    assert rule_index.judge(prices) == [8267, 1333]
+
+
+def test_judge_keep_order(rule_index):
+    """
+    判定結果が引数の順序を保つこと
+
+    """
+    prices = {
+        12345: Decimal(200),
+        8267: Decimal(1),
+        1333: Decimal(3000),
+    }
+    assert rule_index.judge(prices) == [12345, 8267, 1333]
+
+
+def test_judge_not_existing_description(rule_index):
+    """
+    ルールの存在しない銘柄は発火しないこと
+    (銘柄コード順の配列の範囲外となるコードを含む)
+
+    """
+    prices = {
+        1: Decimal(1),
+        99999: Decimal(1),
+        8267: Decimal(1),
+    }
+    assert rule_index.judge(prices) == [8267]
+
+
+def test_judge_empty():
+    """
+    ルール、価格のいずれかが空の場合は空のリストが返ること
+
+    """
+    assert RuleIndex([]).judge({1333: Decimal(1)}) == []
+    assert RuleIndex([Rule(1333, Decimal(1), 'over')]).judge({}) == []
+
+
+def test_update(rule_index):
+    """
+    変更のあった銘柄のルールだけが差し替わり、
+    一括判定・基準の取得に反映されること
+
+    """
+    rule_index.update({
+        # 削除
+        8267: [],
+        # 変更
+        1333: [Rule(1333, Decimal(1500), 'under')],
+        # 追加 (配列の先頭・末尾)
+        1: [Rule(1, Decimal(10), 'over')],
+        99999: [Rule(99999, Decimal(10), 'under')],
+    })
+
+    assert rule_index.get_descriptions() == [1, 1333, 12345, 99999]
+    assert rule_index.get(8267) == []
+    prices = {
+        8267: Decimal(1),
+        1333: Decimal(1500),
+        12345: Decimal(134),
+        1: Decimal(10),
+        99999: Decimal(11),
+    }
+    assert rule_index.judge(prices) == [1333, 12345, 1]
+    assert rule_index.get_crossed(1333, Decimal(3000)) == []
+
+
+def test_update_all_removed(rule_index):
+    """
+    すべての銘柄のルールを削除した場合、発火しないこと
+
+    """
+    rule_index.update({8267: [], 1333: [], 12345: []})
+
+    assert len(rule_index) == 0
+    assert rule_index.judge({8267: Decimal(1)}) == []
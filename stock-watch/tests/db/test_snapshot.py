@@ -0,0 +1,115 @@
+from decimal import Decimal
+
+import pytest
+
+from db import CsvAsDb
+from db.index import RuleIndex
+from db.loader import load_by_stream
+from db.rule import Rule
+from db.snapshot import hash_file
+from db.snapshot import read_snapshot
+from db.snapshot import write_snapshot
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    file = tmp_path / 'alert.csv'
+    file.write_text(
+        'description,price,trigger\n'
+        '8267,2700,under\n8267,3200,over\n1333,2200.5,over\n5555,uu,pp\n'
+        '1333,25,ema_over\n'
+    )
+    return str(file)
+
+
+def test_read_snapshot(tmp_path, csv_file):
+    """
+    書き込んだスナップショットから、CSVと同じ内容が読み込めること
+
+    """
+    result = load_by_stream(csv_file)
+    csv_hash = hash_file(csv_file)
+    snapshot_file = str(tmp_path / 'alert.csv.snapshot')
+    write_snapshot(snapshot_file, csv_hash, result, RuleIndex(result.rules))
+
+    loaded_result, index = read_snapshot(snapshot_file, csv_hash)
+    assert list(loaded_result.descriptions) == [8267, 1333, 5555]
+    assert list(loaded_result.rules) == list(result.rules)
+    assert loaded_result.invalid_descriptions == {5555}
+    assert loaded_result.error_report == result.error_report
+    assert loaded_result.indicator_rules == \
+        [Rule(1333, Decimal(25), 'ema_over')]
+    assert index.get(8267) == [
+        Rule(8267, Decimal('2700.0'), 'under'),
+        Rule(8267, Decimal('3200.0'), 'over'),
+    ]
+    assert index.judge({8267: Decimal(3000), 1333: Decimal(2300)}) == [1333]
+
+
+def test_read_snapshot_by_other_hash(tmp_path, csv_file):
+    """
+    CSVのハッシュが一致しない場合、Noneが返ること
+
+    """
+    result = load_by_stream(csv_file)
+    snapshot_file = str(tmp_path / 'alert.csv.snapshot')
+    write_snapshot(snapshot_file, b'\0' * 32, result, RuleIndex(result.rules))
+
+    assert read_snapshot(snapshot_file, hash_file(csv_file)) is None
+
+
+@pytest.mark.parametrize('content', [b'', b'SWSNAP01', b'broken' * 100])
+def test_read_snapshot_by_broken_file(tmp_path, csv_file, content):
+    """
+    スナップショットがない、または壊れている場合、Noneが返ること
+
+    """
+    snapshot_file = tmp_path / 'alert.csv.snapshot'
+    assert read_snapshot(str(snapshot_file), hash_file(csv_file)) is None
+
+    snapshot_file.write_bytes(content)
+    assert read_snapshot(str(snapshot_file), hash_file(csv_file)) is None
+
+
+def test_update_index_from_snapshot(tmp_path, csv_file):
+    """
+    スナップショット(読み取り専用)から作成した索引も、更新できること
+
+    """
+    result = load_by_stream(csv_file)
+    csv_hash = hash_file(csv_file)
+    snapshot_file = str(tmp_path / 'alert.csv.snapshot')
+    write_snapshot(snapshot_file, csv_hash, result, RuleIndex(result.rules))
+    index = read_snapshot(snapshot_file, csv_hash)[1]
+
+    index.update({8267: [], 7203: [Rule(7203, Decimal(3000), 'over')]})
+    assert index.get_descriptions() == [1333, 7203]
+
+
+def test_csv_as_db_uses_snapshot(mocker, csv_file):
+    """
+    CSVの内容が変わらない間はスナップショットから読み込み、
+    変わった場合はCSVを読み込み直してスナップショットを作り直すこと
+
+    """
+    stream = mocker.Mock(wraps=load_by_stream)
+    mocker.patch('db.csv.CsvAsDb.loader', 'stream')
+    mocker.patch.dict('db.csv.loaders', {'stream': stream})
+
+    CsvAsDb(csv_file)
+    assert stream.call_count == 1
+
+    db = CsvAsDb(csv_file)
+    assert stream.call_count == 1
+    assert db.get_descriptions() == [8267, 1333, 5555]
+    assert db.get_error_report() == \
+        'DBデータが不正です。 4件目 銘柄コード: 5555 (価格不正, トリガー不正)'
+
+    with open(csv_file, 'a') as f:
+        f.write('7203,3000,over\n')
+    db = CsvAsDb(csv_file)
+    assert stream.call_count == 2
+    assert db.get_descriptions() == [8267, 1333, 5555, 7203]
+
+    CsvAsDb(csv_file)
+    assert stream.call_count == 2
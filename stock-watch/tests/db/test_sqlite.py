@@ -0,0 +1,219 @@
+from decimal import Decimal
+from os import path
+
+import pytest
+
+from db import SqliteDb
+from db.rule import Rule
+from exceptions import DbException
+
+
+@pytest.fixture(autouse=True)
+def no_snapshot(mocker):
+    """
+    取り込み元のCSVと同じ場所にスナップショットを作成しない
+    """
+    mocker.patch('db.csv.CsvAsDb.use_snapshot', False)
+
+
+@pytest.fixture
+def object_by_normal_file(tmp_path) -> SqliteDb:
+    """
+    test_normal.csvを取り込んだ、
+    SqliteDbオブジェクトを生成する
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    db.import_csv('{}/{}'.format(path.dirname(__file__), 'test_normal.csv'))
+    return db
+
+
+def test_get_descriptions(object_by_normal_file):
+    """
+    正常に銘柄コードのリストが取得できること
+    (不正データの銘柄は取り込まれない)
+
+    """
+    result = object_by_normal_file.get_descriptions()
+    assert result == [8267, 1333, 12345]
+
+
+def test_get_description_groups(object_by_normal_file):
+    """
+    正常に銘柄コードグループのリストが取得できること
+
+    """
+    result = object_by_normal_file.get_description_groups()
+    assert result == [[1333, 12345], [8267]]
+
+
+def test_get_judge_func_trigger_over(object_by_normal_file):
+    """
+    正常にトリガー条件判定メソッドが返却されること
+    (トリガーが以上の場合)
+
+    """
+    result_func = object_by_normal_file.get_judge_func(1333)
+    assert result_func(1999) is False
+    assert result_func(2000) is True
+    assert result_func(2001) is True
+
+
+def test_get_judge_func_not_existing_description(object_by_normal_file):
+    """
+    存在しない銘柄コードを指定した場合、DbExceptionが返ること
+
+    """
+    with pytest.raises(DbException) as ex:
+        object_by_normal_file.get_judge_func(5555)
+
+    message = 'DBにデータが存在しません。 銘柄コード: 5555'
+    assert str(ex.value) == message
+
+
+def test_get_triggered_descriptions(object_by_normal_file):
+    """
+    複数銘柄の価格について、トリガー条件を満たす銘柄が
+    渡した順序で一括で返却されること
+
+    """
+    prices = {
+        12345: Decimal(134),
+        8267: Decimal(2701),
+        1333: Decimal(2000),
+        5555: Decimal(1),
+    }
+    result = object_by_normal_file.get_triggered_descriptions(prices)
+    assert result == [12345, 1333]
+
+    # 2回目の判定に前回の価格が残らないこと
+    result = object_by_normal_file.get_triggered_descriptions({8267: 2700})
+    assert result == [8267]
+
+
+def test_make_alert_message(object_by_normal_file):
+    """
+    正常にお知らせメッセージが作成されること
+
+    """
+    result = object_by_normal_file.make_alert_message(8267, Decimal(2700))
+
+    message = '銘柄コード: 8267 が 価格: 2,700.0 円を下回りました。'
+    assert result == message
+
+
+def test_get_error_report(object_by_normal_file):
+    """
+    取り込み時の検証エラーがレポートとして取得できること
+
+    """
+    result = object_by_normal_file.get_error_report()
+
+    message = 'DBデータが不正です。 2件目 銘柄コード: 5555 (価格不正, トリガー不正)'
+    assert result == message
+
+
+def test_import_rules_replace(object_by_normal_file):
+    """
+    取り込みを行うと、既存のルールと検証エラーが置き換わること
+    また小数の価格が正確に保持されること
+
+    """
+    object_by_normal_file.import_rules([Rule(7203, Decimal('2500.5'), 'over')])
+
+    assert object_by_normal_file.get_descriptions() == [7203]
+    assert object_by_normal_file.get_error_report() == ''
+    message = '銘柄コード: 7203 が 価格: 2,500.5 円を上回りました。'
+    assert object_by_normal_file.make_alert_message(7203, Decimal(2600)) == message
+
+
+def test_keep_rules_between_connections(object_by_normal_file, tmp_path):
+    """
+    取り込んだルールが、別の接続からも取得できること
+
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    assert db.get_descriptions() == [8267, 1333, 12345]
+
+
+def test_ladder(tmp_path):
+    """
+    複数の基準価格を持つ銘柄について、
+    超えた基準による判定とメッセージ作成ができること
+
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    db.import_csv('{}/{}'.format(path.dirname(__file__), 'test_ladder.csv'))
+
+    assert db.get_description_groups() == [[1333], [12345], [8267]]
+    assert db.get_judge_func(8267)(2701) is False
+    assert db.get_judge_func(8267)(2700) is True
+    assert db.get_triggered_descriptions({8267: 2800, 1333: 2000}) == [1333]
+    message = '銘柄コード: 8267 が 価格: 2,700.0 円, 2,500.0 円を下回りました。'
+    assert db.make_alert_message(8267, Decimal(2400)) == message
+
+
+def test_get_crossed_rules(tmp_path):
+    """
+    複数銘柄の価格について、価格が超えた基準のルールが
+    渡した順序で一括で返却されること
+
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    db.import_csv('{}/{}'.format(path.dirname(__file__), 'test_ladder.csv'))
+
+    prices = {
+        1333: Decimal(2300),
+        8267: Decimal(2600),
+        12345: Decimal(135),
+        9999: Decimal(1),
+    }
+    assert db.get_crossed_rules(prices) == {
+        1333: [
+            Rule(1333, Decimal(2000), 'over'),
+            Rule(1333, Decimal('2200.5'), 'over'),
+        ],
+        8267: [Rule(8267, Decimal(2700), 'under')],
+    }
+
+
+def test_indicator_rules(tmp_path):
+    """
+    指標によるルールが取り込まれ、銘柄ごとに取得できること
+
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    db.import_csv(
+        '{}/{}'.format(path.dirname(__file__), 'test_indicator.csv')
+    )
+
+    assert db.get_description_groups() == [[7203], [1333], [8267]]
+    assert db.get_all_rules() == [
+        Rule(8267, Decimal(2700), 'under'),
+        Rule(8267, Decimal(25), 'sma_over'),
+        Rule(1333, Decimal(3), 'change_under'),
+        Rule(7203, Decimal(20), 'bollinger_over'),
+    ]
+    assert db.get_indicator_rules([8267, 1333, 7203, 5555, 9999]) == {
+        8267: [Rule(8267, Decimal(25), 'sma_over')],
+        1333: [Rule(1333, Decimal(3), 'change_under')],
+        7203: [Rule(7203, Decimal(20), 'bollinger_over')],
+    }
+    message = '銘柄コード: 1333 が 前日終値から3.0%以上下落しました。'
+    assert db.make_alert_message(
+        1333,
+        Decimal(100),
+        [Rule(1333, Decimal(3), 'change_under')]
+    ) == message
+
+
+def test_get_descriptions_with_indicator_rules(tmp_path):
+    """
+    指標によるルールのみの銘柄も、価格によるルールの銘柄の後に
+    銘柄コードのリストに含まれること
+
+    """
+    db = SqliteDb(str(tmp_path / 'alert.db'))
+    db.import_csv(
+        '{}/{}'.format(path.dirname(__file__), 'test_indicator.csv')
+    )
+    assert db.get_descriptions() == [8267, 1333, 7203]
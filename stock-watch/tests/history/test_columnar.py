@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from history import ColumnarPriceHistory
+
+
+@pytest.fixture
+def history(tmp_path) -> ColumnarPriceHistory:
+    return ColumnarPriceHistory(str(tmp_path / 'history'))
+
+
+def test_get_range(history):
+    """
+    追加した価格の履歴が、取得日時の範囲で取得できること
+
+    """
+    for timestamp, price in ((10, 100), (20, '100.5'), (30, 99)):
+        history.append(8267, Decimal(price), timestamp)
+    history.append(1333, Decimal(2000), 20)
+
+    times, prices = history.get_range(8267)
+    assert times.tolist() == [10, 20, 30]
+    assert prices.tolist() == [100.0, 100.5, 99.0]
+
+    times, prices = history.get_range(8267, 20, 30)
+    assert times.tolist() == [20]
+    assert prices.tolist() == [100.5]
+
+    times, prices = history.get_range(1333, start=15)
+    assert times.tolist() == [20]
+    assert prices.tolist() == [2000.0]
+
+
+def test_get_range_is_zero_copy(history):
+    """
+    取得した配列が、ファイルをコピーせずに参照する読み取り専用の配列であること
+
+    """
+    history.append(8267, Decimal(100), 10)
+    times, prices = history.get_range(8267)
+    assert times.dtype == np.int64
+    assert prices.dtype == np.float64
+    assert not times.flags.owndata
+    assert not prices.flags.writeable
+
+
+def test_get_range_not_existing_description(history):
+    """
+    履歴のない銘柄の場合、空の配列が返ること
+
+    """
+    times, prices = history.get_range(9999)
+    assert len(times) == 0
+    assert len(prices) == 0
+
+
+def test_append_after_interrupted(tmp_path, history):
+    """
+    追記の途中で中断されていた場合、
+    列の長さを揃えてから追記されること
+
+    """
+    history.append(8267, Decimal(100), 10)
+    # 取得日時のみ追記された状態
+    with open(tmp_path / 'history' / '8267.time', 'ab') as f:
+        f.write(np.array([20], dtype='<i8').tobytes())
+    assert history.get_range(8267)[0].tolist() == [10]
+
+    history.append(8267, Decimal(101), 30)
+    times, prices = history.get_range(8267)
+    assert times.tolist() == [10, 30]
+    assert prices.tolist() == [100.0, 101.0]
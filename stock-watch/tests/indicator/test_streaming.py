@@ -0,0 +1,192 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from db.rule import Rule
+from indicator import StreamingIndicator
+
+
+@pytest.fixture
+def state_file(tmp_path) -> str:
+    return str(tmp_path / 'indicator_state.db')
+
+
+@pytest.fixture
+def set_today(mocker):
+    """
+    判定時の日時を設定する
+    """
+    datetime_mock = mocker.patch(
+        'indicator.streaming.datetime',
+        wraps=datetime
+    )
+
+    def set_today(day: int, hour: int = 10, minute: int = 0):
+        datetime_mock.now.return_value = datetime(
+            2022, 10, day, hour, minute, tzinfo=StreamingIndicator.jst
+        )
+    return set_today
+
+
+def judge_prices(indicator, description, rule, prices):
+    """
+    テスト用関数
+    価格を1件ずつ判定し、条件を満たしたかどうかのリストを返す
+    """
+    return [
+        description in indicator.judge(
+            {description: Decimal(price)},
+            {description: [rule]}
+        )
+        for price in prices
+    ]
+
+
+def test_change(state_file, set_today):
+    """
+    前日終値からの変化率が指定値以上となった場合、条件を満たすこと
+    (前日終値は、前の日付の大引け後に取得した価格)
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'change_over')
+    under = Rule(8267, Decimal(3), 'change_under')
+    rules = {8267: [over, under]}
+
+    set_today(17)
+    indicator.judge({8267: Decimal(1000)}, rules)
+    # 前日終値がない場合は満たさない
+    assert indicator.judge({8267: Decimal(1100)}, rules) == {}
+    # 大引け後の価格は、指標を更新せずに記録する
+    set_today(17, 15, 0)
+    indicator.record({8267: Decimal(2000)})
+
+    set_today(18)
+    assert indicator.judge({8267: Decimal(2059)}, rules) == {}
+    assert indicator.judge({8267: Decimal(2060)}, rules) == {8267: [over]}
+    assert indicator.judge({8267: Decimal(1940)}, rules) == {8267: [under]}
+
+
+@pytest.mark.parametrize('day, hour, minute', [
+    # 大引け前
+    (17, 14, 59),
+    # 休場日 (大引けの時刻以降でも終値ではない)
+    (16, 15, 10),
+])
+def test_change_without_close(state_file, set_today, day, hour, minute):
+    """
+    前の日付で大引け後に取得した価格がない場合、前日終値を不明とし、
+    変化率による条件を満たさないこと
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'change_over')
+    rules = {8267: [over]}
+
+    set_today(day, hour, minute)
+    indicator.judge({8267: Decimal(1000)}, rules)
+
+    set_today(18)
+    assert indicator.judge({8267: Decimal(2000)}, rules) == {}
+    # 翌日も、前日(18日)の大引け後の価格がなければ不明のまま
+    set_today(19)
+    assert indicator.judge({8267: Decimal(3000)}, rules) == {}
+
+
+def test_close_by_judge_after_close(state_file, set_today):
+    """
+    大引け後に判定した価格も、翌日の前日終値となること
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'change_over')
+    rules = {8267: [over]}
+
+    set_today(17, 15, 5)
+    indicator.judge({8267: Decimal(1000)}, rules)
+
+    set_today(18)
+    assert StreamingIndicator(state_file).judge(
+        {8267: Decimal(1030)},
+        rules
+    ) == {8267: [over]}
+
+
+def test_sma_cross(state_file):
+    """
+    価格が単純移動平均を上抜け・下抜けた場合、条件を満たすこと
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'sma_over')
+    assert judge_prices(
+        indicator, 8267, over, [100, 100, 100, 90, 110, 120, 80]
+    ) == [False, False, False, False, True, False, False]
+
+    indicator = StreamingIndicator(state_file)
+    under = Rule(1333, Decimal(3), 'sma_under')
+    assert judge_prices(
+        indicator, 1333, under, [100, 100, 100, 110, 90, 80, 120]
+    ) == [False, False, False, False, True, False, False]
+
+
+def test_ema_cross(state_file):
+    """
+    価格が指数移動平均を上抜けた場合、条件を満たすこと
+    (期間分の価格を取得するまでは満たさない)
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'ema_over')
+    assert judge_prices(
+        indicator, 8267, over, [90, 110, 100, 95, 110, 120]
+    ) == [False, False, False, False, True, False]
+
+
+def test_bollinger(state_file):
+    """
+    価格が直近の価格によるボリンジャーバンドの外に出た場合、条件を満たすこと
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(5), 'bollinger_over')
+    under = Rule(8267, Decimal(5), 'bollinger_under')
+    rules = {8267: [over, under]}
+    for price in (100, 101, 99, 100, 100):
+        assert indicator.judge({8267: Decimal(price)}, rules) == {}
+    # 平均100、標準偏差約0.63
+    assert indicator.judge({8267: Decimal(101)}, rules) == {}
+    assert indicator.judge({8267: Decimal(103)}, rules) == {8267: [over]}
+    for price in (100, 101, 99, 100, 100):
+        indicator.judge({8267: Decimal(price)}, rules)
+    assert indicator.judge({8267: Decimal(98)}, rules) == {8267: [under]}
+
+
+def test_state_is_persistent(state_file):
+    """
+    指標の状態がファイルに保持され、次回の起動で続きから更新されること
+
+    """
+    over = Rule(8267, Decimal(3), 'sma_over')
+    for price in (100, 100, 100):
+        StreamingIndicator(state_file).judge(
+            {8267: Decimal(price)},
+            {8267: [over]}
+        )
+    assert StreamingIndicator(state_file).judge(
+        {8267: Decimal(110)},
+        {8267: [over]}
+    ) == {8267: [over]}
+
+
+def test_judge_without_price_or_rules(state_file):
+    """
+    価格を取得できなかった銘柄・指標によるルールのない銘柄は、
+    判定されないこと
+
+    """
+    indicator = StreamingIndicator(state_file)
+    over = Rule(8267, Decimal(3), 'sma_over')
+    assert indicator.judge({1333: Decimal(100)}, {8267: [over]}) == {}
+    assert indicator.judge({8267: Decimal(100)}, {}) == {}
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+
+from market import IMarketCalendar
+from market import TseCalendar
+
+
+def jst(month: int, day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2026, month, day, hour, minute, tzinfo=TseCalendar.jst)
+
+
+@pytest.fixture
+def holiday_file(tmp_path) -> str:
+    file = tmp_path / 'holidays.csv'
+    file.write_text(
+        '# テスト用の休業日\n'
+        'date,close,name\n'
+        '2026-09-21,,敬老の日\n'
+        '2026-09-22,,国民の休日\n'
+        '2026-09-23,,秋分の日\n'
+        '2026-12-30,11:30,半日立会\n',
+        encoding='utf-8'
+    )
+    return str(file)
+
+
+@pytest.mark.parametrize('now, expected', [
+    (jst(10, 16, 8, 59), False),
+    (jst(10, 16, 9), True),
+    (jst(10, 16, 11, 29), True),
+    (jst(10, 16, 11, 30), False),
+    (jst(10, 16, 12, 30), True),
+    (jst(10, 16, 15, 29), True),
+    (jst(10, 16, 15, 30), False),
+    # 土曜日・休業日・半日立会
+    (jst(10, 17, 10), False),
+    (jst(9, 22, 10), False),
+    (jst(12, 30, 10), True),
+    (jst(12, 30, 13), False),
+])
+def test_is_open(holiday_file, now, expected):
+    """
+    取引時間中かどうかが判定されること
+
+    """
+    assert TseCalendar(holiday_file).is_open(now) is expected
+
+
+def test_close_time_before_extension():
+    """
+    大引けの時刻が延長される前は、15:00を大引けとすること
+
+    """
+    calendar = TseCalendar()
+    assert calendar.is_open(
+        datetime(2024, 11, 1, 15, 10, tzinfo=TseCalendar.jst)
+    ) is False
+    assert calendar.is_open(
+        datetime(2024, 11, 5, 15, 10, tzinfo=TseCalendar.jst)
+    ) is True
+
+
+@pytest.mark.parametrize('now, expected', [
+    (jst(10, 16, 8), jst(10, 16, 9)),
+    (jst(10, 16, 10), jst(10, 16, 10)),
+    (jst(10, 16, 12), jst(10, 16, 12, 30)),
+    (jst(10, 16, 16), jst(10, 19, 9)),
+    # 連休・半日立会の後場
+    (jst(9, 18, 16), jst(9, 24, 9)),
+    (jst(12, 30, 12), jst(12, 31, 9)),
+])
+def test_get_next_open(holiday_file, now, expected):
+    """
+    次に取引が始まる日時が取得されること
+
+    """
+    assert TseCalendar(holiday_file).get_next_open(now) == expected
+
+
+@pytest.mark.parametrize('now, expected', [
+    (jst(10, 16, 10), IMarketCalendar.fetch),
+    (jst(10, 16, 12), IMarketCalendar.reuse),
+    (jst(10, 16, 16), IMarketCalendar.reuse),
+    (jst(10, 16, 8), IMarketCalendar.skip),
+    (jst(10, 17, 10), IMarketCalendar.skip),
+    (jst(9, 22, 10), IMarketCalendar.skip),
+])
+def test_get_action(holiday_file, now, expected):
+    """
+    取引時間中は取得、昼休み・大引け後は取得済みの価格を使い、
+    休場日・取引開始前は株価チェックを行わないこと
+
+    """
+    assert TseCalendar(holiday_file).get_action(now) == expected
+
+
+def test_bundled_holidays():
+    """
+    同梱の休業日の一覧が読み込まれること
+
+    """
+    calendar = TseCalendar()
+    assert calendar.is_trading_day(jst(1, 2, 0).date()) is False
+    assert calendar.is_trading_day(jst(9, 22, 0).date()) is False
+    assert calendar.is_trading_day(jst(10, 16, 0).date()) is True
@@ -0,0 +1,176 @@
+import time
+from decimal import Decimal
+
+import pytest
+import requests
+
+from breaker import CircuitBreaker
+from price import BreakerPrice
+from price import IPrice
+from exceptions import CircuitOpenException
+from exceptions import PriceException
+
+
+def connection_error() -> PriceException:
+    return PriceException(requests.exceptions.ConnectionError('error'))
+
+
+def http_error(status_code: int) -> PriceException:
+    response = requests.Response()
+    response.status_code = status_code
+    return PriceException(requests.exceptions.HTTPError(
+        f'{status_code} error',
+        response=response
+    ))
+
+
+@pytest.fixture
+def price_mock(mocker):
+    # iter_dataは、既定の実装のとおりget_dataで1銘柄ずつ取得する
+    price_mock = mocker.Mock(spec=IPrice)
+    price_mock.iter_data.side_effect = \
+        lambda descriptions: IPrice.iter_data(price_mock, descriptions)
+    price_mock.get_many.return_value = {8267: Decimal(100)}
+    price_mock.get_stats.return_value = {'pages': 1}
+    return price_mock
+
+
+def test_fail_fast_when_open(mocker, price_mock):
+    """
+    連続して取得に失敗した場合、取得元に要求せずにすぐ失敗とすること
+
+    """
+    mocker.patch.object(BreakerPrice, 'batch_factor', 1)
+    price_mock.get_data.side_effect = connection_error()
+    price = BreakerPrice(price_mock, failure_threshold=2, recovery_timeout=60)
+    try:
+        futures = list(price.iter_data([1, 2, 3, 4]))
+        assert price_mock.get_data.call_count == 2
+        assert not isinstance(futures[0].exception(), CircuitOpenException)
+        assert isinstance(futures[2].exception(), CircuitOpenException)
+        assert isinstance(futures[3].exception(), PriceException)
+        # 遮断中は、まとめて取得しない
+        assert price.get_many([8267]) == {}
+        assert price.get_stats() == {
+            'pages': 1,
+            'breaker_opened': 1,
+            'breaker_rejected': 2,
+        }
+    finally:
+        price.breaker.close()
+
+
+def test_probe_by_last_failed(mocker, price_mock):
+    """
+    取得できた銘柄がない場合、最後に失敗した銘柄で回復を確認し、
+    回復後は取得できること
+
+    """
+    price_mock.get_data.side_effect = connection_error()
+    price = BreakerPrice(price_mock, failure_threshold=1, recovery_timeout=0.01)
+    try:
+        with pytest.raises(PriceException):
+            price.get_data(8267)
+        price_mock.get_data.side_effect = None
+        price_mock.get_data.return_value = Decimal(100)
+        for _ in range(500):
+            if price.breaker.state == CircuitBreaker.closed:
+                break
+            time.sleep(0.01)
+        assert price_mock.get_data.call_args_list[1] == mocker.call(8267)
+        assert price.get_data(1333) == Decimal(100)
+        assert price.get_many([8267]) == {8267: Decimal(100)}
+    finally:
+        price.breaker.close()
+
+
+def test_iter_data_by_price(mocker, price_mock):
+    """
+    取得元のiter_dataで、一定の銘柄数ずつまとめて取得し、
+    銘柄コードの順に結果が返ること
+
+    """
+    mocker.patch.object(BreakerPrice, 'batch_factor', 2)
+    price_mock.get_data.side_effect = \
+        lambda description: Decimal(description * 100)
+    price = BreakerPrice(price_mock, concurrency=2)
+    futures = list(price.iter_data([1, 2, 3, 4, 5, 6]))
+    assert [future.result() for future in futures] == \
+        [Decimal(description * 100) for description in range(1, 7)]
+    assert price_mock.iter_data.call_args_list == [
+        mocker.call([1, 2, 3, 4]),
+        mocker.call([5, 6]),
+    ]
+
+
+@pytest.mark.parametrize('ex, expected', [
+    (connection_error(), True),
+    (PriceException(requests.exceptions.ReadTimeout('timeout')), True),
+    (http_error(503), True),
+    (http_error(429), True),
+    (http_error(404), False),
+    (PriceException(IndexError('list index out of range')), False),
+    (PriceException('error'), False),
+])
+def test_is_provider_failure(ex, expected):
+    """
+    接続できない・タイムアウト・5xx・429の場合のみ、取得元の障害とすること
+
+    """
+    assert BreakerPrice.is_provider_failure(ex) is expected
+
+
+def test_item_errors_do_not_open(mocker, price_mock):
+    """
+    上場廃止の銘柄の404・解析の失敗が続いても、遮断しないこと
+
+    """
+    mocker.patch.object(BreakerPrice, 'batch_factor', 1)
+    errors = {
+        1: http_error(404),
+        2: PriceException(IndexError('list index out of range')),
+        3: http_error(404),
+    }
+
+    def get_data(description):
+        if description in errors:
+            raise errors[description]
+        return Decimal(100)
+
+    price_mock.get_data.side_effect = get_data
+    price = BreakerPrice(price_mock, failure_threshold=2, recovery_timeout=60)
+    try:
+        futures = list(price.iter_data([1, 2, 3, 4]))
+        assert price.breaker.state == CircuitBreaker.closed
+        assert not any(
+            isinstance(future.exception(), CircuitOpenException)
+            for future in futures
+        )
+        assert futures[3].result() == Decimal(100)
+    finally:
+        price.breaker.close()
+
+
+def test_probe_by_last_succeeded(mocker, price_mock):
+    """
+    取得できた銘柄がある場合、最後に取得できた銘柄で回復を確認すること
+    (最後に失敗した銘柄では確認しないこと)
+
+    """
+    price = BreakerPrice(price_mock, failure_threshold=1, recovery_timeout=0.01)
+    try:
+        price_mock.get_data.return_value = Decimal(100)
+        assert price.get_data(1333) == Decimal(100)
+
+        price_mock.get_data.side_effect = connection_error()
+        with pytest.raises(PriceException):
+            price.get_data(8267)
+        price_mock.get_data.side_effect = None
+        for _ in range(500):
+            if price.breaker.state == CircuitBreaker.closed:
+                break
+            time.sleep(0.01)
+        assert price.breaker.state == CircuitBreaker.closed
+        assert price_mock.get_data.call_args_list[2] == mocker.call(1333)
+    finally:
+        price.breaker.close()
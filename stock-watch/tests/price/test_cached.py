@@ -0,0 +1,204 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from price import CachedPrice
+from price import IPrice
+from exceptions import PriceException
+
+
+@pytest.fixture
+def cache_file(tmp_path) -> str:
+    return str(tmp_path / 'price_cache.db')
+
+
+@pytest.fixture
+def set_now(mocker):
+    """
+    現在日時を設定する (日本時間)
+    """
+    def set_now(day: int, hour: int, minute: int = 0):
+        now = datetime(2022, 10, day, hour, minute, tzinfo=CachedPrice.jst)
+        datetime_mock = mocker.patch('price.cached.datetime', wraps=datetime)
+        datetime_mock.now.return_value = now
+    return set_now
+
+
+@pytest.fixture
+def price_mock(mocker):
+    price_mock = mocker.Mock(spec=IPrice)
+    mocker.patch.object(price_mock, 'get_data').side_effect = \
+        lambda description: Decimal(description)
+    price_mock.iter_data.side_effect = \
+        lambda descriptions: IPrice.iter_data(price_mock, descriptions)
+    price_mock.get_many.return_value = {}
+    price_mock.get_stats.return_value = {}
+    return price_mock
+
+
+def test_cache_in_trading_time(price_mock, cache_file, set_now):
+    """
+    取引時間中に取得した価格は、有効期間の間キャッシュされること
+
+    """
+    cached = CachedPrice(price_mock, ttl=60, cache_file=cache_file)
+
+    set_now(18, 10, 0)
+    assert cached.get_data(8267) == Decimal(8267)
+    set_now(18, 10, 0)
+    assert cached.get_data(8267) == Decimal(8267)
+    assert price_mock.get_data.call_count == 1
+
+    set_now(18, 10, 1)
+    cached.get_data(8267)
+    assert price_mock.get_data.call_count == 2
+
+
+@pytest.mark.parametrize('fetched, expires', [
+    ((18, 10), datetime(2022, 10, 18, 10, 1)),
+    ((18, 15), datetime(2022, 10, 19, 9)),
+    ((18, 8), datetime(2022, 10, 18, 9)),
+    # 金曜日の大引け後・土曜日
+    ((21, 16), datetime(2022, 10, 24, 9)),
+    ((22, 10), datetime(2022, 10, 24, 9)),
+    # 昼休み・休場日の前日の大引け後
+    ((18, 12), datetime(2022, 10, 18, 12, 30)),
+    ((7, 16), datetime(2022, 10, 11, 9)),
+])
+def test_get_expires(price_mock, cache_file, fetched, expires):
+    """
+    取引時間外に取得した価格は、次の取引開始まで有効となること
+
+    """
+    cached = CachedPrice(price_mock, ttl=60, cache_file=cache_file)
+    day, hour = fetched
+    assert cached.get_expires(
+        datetime(2022, 10, day, hour, tzinfo=CachedPrice.jst)
+    ) == expires.replace(tzinfo=CachedPrice.jst)
+
+
+def test_close_price_is_cached_until_open(price_mock, cache_file, set_now):
+    """
+    大引け後に取得した価格は、次回の起動でも取引開始まで使われること
+
+    """
+    set_now(18, 15, 30)
+    CachedPrice(price_mock, cache_file=cache_file).get_data(8267)
+
+    set_now(19, 8, 59)
+    cached = CachedPrice(price_mock, cache_file=cache_file)
+    assert cached.get_data(8267) == Decimal(8267)
+    assert price_mock.get_data.call_count == 1
+
+    set_now(19, 9, 0)
+    cached = CachedPrice(price_mock, cache_file=cache_file)
+    cached.get_data(8267)
+    assert price_mock.get_data.call_count == 2
+
+
+def test_iter_data(price_mock, cache_file, set_now):
+    """
+    キャッシュした価格と取得した価格が、銘柄コードの順に返され、
+    取得できなかった価格はキャッシュされないこと
+
+    """
+    def get_data(description: int) -> Decimal:
+        if description == 1333:
+            raise PriceException()
+        return Decimal(description)
+    price_mock.get_data.side_effect = get_data
+
+    set_now(18, 16)
+    cached = CachedPrice(price_mock, cache_file=cache_file)
+    cached.get_data(7203)
+
+    futures = list(cached.iter_data([8267, 7203, 1333]))
+    assert futures[0].result() == Decimal(8267)
+    assert futures[1].result() == Decimal(7203)
+    with pytest.raises(PriceException):
+        futures[2].result()
+    price_mock.iter_data.assert_called_once_with([8267, 1333])
+
+    assert [future.result() for future in cached.iter_data([8267, 7203])] \
+        == [Decimal(8267), Decimal(7203)]
+    assert cached.get_stats() == {
+        'cache_hits': 3,
+        'cache_misses': 3,
+        'cache_evictions': 0,
+        'cache_entries': 2,
+        'cache_bytes': cached.get_stats()['cache_bytes'],
+    }
+
+
+def test_evict_least_recently_used(price_mock, cache_file, set_now):
+    """
+    件数の上限を超えた場合、最も長く使われていない価格から削除されること
+
+    """
+    set_now(18, 16)
+    cached = CachedPrice(price_mock, max_entries=2, cache_file=cache_file)
+    cached.get_data(1)
+    cached.get_data(2)
+    cached.get_data(1)
+    cached.get_data(3)
+    assert cached.get_stats()['cache_evictions'] == 1
+
+    price_mock.get_data.reset_mock()
+    cached.get_data(1)
+    cached.get_data(3)
+    assert price_mock.get_data.call_count == 0
+    cached.get_data(2)
+    assert price_mock.get_data.call_count == 1
+
+    # ファイルからも削除される
+    cached = CachedPrice(price_mock, max_entries=10, cache_file=cache_file)
+    assert cached.get_stats()['cache_entries'] == 2
+
+
+def test_evict_by_memory(price_mock, cache_file, set_now):
+    """
+    メモリ使用量の上限を超えた場合、上限以下になるまで削除されること
+
+    """
+    set_now(18, 16)
+    cached = CachedPrice(price_mock, max_bytes=1000, cache_file=cache_file)
+    for description in range(100):
+        cached.get_data(description)
+
+    stats = cached.get_stats()
+    assert 0 < stats['cache_bytes'] <= 1000
+    assert stats['cache_entries'] + stats['cache_evictions'] == 100
+
+
+def test_memory_cache(price_mock, set_now):
+    """
+    ファイルに保持しない場合、次回の起動では使われないこと
+
+    """
+    set_now(18, 16)
+    CachedPrice(price_mock, cache_file=':memory:').get_data(8267)
+    CachedPrice(price_mock, cache_file=':memory:').get_data(8267)
+    assert price_mock.get_data.call_count == 2
+
+
+def test_get_many(price_mock, cache_file, set_now):
+    """
+    キャッシュした価格と、まとめて取得した価格が返され、
+    まとめて取得した価格がキャッシュされること
+
+    """
+    set_now(18, 16)
+    cached = CachedPrice(price_mock, cache_file=cache_file)
+    cached.get_data(7203)
+    price_mock.get_many.return_value = {8267: Decimal(2700)}
+
+    assert cached.get_many([7203, 8267, 1333]) == {
+        7203: Decimal(7203),
+        8267: Decimal(2700),
+    }
+    price_mock.get_many.assert_called_once_with([8267, 1333])
+    assert cached.get_data(8267) == Decimal(2700)
+    stats = cached.get_stats()
+    assert stats['cache_hits'] == 2
+    assert stats['cache_misses'] == 2
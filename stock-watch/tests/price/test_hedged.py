@@ -0,0 +1,287 @@
+import io
+import time
+from concurrent.futures import Future
+from decimal import Decimal
+from threading import Event
+
+import pytest
+import requests
+
+from price import HedgedPrice
+from price import IPrice
+from price import PriceByKabutan
+from price.hedged import LatencyHistogram
+from exceptions import PriceException
+from session import PooledSession
+
+
+class SlowPrice(IPrice):
+    """
+    テスト用の取得元
+    呼び出しごとに、指定された時間待ってから結果を返す
+    """
+
+    def __init__(self, *results):
+        # (待ち時間, 価格または例外) を呼び出し順に指定する
+        self.results = list(results)
+        self.calls = 0
+        self.released = Event()
+
+    def get_data(self, description: int) -> Decimal:
+        delay, result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        # 待っている要求は、テストの終了時に解放する
+        self.released.wait(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_response(body: bytes) -> requests.Response:
+    """
+    テスト用関数
+    レスポンスを作成する
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+@pytest.fixture
+def set_default_delay(mocker):
+    """
+    ヘッジするまでの既定の時間を設定する
+    """
+    def set_default_delay(delay: float):
+        mocker.patch.object(HedgedPrice, 'default_delay', delay)
+    return set_default_delay
+
+
+def test_hedge_to_next_provider(set_default_delay):
+    """
+    最初の取得元が応答しない場合、次の取得元の価格を返すこと
+
+    """
+    set_default_delay(0.05)
+    slow = SlowPrice((10, Decimal(100)))
+    fast = SlowPrice((0, Decimal(200)))
+    price = HedgedPrice([slow, fast])
+    try:
+        assert price.get_data(8267) == Decimal(200)
+        stats = price.get_stats()
+        assert stats['hedged'] == 1
+        assert stats['hedge_wins'] == 1
+        assert stats['fallbacks'] == 0
+    finally:
+        slow.released.set()
+
+
+def test_not_hedge_fast_response(set_default_delay):
+    """
+    最初の取得元が時間内に応答した場合、次の取得元に要求しないこと
+
+    """
+    set_default_delay(1.0)
+    first = SlowPrice((0, Decimal(100)))
+    second = SlowPrice((0, Decimal(200)))
+    price = HedgedPrice([first, second])
+    assert price.get_data(8267) == Decimal(100)
+    assert second.calls == 0
+    assert price.get_stats()['hedged'] == 0
+
+
+def test_retry_single_provider(set_default_delay):
+    """
+    取得元が1つの場合、同じ取得元にもう一度要求すること
+
+    """
+    set_default_delay(0.05)
+    provider = SlowPrice((10, Decimal(100)), (0, Decimal(101)))
+    price = HedgedPrice([provider])
+    try:
+        assert price.get_data(8267) == Decimal(101)
+        assert provider.calls == 2
+    finally:
+        provider.released.set()
+
+
+@pytest.mark.parametrize('result', [PriceException('error'), Decimal(0)])
+def test_fallback_without_waiting(set_default_delay, result):
+    """
+    最初の取得元で取得できなかった・価格が不正な場合、
+    待たずに次の取得元の価格を返すこと
+
+    """
+    set_default_delay(10)
+    price = HedgedPrice([
+        SlowPrice((0, result)),
+        SlowPrice((0, Decimal(200))),
+    ])
+    started = time.monotonic()
+    assert price.get_data(8267) == Decimal(200)
+    assert time.monotonic() - started < 5
+    assert price.get_stats()['fallbacks'] == 1
+
+
+def test_all_providers_failed():
+    """
+    すべての取得元で取得できなかった場合、例外が発生すること
+
+    """
+    price = HedgedPrice([
+        SlowPrice((0, PriceException('error'))),
+        SlowPrice((0, PriceException('error'))),
+    ])
+    with pytest.raises(PriceException):
+        price.get_data(8267)
+
+
+def test_iter_data(set_default_delay):
+    """
+    銘柄コードの順に結果が返ること
+
+    """
+    set_default_delay(10)
+    price = HedgedPrice(
+        [SlowPrice((0, Decimal(100)), (0, PriceException('error')))],
+        concurrency=1
+    )
+    futures = list(price.iter_data([8267, 1333]))
+    assert futures[0].result() == Decimal(100)
+    assert futures[1].exception() is not None
+
+
+def test_get_many(mocker):
+    """
+    まとめて取得できなかった銘柄を、次の取得元から取得すること
+
+    """
+    first = mocker.Mock(spec=IPrice)
+    first.get_many.return_value = {8267: Decimal(100)}
+    second = mocker.Mock(spec=IPrice)
+    second.get_many.return_value = {1333: Decimal(200)}
+    price = HedgedPrice([first, second])
+    assert price.get_many([8267, 1333]) == \
+        {8267: Decimal(100), 1333: Decimal(200)}
+    second.get_many.assert_called_once_with([1333])
+
+
+def test_delay_by_histogram():
+    """
+    ヘッジするまでの時間が、かかった時間の分布の分位点となること
+    (件数が少ない間は既定の時間、下限・上限を超えない)
+
+    """
+    provider = SlowPrice((0, Decimal(100)))
+    price = HedgedPrice([provider])
+    for _ in range(HedgedPrice.min_samples - 1):
+        price.get_data(8267)
+    assert price.get_delay(0) == HedgedPrice.default_delay
+    price.get_data(8267)
+    # 完了時のコールバックで数えるため、少し待つ
+    time.sleep(0.1)
+    assert price.get_delay(0) == HedgedPrice.min_delay
+
+
+def test_latency_histogram():
+    """
+    分位点が、その分位の件数を含む区間の上限となること
+
+    """
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.95) is None
+    for _ in range(90):
+        histogram.add(0.01)
+    for _ in range(9):
+        histogram.add(0.3)
+    histogram.add(100)
+    assert histogram.quantile(0.5) == 0.025
+    assert histogram.quantile(0.95) == 0.4
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_hedge_without_waiting_host_slot(mocker, set_default_delay):
+    """
+    同時接続数が1の取得元でも、応答の遅い要求の完了を待たずに取得し直すこと
+
+    """
+    set_default_delay(0.1)
+    released = Event()
+    started = []
+
+    def get(url, **kwargs):
+        started.append(time.monotonic())
+        if len(started) == 1:
+            # 最初の要求は、テストの終了時まで応答しない
+            released.wait(5)
+        return make_response(b'100')
+
+    mocker.patch.object(PooledSession, 'get').side_effect = get
+    mocker.patch.object(PriceByKabutan, 'extract_price').side_effect = \
+        lambda html: Decimal(html)
+    price = HedgedPrice([PriceByKabutan(concurrency=1)])
+    try:
+        begin = time.monotonic()
+        assert price.get_data(8267) == Decimal(100)
+        assert len(started) == 2
+        assert started[1] - begin < 1
+        assert not released.is_set()
+        assert price.get_stats()['hedge_wins'] == 1
+    finally:
+        released.set()
+
+
+def test_iter_data_by_provider(mocker, set_default_delay):
+    """
+    最初の取得元のiter_dataで取得し、完了しない銘柄は取得し直すこと
+
+    """
+    set_default_delay(0.05)
+    stalled = Future()
+    done = Future()
+    done.set_result(Decimal(100))
+    provider = mocker.Mock(spec=IPrice)
+    provider.iter_data.return_value = iter([done, stalled])
+    provider.get_hedge_data.return_value = Decimal(200)
+    price = HedgedPrice([provider], concurrency=2)
+
+    futures = list(price.iter_data([8267, 1333]))
+    assert [future.result() for future in futures] == \
+        [Decimal(100), Decimal(200)]
+    provider.iter_data.assert_called_once_with([8267, 1333])
+    provider.get_hedge_data.assert_called_once_with(1333)
+    provider.get_data.assert_not_called()
+    # 最初の取得元の結果は、取り消さない
+    assert not stalled.cancelled()
+
+
+def test_iter_data_hedges_from_request(mocker, set_default_delay):
+    """
+    iter_dataでは、結果を読む順を待たずに、要求した時点からの時間でヘッジし、
+    並行して取得する銘柄数ずつ取得元に要求すること
+
+    """
+    set_default_delay(0.2)
+    stalled = [Future(), Future()]
+    provider = mocker.Mock(spec=IPrice)
+    provider.iter_data.side_effect = [iter(stalled), iter([Future()])]
+    provider.get_hedge_data.return_value = Decimal(200)
+    price = HedgedPrice([provider], concurrency=2)
+
+    futures = price.iter_data([8267, 1333, 7203])
+    begin = time.monotonic()
+    first = next(futures)
+    second = next(futures)
+    assert first.result() == Decimal(200)
+    assert second.result() == Decimal(200)
+    # 2銘柄目も1銘柄目と同時に、要求した時点からヘッジされる
+    # (結果を読み始めてから数える場合は、2銘柄目のヘッジまで0.4秒かかる)
+    assert time.monotonic() - begin < 0.35
+    assert provider.iter_data.call_args_list == [mocker.call([8267, 1333])]
+
+    assert next(futures).result() == Decimal(200)
+    assert provider.iter_data.call_args_list == [
+        mocker.call([8267, 1333]),
+        mocker.call([7203]),
+    ]
@@ -1,9 +1,32 @@
+import io
+import sqlite3
+import time
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from os import path
+from threading import Lock
+from threading import Thread
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
 
 import pytest
+import requests
 
 from price import PriceByKabutan
 from exceptions import PriceException
+from session import PooledSession
+
+
+def make_response(body: bytes, status_code: int = 200) -> requests.Response:
+    """
+    テスト用関数
+    レスポンスを作成する
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(body)
+    return response
 
 
 def test_occur_exception(mocker):
@@ -14,8 +37,8 @@ def test_occur_exception(mocker):
     """
     message = 'test exception'
     mocker.patch.object(
-        price_by_kabutan,
-        'get_html'
+        PooledSession,
+        'get'
     ).side_effect = Exception(message)
 
     """
@@ -28,6 +51,377 @@ def test_occur_exception(mocker):
     assert str(ex.value) == message
 
 
+def test_iter_data_in_order(mocker):
+    """
+    並行して取得した価格が、銘柄コードの順に返され、
+    取得できなかった銘柄はPriceExceptionとなること
+
+    """
+    price_by_kabutan = PriceByKabutan(concurrency=4)
+
+    def get(url: str, **kwargs) -> requests.Response:
+        description = int(parse_qs(urlsplit(url).query)['code'][0])
+        # 後の銘柄ほど早く取得が完了する
+        time.sleep((10 - description) * 0.01)
+        if description == 3:
+            raise Exception('test exception')
+        return make_response(str(description * 100).encode())
+
+    mocker.patch.object(PooledSession, 'get').side_effect = get
+    mocker.patch.object(price_by_kabutan, 'extract_price').side_effect = \
+        lambda html: Decimal(html)
+
+    futures = list(price_by_kabutan.iter_data([1, 2, 3, 4, 5]))
+    assert [
+        future.result() for future in futures if future.exception() is None
+    ] == [Decimal(100), Decimal(200), Decimal(400), Decimal(500)]
+    with pytest.raises(PriceException):
+        futures[2].result()
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_iter_data_concurrency(mocker, concurrency):
+    """
+    同じホストへの同時接続数が、上限を超えないこと
+
+    """
+    price_by_kabutan = PriceByKabutan(concurrency=concurrency)
+    lock = Lock()
+    active = []
+    peak = []
+
+    def get(url, **kwargs):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(url)
+        return make_response(b'100')
+
+    mocker.patch.object(PooledSession, 'get').side_effect = get
+    mocker.patch.object(price_by_kabutan, 'extract_price').side_effect = \
+        lambda html: Decimal(html)
+
+    futures = list(price_by_kabutan.iter_data(list(range(9))))
+    assert [future.result() for future in futures] == [Decimal(100)] * 9
+    assert max(peak) == concurrency
+
+
+@pytest.fixture
+def sample_html() -> str:
+    file = path.join(path.dirname(__file__), 'kabutan_9024.html')
+    with open(file, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_extract_price_from_sample(mocker, sample_html):
+    """
+    価格の要素の周辺だけを解析して、ページ全体の解析と同じ価格が抽出されること
+
+    """
+    price_by_kabutan = PriceByKabutan()
+    by_soup = mocker.spy(PriceByKabutan, 'extract_price_text_by_soup')
+
+    assert price_by_kabutan.extract_price(sample_html) == Decimal(1585)
+    assert by_soup.call_count == 0
+    assert price_by_kabutan.extract_price_text_by_soup(sample_html) == \
+        '1,585円'
+
+
+@pytest.mark.parametrize('scan_size', [200, 310])
+def test_extract_price_fallback(mocker, sample_html, scan_size):
+    """
+    価格の要素が解析する範囲に収まらない場合、
+    ページ全体を解析して価格が抽出されること
+
+    """
+    mocker.patch.object(PriceByKabutan, 'scan_size', scan_size)
+    price_by_kabutan = PriceByKabutan()
+    by_soup = mocker.spy(PriceByKabutan, 'extract_price_text_by_soup')
+
+    assert price_by_kabutan.extract_price(sample_html) == Decimal(1585)
+    assert by_soup.call_count == 1
+
+
+@pytest.mark.parametrize('html', [
+    '<div id="stockinfo_i1"><div></div><div><span></span>'
+    '<span>-</span></div></div>',
+    '<style>#stockinfo_i1 { color: red; }</style>',
+    '<html></html>',
+])
+def test_extract_price_not_found(html):
+    """
+    価格の要素がない、または価格でない場合、例外が発生すること
+
+    """
+    with pytest.raises(Exception):
+        PriceByKabutan().extract_price(html)
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    # keep-aliveで接続を維持する
+    protocol_version = 'HTTP/1.1'
+    # 銘柄コードをキーとしたページ・ETag
+    pages = {}
+    etags = {}
+    # Content-Lengthを付けず、チャンク形式で送るか
+    chunked = False
+
+    def do_GET(self):
+        code = parse_qs(urlsplit(self.path).query)['code'][0]
+        etag = self.etags.get(code)
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = self.pages[code].encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if self.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        try:
+            if self.chunked:
+                for i in range(0, len(body), 4096):
+                    chunk = body[i:i + 4096]
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.write(b'0\r\n\r\n')
+            else:
+                self.wfile.write(body)
+        except OSError:
+            # 受信を途中でやめられた場合
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def page_server(mocker, sample_html):
+    small_html = sample_html[:sample_html.find('<div id="kobetsu_left">')]
+    mocker.patch.dict(PageHandler.pages, {
+        '9024': sample_html,
+        '1111': small_html,
+        '2222': sample_html,
+    })
+    mocker.patch.dict(PageHandler.etags, {'2222': '"v1"'})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mocker.patch.object(
+        PriceByKabutan,
+        'url',
+        f'http://127.0.0.1:{server.server_port}/stock/?code={{}}'
+    )
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_data_stops_after_price(page_server, sample_html):
+    """
+    価格の要素を受信した時点で受信をやめ、受信しなかったバイト数が記録されること
+
+    """
+    price_by_kabutan = PriceByKabutan()
+    assert price_by_kabutan.get_data(9024) == Decimal(1585)
+
+    stats = price_by_kabutan.get_stats()
+    size = len(sample_html.encode('utf-8'))
+    assert stats['pages'] == 1
+    assert stats['aborted'] == 1
+    assert stats['bytes_read'] < size
+    assert stats['bytes_read'] + stats['bytes_saved'] == size
+    assert stats['bytes_saved_unknown'] == 0
+
+
+def test_get_html_returns_whole_page(page_server, sample_html):
+    """
+    htmlの取得では、価格の要素で受信をやめず、ページの全体が返されること
+
+    """
+    price_by_kabutan = PriceByKabutan()
+    assert price_by_kabutan.get_html(9024) == sample_html
+
+
+def test_bytes_saved_unknown_without_length(page_server, mocker):
+    """
+    Content-Lengthのないページの受信をやめた場合、
+    受信せずに済んだバイト数は分からないものとして数えること
+
+    """
+    mocker.patch.object(PageHandler, 'chunked', True)
+    price_by_kabutan = PriceByKabutan()
+    assert price_by_kabutan.get_data(9024) == Decimal(1585)
+
+    stats = price_by_kabutan.get_stats()
+    assert stats['aborted'] == 1
+    assert stats['bytes_saved'] == 0
+    assert stats['bytes_saved_unknown'] == 1
+
+
+def test_get_html_drains_small_rest(page_server):
+    """
+    価格の要素より後の残りが小さい場合、読み切って接続を使い回すこと
+
+    """
+    price_by_kabutan = PriceByKabutan()
+    assert price_by_kabutan.get_data(1111) == Decimal(1585)
+    assert price_by_kabutan.get_data(1111) == Decimal(1585)
+
+    stats = price_by_kabutan.get_stats()
+    assert stats['aborted'] == 0
+    assert stats['bytes_saved'] == 0
+    assert stats['connections'] == 1
+    assert stats['reused'] == 1
+
+
+def test_not_modified(mocker, page_server, tmp_path):
+    """
+    ページが更新されていない場合、ページを受信せずに前回の価格が返され、
+    検証情報が次回の起動でも使われること
+
+    """
+    validator_file = str(tmp_path / 'price_validators.db')
+    price_by_kabutan = PriceByKabutan(validator_file=validator_file)
+    assert price_by_kabutan.get_data(2222) == Decimal(1585)
+    assert price_by_kabutan.get_data(2222) == Decimal(1585)
+    assert price_by_kabutan.get_stats()['not_modified'] == 1
+
+    price_by_kabutan = PriceByKabutan(validator_file=validator_file)
+    assert [
+        future.result() for future in price_by_kabutan.iter_data([2222])
+    ] == [Decimal(1585)]
+    stats = price_by_kabutan.get_stats()
+    assert stats['not_modified'] == 1
+    assert stats['pages'] == 0
+
+    # 更新された場合は、ページを受信して価格を抽出する
+    mocker.patch.dict(PageHandler.etags, {'2222': '"v2"'})
+    PageHandler.pages['2222'] = \
+        PageHandler.pages['2222'].replace('1,585円', '1,600円')
+    assert price_by_kabutan.get_data(2222) == Decimal(1600)
+
+
+@pytest.mark.parametrize('parse_mode', ['inline', 'thread'])
+def test_validators_saved_without_reading_to_end(
+    page_server,
+    tmp_path,
+    parse_mode
+):
+    """
+    呼び出し元がiter_dataを最後まで読まない場合も
+    (銘柄コードの数だけ受け取った場合)、検証情報が保存されること
+
+    """
+    validator_file = str(tmp_path / 'price_validators.db')
+    price_by_kabutan = PriceByKabutan(
+        validator_file=validator_file,
+        parse_mode=parse_mode,
+        parse_workers=1
+    )
+    try:
+        descriptions = [2222, 9024]
+        futures = price_by_kabutan.iter_data(descriptions)
+        for _, future in zip(descriptions, futures):
+            assert future.result() == Decimal(1585)
+
+        # 最後の銘柄の完了を待って保存されるため、保存まで少し待つ
+        deadline = time.monotonic() + 5
+        count = 0
+        while count < 2 and time.monotonic() < deadline:
+            with sqlite3.connect(validator_file) as connection:
+                count, = connection.execute(
+                    'SELECT COUNT(*) FROM validators'
+                ).fetchone()
+            time.sleep(0.01)
+        assert count == 2
+    finally:
+        price_by_kabutan.close()
+
+
+def test_unchanged_fragment(mocker, page_server):
+    """
+    価格の要素の周辺が変わっていない場合、解析せずに前回の価格が返されること
+
+    """
+    price_by_kabutan = PriceByKabutan()
+    xpath = mocker.patch.object(
+        PriceByKabutan,
+        'price_xpath',
+        wraps=PriceByKabutan.price_xpath
+    )
+    assert price_by_kabutan.get_data(9024) == Decimal(1585)
+    assert xpath.call_count == 1
+
+    assert price_by_kabutan.get_data(9024) == Decimal(1585)
+    assert xpath.call_count == 1
+    stats = price_by_kabutan.get_stats()
+    assert stats['unchanged'] == 1
+    assert stats['aborted'] == 2
+
+    PageHandler.pages['9024'] = \
+        PageHandler.pages['9024'].replace('1,585円', '1,600円')
+    assert price_by_kabutan.get_data(9024) == Decimal(1600)
+    assert xpath.call_count == 2
+
+
+@pytest.mark.parametrize('parse_mode', ['thread', 'process'])
+def test_iter_data_by_pipeline(page_server, parse_mode):
+    """
+    受信と解析を分けた場合も、銘柄コードの順に価格が返され、
+    価格の要素の周辺が変わっていない場合は解析しないこと
+
+    """
+    price_by_kabutan = PriceByKabutan(
+        concurrency=2,
+        session=PooledSession(retries=0),
+        parse_mode=parse_mode,
+        parse_workers=2
+    )
+    try:
+        descriptions = [9024, 1111, 2222, 3333]
+        futures = list(price_by_kabutan.iter_data(descriptions))
+        assert [future.result() for future in futures[:3]] == \
+            [Decimal(1585)] * 3
+        with pytest.raises(PriceException):
+            futures[3].result()
+        assert price_by_kabutan.get_stats()['aborted'] == 2
+
+        futures = list(price_by_kabutan.iter_data([9024]))
+        assert futures[0].result() == Decimal(1585)
+        assert price_by_kabutan.get_stats()['unchanged'] == 1
+    finally:
+        price_by_kabutan.close()
+
+
+def test_pipeline_parses_whole_page(mocker, page_server):
+    """
+    受信と解析を分けた場合、価格の要素の周辺に価格がなさそうなときは、
+    ページの全体を受信して解析すること
+
+    """
+    mocker.patch.object(PriceByKabutan, 'scan_size', 200)
+    price_by_kabutan = PriceByKabutan(parse_mode='thread')
+    try:
+        futures = list(price_by_kabutan.iter_data([9024]))
+        assert futures[0].result() == Decimal(1585)
+        assert price_by_kabutan.get_stats()['aborted'] == 0
+    finally:
+        price_by_kabutan.close()
+
+
+def test_invalid_parse_mode():
+    with pytest.raises(ValueError):
+        PriceByKabutan(parse_mode='gpu')
+
+
 def test_get_html():
     price_by_kabutan = PriceByKabutan()
 
@@ -0,0 +1,107 @@
+from decimal import Decimal
+from os import path
+
+import pytest
+import requests
+
+from price import IPrice
+from price import PriceByKabutanList
+from session import PooledSession
+
+
+@pytest.fixture
+def list_html() -> bytes:
+    file = path.join(path.dirname(__file__), 'kabutan_list.html')
+    with open(file, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def price_mock(mocker):
+    price_mock = mocker.Mock(spec=IPrice)
+    price_mock.get_stats.return_value = {}
+    return price_mock
+
+
+def make_response(content: bytes, status_code: int = 200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+def test_extract_prices(price_mock, list_html):
+    """
+    一覧ページの各行から、銘柄コードと株価の列の価格が抽出されること
+    (株価が数値でない行は、ほかの列(PERなど)が数値でも抽出されない)
+
+    """
+    list_price = PriceByKabutanList([], price_mock)
+    assert list_price.extract_prices(list_html) == {
+        7203: Decimal('2345.5'),
+        9024: Decimal(1585),
+    }
+
+
+def test_get_many(mocker, price_mock, list_html):
+    """
+    指定した銘柄のうち、一覧ページにある銘柄の価格だけが返され、
+    すべての銘柄の価格を取得できた時点で、残りのページは取得しないこと
+    (各ページは、1回だけ取得する)
+
+    """
+    get_mock = mocker.patch.object(PooledSession, 'get')
+    get_mock.side_effect = [
+        make_response(b'', 500),
+        make_response(list_html),
+        make_response(list_html),
+    ]
+    list_price = PriceByKabutanList(['error', 'page1', 'page2'], price_mock)
+
+    assert list_price.get_many([9024, 1333, 8267]) == {9024: Decimal(1585)}
+    assert get_mock.call_count == 3
+    # 別の銘柄グループでは、取得済みのページ(取得できなかったページも)を使う
+    assert list_price.get_many([7203, 1333]) == {7203: Decimal('2345.5')}
+    assert get_mock.call_count == 3
+    assert list_price.get_stats()['bulk_pages'] == 2
+
+    # 取得済みのページを破棄した場合は、取得し直す
+    get_mock.side_effect = [make_response(list_html)]
+    list_price.clear_pages()
+    assert list_price.get_many([7203]) == {7203: Decimal('2345.5')}
+    assert get_mock.call_count == 4
+
+    get_mock.reset_mock()
+    get_mock.side_effect = [make_response(list_html)]
+    list_price = PriceByKabutanList(['page1', 'page2'], price_mock)
+    assert list_price.get_many([9024]) == {9024: Decimal(1585)}
+    assert get_mock.call_count == 1
+    assert list_price.get_stats() == {'bulk_pages': 1, 'bulk_prices': 1}
+
+
+def test_get_data_by_price(mocker, price_mock):
+    """
+    1銘柄ずつの取得は、指定した取得元から取得すること
+
+    """
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(2700))
+    mocker.patch.object(price_mock, 'iter_data', return_value=iter([]))
+    list_price = PriceByKabutanList(['page1'], price_mock)
+
+    assert list_price.get_data(8267) == Decimal(2700)
+    list_price.iter_data([8267])
+    price_mock.iter_data.assert_called_once_with([8267])
+
+
+def test_extract_prices_without_price_column(price_mock):
+    """
+    株価の見出しがない表からは、価格が抽出されないこと
+
+    """
+    html = (
+        b'<table><tr><th>code</th><th>PER</th></tr>'
+        b'<tr><td><a href="/stock/?code=1333">1333</a></td>'
+        b'<td>12.3</td></tr></table>'
+    )
+    list_price = PriceByKabutanList([], price_mock)
+    assert list_price.extract_prices(html) == {}
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import pytest
+
+from history import IPriceHistory
+from price import IPrice
+from price import RecordedPrice
+from exceptions import PriceException
+
+
+def test_get_data(mocker):
+    """
+    取得した価格が返され、価格の履歴に追加されること
+
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(2700))
+    history_mock = mocker.Mock(spec=IPriceHistory)
+    history_append = mocker.patch.object(history_mock, 'append')
+
+    result = RecordedPrice(price_mock, history_mock).get_data(8267)
+
+    assert result == Decimal(2700)
+    history_append.assert_called_once_with(8267, Decimal(2700))
+
+
+def test_get_data_exception(mocker):
+    """
+    価格の取得に失敗した場合、例外が発生し、履歴に追加されないこと
+
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    mocker.patch.object(price_mock, 'get_data').side_effect = \
+        PriceException()
+    history_mock = mocker.Mock(spec=IPriceHistory)
+    history_append = mocker.patch.object(history_mock, 'append')
+
+    with pytest.raises(PriceException):
+        RecordedPrice(price_mock, history_mock).get_data(8267)
+    assert history_append.call_count == 0
+
+
+def test_get_data_fail_to_append(mocker):
+    """
+    履歴の追加に失敗した場合も、取得した価格が返されること
+
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(2700))
+    history_mock = mocker.Mock(spec=IPriceHistory)
+    mocker.patch.object(history_mock, 'append').side_effect = OSError()
+
+    assert RecordedPrice(price_mock, history_mock).get_data(8267) == \
+        Decimal(2700)
+
+
+def test_iter_data(mocker):
+    """
+    取得できた価格だけが、銘柄コードの順に価格の履歴に追加されること
+
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    prices = {8267: Decimal(2700), 7203: Decimal(3000)}
+
+    def get_data(description: int) -> Decimal:
+        if description not in prices:
+            raise PriceException()
+        return prices[description]
+
+    mocker.patch.object(price_mock, 'get_data').side_effect = get_data
+    mocker.patch.object(price_mock, 'iter_data').side_effect = \
+        lambda descriptions: IPrice.iter_data(price_mock, descriptions)
+    history_mock = mocker.Mock(spec=IPriceHistory)
+    history_append = mocker.patch.object(history_mock, 'append')
+
+    futures = list(
+        RecordedPrice(price_mock, history_mock).iter_data([8267, 1333, 7203])
+    )
+    assert futures[0].result() == Decimal(2700)
+    with pytest.raises(PriceException):
+        futures[1].result()
+    assert futures[2].result() == Decimal(3000)
+    assert history_append.call_args_list == [
+        mocker.call(8267, Decimal(2700)),
+        mocker.call(7203, Decimal(3000)),
+    ]
+
+
+def test_get_many(mocker):
+    """
+    まとめて取得した価格が、価格の履歴に追加されること
+
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    mocker.patch.object(
+        price_mock,
+        'get_many',
+        return_value={8267: Decimal(2700)}
+    )
+    history_mock = mocker.Mock(spec=IPriceHistory)
+    history_append = mocker.patch.object(history_mock, 'append')
+
+    result = RecordedPrice(price_mock, history_mock).get_many([8267, 1333])
+
+    assert result == {8267: Decimal(2700)}
+    history_append.assert_called_once_with(8267, Decimal(2700))
@@ -0,0 +1,136 @@
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from email.utils import format_datetime
+
+import pytest
+
+from session.limiter import AimdController
+from session.limiter import RateLimiter
+from session.limiter import TokenBucket
+from session.limiter import parse_retry_after
+
+
+@pytest.fixture
+def set_monotonic(mocker):
+    """
+    time.monotonicの返す時刻を設定する
+    """
+    monotonic_mock = mocker.patch('session.limiter.time.monotonic')
+
+    def set_monotonic(now: float):
+        monotonic_mock.return_value = now
+    set_monotonic(100.0)
+    return set_monotonic
+
+
+def test_token_bucket(mocker, set_monotonic):
+    """
+    トークンが足りない場合、貯まるまで待つこと
+
+    """
+    sleep_mock = mocker.patch('session.limiter.time.sleep')
+    bucket = TokenBucket(2.0)
+    bucket.acquire()
+    bucket.acquire()
+    assert sleep_mock.call_count == 0
+
+    bucket.acquire()
+    bucket.acquire()
+    assert sleep_mock.call_args_list == [mocker.call(0.5), mocker.call(1.0)]
+
+    # 時間が経てば、待たずに送信できる
+    sleep_mock.reset_mock()
+    set_monotonic(102.0)
+    bucket.acquire()
+    assert sleep_mock.call_count == 0
+
+
+def test_token_bucket_without_rate(mocker):
+    """
+    送信間隔を制限しない場合、待たないこと
+
+    """
+    sleep_mock = mocker.patch('session.limiter.time.sleep')
+    bucket = TokenBucket(0.0)
+    for _ in range(100):
+        bucket.acquire()
+    assert sleep_mock.call_count == 0
+
+
+def test_aimd_decrease(set_monotonic):
+    """
+    429・5xx・接続エラーの場合、上限を半分(最小値まで)に減らすこと
+    (減らす前に送信したリクエストの失敗では、重ねて減らさない)
+
+    """
+    controller = AimdController(8)
+    assert controller.get_stats()['concurrency_limit'] == 8
+
+    controller.record(99.0, 429)
+    assert controller.get_stats()['concurrency_limit'] == 4
+    controller.record(99.5, 503)
+    assert controller.get_stats()['concurrency_limit'] == 4
+
+    for now, status_code in ((101, 500), (102, None), (103, 429), (104, 429)):
+        set_monotonic(now)
+        controller.record(now - 0.1, status_code)
+    assert controller.get_stats() == {
+        'throttled': 3,
+        'server_errors': 2,
+        'decreases': 5,
+        'concurrency_limit': 1,
+        'in_flight': 0,
+    }
+
+
+def test_aimd_increase(set_monotonic):
+    """
+    正常な応答が上限分返るごとに、上限を1ずつ(最大値まで)増やすこと
+    また、応答時間が目標を超えた場合は、上限を減らすこと
+
+    """
+    controller = AimdController(4, latency_target=2.0)
+    controller.record(99.0, 429)
+    assert controller.get_stats()['concurrency_limit'] == 2
+
+    for _ in range(2):
+        controller.record(99.9, 200)
+    assert controller.get_stats()['concurrency_limit'] == 2
+    controller.record(99.9, 200)
+    assert controller.get_stats()['concurrency_limit'] == 3
+    for _ in range(10):
+        controller.record(99.9, 200)
+    assert controller.get_stats()['concurrency_limit'] == 4
+
+    set_monotonic(105.0)
+    controller.record(102.0, 200)
+    assert controller.get_stats()['concurrency_limit'] == 2
+
+
+def test_retry_after_blocks_requests():
+    """
+    Retry-Afterが指定された場合、その時間まで送信を止めること
+
+    """
+    limiter = RateLimiter(max_concurrency=2)
+    limiter.record(time.monotonic(), 429, 0.2)
+
+    started = time.monotonic()
+    with limiter.acquire():
+        assert limiter.get_stats()['in_flight'] == 1
+    assert time.monotonic() - started >= 0.15
+    assert limiter.get_stats()['in_flight'] == 0
+
+
+def test_parse_retry_after():
+    """
+    Retry-Afterの秒数・日時を、待ち時間(秒)に変換すること
+
+    """
+    assert parse_retry_after('120') == 120.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
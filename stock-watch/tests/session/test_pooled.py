@@ -0,0 +1,194 @@
+import io
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+import requests
+
+from session import PooledSession
+
+
+class Handler(BaseHTTPRequestHandler):
+    # keep-aliveで接続を維持する
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleep_mock(mocker):
+    return mocker.patch('session.pooled.time.sleep')
+
+
+def make_response(
+    status_code: int,
+    headers: dict = None
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(b'')
+    return response
+
+
+def test_connection_is_reused(server_url):
+    """
+    同じホストへのリクエストで、接続が再利用されること
+
+    """
+    session = PooledSession()
+    for _ in range(5):
+        assert session.get(server_url).text == 'ok'
+
+    stats = session.get_stats()
+    assert {
+        key: stats[key]
+        for key in ('requests', 'retries', 'connections', 'reused')
+    } == {
+        'requests': 5,
+        'retries': 0,
+        'connections': 1,
+        'reused': 4,
+    }
+    session.close()
+
+
+def test_retry_status_code(mocker, sleep_mock):
+    """
+    一時的なエラーのステータスコードは、待ち時間を延ばしながら再試行すること
+
+    """
+    request_mock = mocker.patch('session.pooled.requests.Session.request')
+    request_mock.side_effect = [
+        make_response(503), make_response(429), make_response(200)
+    ]
+    mocker.patch('session.pooled.random.uniform', side_effect=max)
+
+    session = PooledSession(retries=3)
+    assert session.get('http://example.com/').status_code == 200
+    assert request_mock.call_count == 3
+    assert sleep_mock.call_args_list == [
+        mocker.call(PooledSession.backoff),
+        mocker.call(PooledSession.backoff * 2),
+    ]
+    assert session.get_stats()['retries'] == 2
+
+
+def test_retry_exhausted(mocker, sleep_mock):
+    """
+    再試行回数を超えた場合、最後のレスポンスを返す、
+    または接続エラーの例外が発生すること
+
+    """
+    request_mock = mocker.patch('session.pooled.requests.Session.request')
+    request_mock.return_value = make_response(500)
+    session = PooledSession(retries=2)
+    assert session.get('http://example.com/').status_code == 500
+    assert request_mock.call_count == 3
+
+    request_mock.reset_mock()
+    request_mock.side_effect = requests.exceptions.ConnectionError()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.post('http://example.com/')
+    assert request_mock.call_count == 3
+
+
+def test_default_timeout(mocker, sleep_mock):
+    """
+    タイムアウトを指定しない場合はセッションのタイムアウトが、
+    指定した場合は指定したタイムアウトがrequestsに渡され、
+    タイムアウトは再試行されること
+
+    """
+    request_mock = mocker.patch('session.pooled.requests.Session.request')
+    request_mock.side_effect = [
+        requests.exceptions.ReadTimeout(), make_response(200)
+    ]
+    session = PooledSession(retries=1, timeout=(1.5, 7.0))
+    assert session.get('http://example.com/').status_code == 200
+    assert [
+        call.kwargs['timeout'] for call in request_mock.call_args_list
+    ] == [(1.5, 7.0)] * 2
+
+    request_mock.reset_mock()
+    request_mock.side_effect = None
+    request_mock.return_value = make_response(200)
+    session.post('http://example.com/', timeout=3)
+    assert request_mock.call_args.kwargs['timeout'] == 3
+
+    PooledSession().get('http://example.com/')
+    assert request_mock.call_args.kwargs['timeout'] == \
+        PooledSession.default_timeout
+
+
+def test_not_retry_client_error(mocker, sleep_mock):
+    """
+    一時的でないエラーのステータスコードは、再試行しないこと
+
+    """
+    request_mock = mocker.patch('session.pooled.requests.Session.request')
+    request_mock.return_value = make_response(400)
+    session = PooledSession(retries=3)
+    assert session.get('http://example.com/').status_code == 400
+    assert request_mock.call_count == 1
+    assert sleep_mock.call_count == 0
+
+
+def test_backoff_is_limited(mocker, sleep_mock):
+    """
+    再試行までの待ち時間は、上限を超えないこと
+
+    """
+    mocker.patch(
+        'session.pooled.requests.Session.request',
+        return_value=make_response(503)
+    )
+    session = PooledSession(retries=10)
+    session.get('http://example.com/')
+    assert all(
+        0 <= call.args[0] <= PooledSession.max_backoff
+        for call in sleep_mock.call_args_list
+    )
+
+
+def test_retry_after(mocker, sleep_mock):
+    """
+    Retry-Afterが指定された場合、少なくともその時間は待ってから再試行し、
+    上限を超える場合は再試行しないこと
+
+    """
+    request_mock = mocker.patch('session.pooled.requests.Session.request')
+    request_mock.side_effect = [
+        make_response(429, {'Retry-After': '3'}), make_response(200)
+    ]
+    mocker.patch('session.pooled.random.uniform', return_value=0.1)
+
+    session = PooledSession(retries=3)
+    assert session.get('http://example.com/').status_code == 200
+    assert sleep_mock.call_args_list == [mocker.call(3.0)]
+    stats = session.get_stats()
+    assert stats['throttled'] == 1
+    assert stats['concurrency_limit'] == 5
+
+    request_mock.side_effect = [make_response(503, {'Retry-After': '3600'})]
+    assert session.get('http://example.com/').status_code == 503
+    assert request_mock.call_count == 3
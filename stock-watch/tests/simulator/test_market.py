@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from simulator import RandomWalkMarket
+from simulator import SimulatedClock
+
+
+def test_same_seed_same_prices():
+    """
+    同じシードであれば、取得する順番によらず同じ価格になること
+
+    """
+    first = RandomWalkMarket(seed=1)
+    second = RandomWalkMarket(seed=1)
+    first_prices = []
+    for _ in range(3):
+        first_prices.append(first.get_price(8267))
+        first.step()
+    second.step(2)
+    assert second.get_price(8267) == first_prices[2]
+    assert RandomWalkMarket(seed=2).get_price(8267) != first_prices[0]
+
+
+def test_prices_do_not_depend_on_other_codes():
+    """
+    価格が(シード, 銘柄コード, 動かした回数)で決まり、
+    他の銘柄の取得や、取得した時点の回数によらないこと
+
+    """
+    first = RandomWalkMarket(seed=1, volatility=0.05)
+    second = RandomWalkMarket(seed=1, volatility=0.05)
+    for _ in range(5):
+        first.get_price(1333)
+        first.get_price(8267)
+        first.step()
+    second.step(5)
+    assert second.get_price(8267) == first.get_price(8267)
+
+    # 前の回数の価格も、同じ価格になる
+    second.clock.advance(-3)
+    third = RandomWalkMarket(seed=1, volatility=0.05)
+    third.step(2)
+    assert second.get_price(8267) == third.get_price(8267)
+
+
+def test_price_moves_by_step():
+    """
+    価格を動かすまでは同じ価格を返し、前日終値は初値のままであること
+
+    """
+    market = RandomWalkMarket(seed=1, volatility=0.05)
+    price, close = market.get_quote(8267)
+    assert price == close
+    assert market.get_price(8267) == price
+    assert 100 <= price <= 10000
+
+    market.step(10)
+    moved, close = market.get_quote(8267)
+    assert moved != price
+    assert close == price
+    assert moved == moved.to_integral_value()
+    assert isinstance(moved, Decimal)
+
+
+def test_price_moves_by_clock():
+    """
+    模擬時計の一定時間ごとに価格が動くこと
+
+    """
+    clock = SimulatedClock()
+    market = RandomWalkMarket(
+        seed=1,
+        volatility=0.05,
+        tick_interval=0.1,
+        clock=clock
+    )
+    price = market.get_price(8267)
+
+    clock.advance(0.05)
+    assert market.tick == 0
+    assert market.get_price(8267) == price
+    for _ in range(5):
+        clock.advance(0.05)
+    assert market.tick == 3
+    assert market.get_price(8267) != price
+
+    stepped = RandomWalkMarket(seed=1, volatility=0.05)
+    stepped.step(3)
+    assert market.get_price(8267) == stepped.get_price(8267)
@@ -0,0 +1,123 @@
+import pytest
+import requests
+
+from price import PriceByKabutan
+from session import PooledSession
+from simulator import KabutanServer
+from simulator import RandomWalkMarket
+
+
+@pytest.fixture
+def start_server():
+    """
+    模擬サーバを起動する (テストの終了時に停止する)
+    """
+    servers = []
+
+    def start_server(**kwargs) -> KabutanServer:
+        market = RandomWalkMarket(seed=1)
+        server = KabutanServer(market, **kwargs)
+        server.start()
+        servers.append(server)
+        return server
+    yield start_server
+    for server in servers:
+        server.stop()
+
+
+def test_price_by_kabutan(start_server):
+    """
+    模擬サーバのページから、模擬市場の価格を取得できること
+    (ページ全体の解析でも同じ価格になること)
+
+    """
+    server = start_server()
+    price = PriceByKabutan(url=server.url)
+    assert price.get_data(8267) == server.market.get_price(8267)
+
+    html = requests.get(server.url.format(1333)).text
+    assert price.extract_price_text_by_soup(html) == \
+        '{:,}円'.format(server.market.get_price(1333))
+    assert len(html.encode('utf-8')) > 100 * 1024
+
+
+def test_faults(start_server):
+    """
+    指定された割合で、5xx・429(Retry-After付き)を返すこと
+
+    """
+    server = start_server(error_rate=1.0)
+    assert requests.get(server.url.format(8267)).status_code == 503
+
+    server = start_server(throttle_rate=1.0, retry_after=3)
+    response = requests.get(server.url.format(8267))
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+    assert server.get_stats()['throttled'] == 1
+
+    assert requests.get(server.url.replace('stock', 'other')).status_code \
+        == 404
+
+
+def test_same_seed_same_faults():
+    """
+    遅延・エラーが(シード, 銘柄コード, 銘柄ごとの要求の回数)で決まり、
+    他の銘柄の要求によらないこと
+
+    """
+    servers = [
+        KabutanServer(seed=seed, jitter=0.1, error_rate=0.5)
+        for seed in (1, 1, 2)
+    ]
+    try:
+        # 最初のサーバだけ、先に他の銘柄の要求を受ける
+        for _ in range(20):
+            servers[0].draw_fault(1333)
+        faults = [
+            [server.draw_fault(8267) for _ in range(20)]
+            for server in servers
+        ]
+        assert faults[0] == faults[1]
+        assert {fault for _, fault in faults[0]} == {0, 503}
+        assert faults[2] != faults[0]
+    finally:
+        for server in servers:
+            server.server_close()
+
+
+def test_clock_step(start_server):
+    """
+    銘柄ページの要求ごとに、模擬市場の時計が進むこと
+
+    """
+    server = start_server(clock_step=0.5)
+    for _ in range(4):
+        requests.get(server.url.format(8267))
+    assert server.market.tick == 2
+
+
+def test_etag(start_server):
+    """
+    価格が変わらない間は、条件付きの取得で304を返すこと
+
+    """
+    server = start_server(etag=True)
+    session = PooledSession()
+    price = PriceByKabutan(session=session, url=server.url)
+    first = price.get_data(8267)
+    assert price.get_data(8267) == first
+    assert server.get_stats()['not_modified'] == 1
+
+    server.market.step(100)
+    assert price.get_data(8267) == server.market.get_price(8267)
+    assert server.get_stats()['not_modified'] == 1
+
+
+def test_pages(start_server):
+    """
+    保存したページを指定した場合、銘柄コードに応じて順に返すこと
+
+    """
+    server = start_server(pages=[b'page0', b'page1'])
+    assert requests.get(server.url.format(1000)).content == b'page0'
+    assert requests.get(server.url.format(1001)).content == b'page1'
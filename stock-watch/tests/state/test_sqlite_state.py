@@ -0,0 +1,227 @@
+from decimal import Decimal
+
+import pytest
+
+from db.rule import Rule
+from state import SqliteAlertState
+
+
+@pytest.fixture
+def state_file(tmp_path) -> str:
+    return str(tmp_path / 'alert_state.db')
+
+
+def over(description: int, price: int) -> Rule:
+    return Rule(description, Decimal(price), 'over')
+
+
+def under(description: int, price: int) -> Rule:
+    return Rule(description, Decimal(price), 'under')
+
+
+def test_judge_only_transition(state_file):
+    """
+    基準を超えた時点でのみ通知対象となり、
+    超えている間は通知対象とならないこと
+
+    """
+    state = SqliteAlertState(state_file)
+    prices = {8267: Decimal(2600), 1333: Decimal(2100)}
+    crossed = {8267: [under(8267, 2700)]}
+    assert state.judge(prices, crossed) == [8267]
+    state.commit()
+
+    assert state.judge(prices, crossed) == []
+
+    # 別の基準を新たに超えた場合は通知対象となる
+    prices = {8267: Decimal(2400), 1333: Decimal(2100)}
+    crossed = {
+        8267: [under(8267, 2700), under(8267, 2500)],
+        1333: [over(1333, 2000)],
+    }
+    assert state.judge(prices, crossed) == [8267, 1333]
+
+
+def test_judge_without_commit(state_file):
+    """
+    commitしない場合、判定した状態は保存されないこと
+
+    """
+    state = SqliteAlertState(state_file)
+    prices = {8267: Decimal(2600)}
+    crossed = {8267: [under(8267, 2700)]}
+    assert state.judge(prices, crossed) == [8267]
+    assert state.judge(prices, crossed) == [8267]
+
+
+def test_state_is_persistent(state_file):
+    """
+    通知状態がファイルに保持され、次回の起動でも引き継がれること
+
+    """
+    prices = {8267: Decimal(2600)}
+    crossed = {8267: [under(8267, 2700)]}
+    state = SqliteAlertState(state_file)
+    state.judge(prices, crossed)
+    state.commit()
+
+    assert SqliteAlertState(state_file).judge(prices, crossed) == []
+
+
+def test_rearm(state_file):
+    """
+    価格が基準から戻った場合、再び通知対象となること
+
+    """
+    state = SqliteAlertState(state_file)
+    crossed = {1333: [over(1333, 2000)]}
+    state.judge({1333: Decimal(2000)}, crossed)
+    state.commit()
+
+    state.judge({1333: Decimal(1999)}, {})
+    state.commit()
+    assert state.judge({1333: Decimal(2000)}, crossed) == [1333]
+
+
+@pytest.mark.parametrize('price, expected', [
+    # 戻り幅(基準の1%)の内では再通知しない
+    (Decimal(1980), []),
+    # 戻り幅を超えて戻った場合は再通知する
+    (Decimal('1979.9'), [1333]),
+])
+def test_rearm_by_band(state_file, price, expected):
+    """
+    再通知幅を設定した場合、価格が基準から再通知幅を超えて戻るまで、
+    再び通知対象とならないこと
+
+    """
+    state = SqliteAlertState(state_file, rearm_band=1.0)
+    crossed = {1333: [over(1333, 2000)]}
+    state.judge({1333: Decimal(2000)}, crossed)
+    state.commit()
+
+    state.judge({1333: price}, {})
+    state.commit()
+    assert state.judge({1333: Decimal(2000)}, crossed) == expected
+
+
+def test_rearm_under_by_band(state_file):
+    """
+    以下の基準についても、再通知幅を超えて戻った場合に再び通知対象となること
+
+    """
+    state = SqliteAlertState(state_file, rearm_band=1.0)
+    crossed = {8267: [under(8267, 2700)]}
+    state.judge({8267: Decimal(2700)}, crossed)
+    state.commit()
+
+    state.judge({8267: Decimal(2727)}, {})
+    state.commit()
+    assert state.judge({8267: Decimal(2700)}, crossed) == []
+
+    state.judge({8267: Decimal('2727.1')}, {})
+    state.commit()
+    assert state.judge({8267: Decimal(2700)}, crossed) == [8267]
+
+
+def test_state_of_missing_price(state_file):
+    """
+    価格を取得できなかった銘柄の通知状態は変わらないこと
+
+    """
+    state = SqliteAlertState(state_file)
+    crossed = {1333: [over(1333, 2000)]}
+    state.judge({1333: Decimal(2000)}, crossed)
+    state.commit()
+
+    state.judge({8267: Decimal(2600)}, {})
+    state.commit()
+    assert state.judge({1333: Decimal(2000)}, crossed) == []
+
+
+def test_commit_with_undelivered(state_file):
+    """
+    通知できなかった銘柄は、新たに超えた基準だけが保存されず、
+    戻った基準を未通知に戻す状態の変化は保存されること
+
+    """
+    state = SqliteAlertState(state_file)
+    state.judge({1333: Decimal(2000)}, {1333: [over(1333, 2000)]})
+    state.commit()
+
+    # 1333は基準から戻り、新たに基準を超えた8267は通知に失敗する
+    prices = {1333: Decimal(1900), 8267: Decimal(2600)}
+    crossed = {8267: [under(8267, 2700)]}
+    assert state.judge(prices, crossed) == [8267]
+    state.commit([8267])
+
+    crossed = {1333: [over(1333, 2000)], 8267: [under(8267, 2700)]}
+    assert state.judge({1333: Decimal(2000), 8267: Decimal(2600)}, crossed) \
+        == [1333, 8267]
+
+
+def test_commit_with_undelivered_keeps_fired(state_file):
+    """
+    通知できなかった銘柄も、通知済みの基準は通知済みのままとなること
+
+    """
+    state = SqliteAlertState(state_file)
+    crossed = {8267: [under(8267, 2700)]}
+    state.judge({8267: Decimal(2600)}, crossed)
+    state.commit()
+
+    crossed = {8267: [under(8267, 2700), under(8267, 2500)]}
+    assert state.judge({8267: Decimal(2400)}, crossed) == [8267]
+    state.commit([8267])
+
+    # 新たに超えた基準だけが、次回も通知対象となる
+    crossed = {8267: [under(8267, 2700)]}
+    assert state.judge({8267: Decimal(2400)}, crossed) == []
+    crossed = {8267: [under(8267, 2500)]}
+    assert state.judge({8267: Decimal(2400)}, crossed) == [8267]
+
+
+def test_prune(state_file):
+    """
+    ルールから削除された基準の通知状態が削除され、
+    残っている基準の通知状態は変わらないこと
+
+    """
+    state = SqliteAlertState(state_file)
+    crossed = {
+        8267: [under(8267, 2700)],
+        1333: [over(1333, 2000)],
+    }
+    state.judge({8267: Decimal(2600), 1333: Decimal(2000)}, crossed)
+    state.commit()
+
+    # (基準価格の表記が異なっても、同じ基準とする)
+    state.prune([
+        Rule(8267, Decimal('2700.0'), 'under'),
+        under(1333, 1500),
+    ])
+
+    assert state.judge({8267: Decimal(2600), 1333: Decimal(2000)}, crossed) \
+        == [1333]
+
+
+def test_commit_after_judging_groups(state_file):
+    """
+    続けて別の銘柄を判定した場合、まとめて保存され、
+    通知できなかった銘柄の新たに超えた基準だけが保存されないこと
+
+    """
+    state = SqliteAlertState(state_file)
+    assert state.judge(
+        {8267: Decimal(2600)},
+        {8267: [under(8267, 2700)]}
+    ) == [8267]
+    assert state.judge(
+        {1333: Decimal(2000)},
+        {1333: [over(1333, 2000)]}
+    ) == [1333]
+    state.commit([8267])
+
+    prices = {8267: Decimal(2600), 1333: Decimal(2000)}
+    crossed = {8267: [under(8267, 2700)], 1333: [over(1333, 2000)]}
+    assert state.judge(prices, crossed) == [8267]
@@ -88,3 +88,483 @@ def test_config_channel_access_token_by_nothing_file(object_by_empty_file):
 
     message = '設定ファイルにキーが存在しません。 キー: channel_access_token'
     assert str(ex.value) == message
+
+
+def test_config_db_type(object_by_normal_file):
+    """
+    正常にiniファイルからdbの値が取得できること
+
+    """
+    assert object_by_normal_file.db_type == 'sqlite'
+
+
+def test_config_db_type_by_nothing_file(object_by_empty_file):
+    """
+    dbの設定の無いiniファイルからdbの値を取得しようとした場合、
+    既定値のcsvが返ること
+
+    """
+    assert object_by_empty_file.db_type == 'csv'
+
+
+def test_config_csv_loader(object_by_normal_file):
+    """
+    正常にiniファイルからcsv_loaderの値が取得できること
+
+    """
+    assert object_by_normal_file.csv_loader == 'stream'
+
+
+def test_config_csv_loader_by_nothing_file(object_by_empty_file):
+    """
+    csv_loaderの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のpandasが返ること
+
+    """
+    assert object_by_empty_file.csv_loader == 'pandas'
+
+
+def test_config_alert_state(object_by_normal_file):
+    """
+    正常にiniファイルからalert_stateの値が取得できること
+
+    """
+    assert object_by_normal_file.alert_state == 'none'
+
+
+def test_config_alert_state_by_nothing_file(object_by_empty_file):
+    """
+    alert_stateの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のsqliteが返ること
+
+    """
+    assert object_by_empty_file.alert_state == 'sqlite'
+
+
+def test_config_rearm_band(object_by_normal_file):
+    """
+    正常にiniファイルからrearm_bandの値が取得できること
+
+    """
+    assert object_by_normal_file.rearm_band == 1.5
+
+
+def test_config_rearm_band_by_nothing_file(object_by_empty_file):
+    """
+    rearm_bandの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の0が返ること
+
+    """
+    assert object_by_empty_file.rearm_band == 0
+
+
+def test_config_price_history(object_by_normal_file):
+    """
+    正常にiniファイルからprice_historyの値が取得できること
+
+    """
+    assert object_by_normal_file.price_history is False
+
+
+def test_config_price_history_by_nothing_file(object_by_empty_file):
+    """
+    price_historyの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のTrueが返ること
+
+    """
+    assert object_by_empty_file.price_history is True
+
+
+def test_config_price_concurrency(object_by_normal_file):
+    """
+    正常にiniファイルからprice_concurrencyの値が取得できること
+
+    """
+    assert object_by_normal_file.price_concurrency == 8
+
+
+def test_config_price_concurrency_by_nothing_file(object_by_empty_file):
+    """
+    price_concurrencyの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の1が返ること
+
+    """
+    assert object_by_empty_file.price_concurrency == 1
+
+
+def test_config_price_parse(object_by_normal_file):
+    """
+    正常にiniファイルからprice_parseの値が取得できること
+
+    """
+    assert object_by_normal_file.price_parse == 'process'
+
+
+def test_config_price_parse_by_nothing_file(object_by_empty_file):
+    """
+    price_parseの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のinlineが返ること
+
+    """
+    assert object_by_empty_file.price_parse == 'inline'
+
+
+def test_config_price_parse_workers(object_by_normal_file):
+    """
+    正常にiniファイルからprice_parse_workersの値が取得できること
+
+    """
+    assert object_by_normal_file.price_parse_workers == 4
+
+
+def test_config_price_parse_workers_by_nothing_file(object_by_empty_file):
+    """
+    price_parse_workersの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の0が返ること
+
+    """
+    assert object_by_empty_file.price_parse_workers == 0
+
+
+def test_config_price_hedge(object_by_normal_file):
+    """
+    正常にiniファイルからprice_hedgeの値が取得できること
+
+    """
+    assert object_by_normal_file.price_hedge is True
+
+
+def test_config_price_hedge_by_nothing_file(object_by_empty_file):
+    """
+    price_hedgeの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のFalseが返ること
+
+    """
+    assert object_by_empty_file.price_hedge is False
+
+
+def test_config_price_hedge_quantile(object_by_normal_file):
+    """
+    正常にiniファイルからprice_hedge_quantileの値が取得できること
+
+    """
+    assert object_by_normal_file.price_hedge_quantile == 0.9
+
+
+def test_config_price_hedge_quantile_by_nothing_file(object_by_empty_file):
+    """
+    price_hedge_quantileの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の0.95が返ること
+
+    """
+    assert object_by_empty_file.price_hedge_quantile == 0.95
+
+
+def test_config_http_pool_size(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_pool_sizeの値が取得できること
+
+    """
+    assert object_by_normal_file.http_pool_size == 20
+
+
+def test_config_http_pool_size_by_nothing_file(object_by_empty_file):
+    """
+    http_pool_sizeの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の10が返ること
+
+    """
+    assert object_by_empty_file.http_pool_size == 10
+
+
+def test_config_http_retries(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_retriesの値が取得できること
+
+    """
+    assert object_by_normal_file.http_retries == 5
+
+
+def test_config_http_retries_by_nothing_file(object_by_empty_file):
+    """
+    http_retriesの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の3が返ること
+
+    """
+    assert object_by_empty_file.http_retries == 3
+
+
+def test_config_http_connect_timeout(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_connect_timeoutの値が取得できること
+
+    """
+    assert object_by_normal_file.http_connect_timeout == 2.5
+
+
+def test_config_http_connect_timeout_by_nothing_file(object_by_empty_file):
+    """
+    http_connect_timeoutの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の5.0が返ること
+
+    """
+    assert object_by_empty_file.http_connect_timeout == 5.0
+
+
+def test_config_http_read_timeout(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_read_timeoutの値が取得できること
+
+    """
+    assert object_by_normal_file.http_read_timeout == 12.5
+
+
+def test_config_http_read_timeout_by_nothing_file(object_by_empty_file):
+    """
+    http_read_timeoutの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の30.0が返ること
+
+    """
+    assert object_by_empty_file.http_read_timeout == 30.0
+
+
+def test_config_http_rate(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_rateの値が取得できること
+
+    """
+    assert object_by_normal_file.http_rate == 2.5
+
+
+def test_config_http_rate_by_nothing_file(object_by_empty_file):
+    """
+    http_rateの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の0.0が返ること
+
+    """
+    assert object_by_empty_file.http_rate == 0.0
+
+
+def test_config_http_latency_target(object_by_normal_file):
+    """
+    正常にiniファイルからhttp_latency_targetの値が取得できること
+
+    """
+    assert object_by_normal_file.http_latency_target == 1.5
+
+
+def test_config_http_latency_target_by_nothing_file(object_by_empty_file):
+    """
+    http_latency_targetの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の3.0が返ること
+
+    """
+    assert object_by_empty_file.http_latency_target == 3.0
+
+
+def test_config_breaker_threshold(object_by_normal_file):
+    """
+    正常にiniファイルからbreaker_thresholdの値が取得できること
+
+    """
+    assert object_by_normal_file.breaker_threshold == 3
+
+
+def test_config_breaker_threshold_by_nothing_file(object_by_empty_file):
+    """
+    breaker_thresholdの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の5が返ること
+
+    """
+    assert object_by_empty_file.breaker_threshold == 5
+
+
+def test_config_breaker_recovery(object_by_normal_file):
+    """
+    正常にiniファイルからbreaker_recoveryの値が取得できること
+
+    """
+    assert object_by_normal_file.breaker_recovery == 10.5
+
+
+def test_config_breaker_recovery_by_nothing_file(object_by_empty_file):
+    """
+    breaker_recoveryの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の30.0が返ること
+
+    """
+    assert object_by_empty_file.breaker_recovery == 30.0
+
+
+def test_config_alert_queue(object_by_normal_file):
+    """
+    正常にiniファイルからalert_queueの値が取得できること
+
+    """
+    assert object_by_normal_file.alert_queue is True
+
+
+def test_config_alert_queue_by_nothing_file(object_by_empty_file):
+    """
+    alert_queueの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のFalseが返ること
+
+    """
+    assert object_by_empty_file.alert_queue is False
+
+
+def test_config_alert_retries(object_by_normal_file):
+    """
+    正常にiniファイルからalert_retriesの値が取得できること
+
+    """
+    assert object_by_normal_file.alert_retries == 2
+
+
+def test_config_alert_retries_by_nothing_file(object_by_empty_file):
+    """
+    alert_retriesの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の3が返ること
+
+    """
+    assert object_by_empty_file.alert_retries == 3
+
+
+def test_config_alert_flush_timeout(object_by_normal_file):
+    """
+    正常にiniファイルからalert_flush_timeoutの値が取得できること
+
+    """
+    assert object_by_normal_file.alert_flush_timeout == 5.5
+
+
+def test_config_alert_flush_timeout_by_nothing_file(object_by_empty_file):
+    """
+    alert_flush_timeoutの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の30.0が返ること
+
+    """
+    assert object_by_empty_file.alert_flush_timeout == 30.0
+
+
+def test_config_price_cache(object_by_normal_file):
+    """
+    正常にiniファイルからprice_cacheの値が取得できること
+
+    """
+    assert object_by_normal_file.price_cache == 'memory'
+
+
+def test_config_price_cache_by_nothing_file(object_by_empty_file):
+    """
+    price_cacheの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のsqliteが返ること
+
+    """
+    assert object_by_empty_file.price_cache == 'sqlite'
+
+
+def test_config_price_cache_ttl(object_by_normal_file):
+    """
+    正常にiniファイルからprice_cache_ttlの値が取得できること
+
+    """
+    assert object_by_normal_file.price_cache_ttl == 30
+
+
+def test_config_price_cache_ttl_by_nothing_file(object_by_empty_file):
+    """
+    price_cache_ttlの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の0が返ること
+
+    """
+    assert object_by_empty_file.price_cache_ttl == 0
+
+
+def test_config_price_cache_size(object_by_normal_file):
+    """
+    正常にiniファイルからprice_cache_sizeの値が取得できること
+
+    """
+    assert object_by_normal_file.price_cache_size == 500
+
+
+def test_config_price_cache_size_by_nothing_file(object_by_empty_file):
+    """
+    price_cache_sizeの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の10000が返ること
+
+    """
+    assert object_by_empty_file.price_cache_size == 10000
+
+
+def test_config_price_cache_memory(object_by_normal_file):
+    """
+    正常にiniファイルからprice_cache_memoryの値が取得できること
+
+    """
+    assert object_by_normal_file.price_cache_memory == 64
+
+
+def test_config_price_cache_memory_by_nothing_file(object_by_empty_file):
+    """
+    price_cache_memoryの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の4096が返ること
+
+    """
+    assert object_by_empty_file.price_cache_memory == 4096
+
+
+def test_config_price_url(object_by_normal_file):
+    """
+    正常にiniファイルからprice_urlの値が取得できること
+
+    """
+    assert object_by_normal_file.price_url == \
+        'http://127.0.0.1:8080/stock/?code={}'
+
+
+def test_config_price_url_by_nothing_file(object_by_empty_file):
+    """
+    price_urlの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の空文字が返ること
+
+    """
+    assert object_by_empty_file.price_url == ''
+
+
+def test_config_price_list_urls(object_by_normal_file):
+    """
+    正常にiniファイルからprice_list_urlsの値が取得できること
+
+    """
+    assert object_by_normal_file.price_list_urls == [
+        'https://kabutan.jp/warning/?mode=2_1',
+        'https://kabutan.jp/warning/?mode=2_2',
+    ]
+
+
+def test_config_price_list_urls_by_nothing_file(object_by_empty_file):
+    """
+    price_list_urlsの設定の無いiniファイルから値を取得しようとした場合、
+    既定値の空のリストが返ること
+
+    """
+    assert object_by_empty_file.price_list_urls == []
+
+
+def test_config_market_calendar(object_by_normal_file):
+    """
+    正常にiniファイルからmarket_calendarの値が取得できること
+
+    """
+    assert object_by_normal_file.market_calendar == 'none'
+
+
+def test_config_market_calendar_by_nothing_file(object_by_empty_file):
+    """
+    market_calendarの設定の無いiniファイルから値を取得しようとした場合、
+    既定値のtseが返ること
+
+    """
+    assert object_by_empty_file.market_calendar == 'tse'
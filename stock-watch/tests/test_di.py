@@ -0,0 +1,62 @@
+import io
+from decimal import Decimal
+
+import requests
+from injector import Injector
+
+from config import Config
+from di import PriceDiModule
+from price import IPrice
+from price import PriceByKabutan
+from session import PooledSession
+
+
+def make_response(body: bytes) -> requests.Response:
+    """
+    テスト用関数
+    レスポンスを作成する
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_price_pipeline_is_used(mocker, tmp_path):
+    """
+    既定の設定(取得元の遮断あり)でも、解析方法に"thread"を指定した場合、
+    受信と解析を分けて価格が取得されること
+
+    """
+    config_file = tmp_path / 'config.ini'
+    config_file.write_text(
+        '[DEFAULT]\n'
+        'price_parse = thread\n'
+        'price_cache = none\n'
+        'price_history = false\n',
+        encoding='utf-8'
+    )
+    mocker.patch.object(Config, 'config_file', str(config_file))
+    mocker.patch.object(
+        PriceByKabutan,
+        'validator_file',
+        str(tmp_path / 'price_validators.db')
+    )
+    mocker.patch.object(PooledSession, 'get').side_effect = \
+        lambda url, **kwargs: make_response(url[-4:].encode())
+    mocker.patch.object(
+        PriceByKabutan,
+        'extract_price_text',
+        side_effect=lambda html, scan_size=None: html
+    )
+    pipeline = mocker.spy(
+        PriceByKabutan,
+        '_PriceByKabutan__iter_data_by_pipeline'
+    )
+
+    assert Config().breaker_threshold > 0
+    price = Injector([PriceDiModule()]).get(IPrice)
+    futures = list(price.iter_data([8267, 1333]))
+    assert [future.result() for future in futures] == \
+        [Decimal(8267), Decimal(1333)]
+    assert pipeline.call_count == 1
@@ -1,5 +1,6 @@
 from decimal import Decimal
-from typing import Callable
+from typing import Dict
+from typing import List
 
 import pytest
 from injector import Module
@@ -8,11 +9,21 @@ from injector import Injector
 import main
 from db import IDb
 from price import IPrice
+from price import CachedPrice
 from alert import IAlert
+from alert import QueuedAlert
 from log import ILogger
+from state import IAlertState
+from state import NoAlertState
+from state import SqliteAlertState
+from indicator import IIndicator
+from market import IMarketCalendar
+from market import NoMarketCalendar
+from db.rule import Rule
 from exceptions import DbException
 from exceptions import PriceException
 from exceptions import AlertException
+from exceptions import PriceCircuitOpenException
 
 
 class MockDb(IDb):
@@ -27,6 +38,18 @@ class MockAlert(IAlert):
     mock_path = 'test_main.MockAlert'
 
 
+class MockAlertState(IAlertState):
+    mock_path = 'test_main.MockAlertState'
+
+
+class MockIndicator(IIndicator):
+    mock_path = 'test_main.MockIndicator'
+
+
+class MockMarketCalendar(IMarketCalendar):
+    mock_path = 'test_main.MockMarketCalendar'
+
+
 class MockLogger(ILogger):
     mock_path = 'test_main.MockLogger'
 
@@ -63,6 +86,27 @@ class TestAlertDiModule(TestDiModule):
         super().__init__(IAlert, MockAlert)
 
 
+class TestAlertStateDiModule(TestDiModule):
+    __test__ = False
+
+    def __init__(self):
+        super().__init__(IAlertState, MockAlertState)
+
+
+class TestIndicatorDiModule(TestDiModule):
+    __test__ = False
+
+    def __init__(self):
+        super().__init__(IIndicator, MockIndicator)
+
+
+class TestMarketCalendarDiModule(TestDiModule):
+    __test__ = False
+
+    def __init__(self):
+        super().__init__(IMarketCalendar, MockMarketCalendar)
+
+
 class TestLoggerDiModule(TestDiModule):
     __test__ = False
 
@@ -70,6 +114,33 @@ class TestLoggerDiModule(TestDiModule):
         super().__init__(ILogger, MockLogger)
 
 
+def make_price_mock(mocker):
+    """
+    テスト用関数
+    IPriceのmockを作成する
+    (iter_dataは、既定の実装のとおりget_dataで1銘柄ずつ取得する)
+    (get_many・get_statsは、まとめて取得しない・統計のない実装と同じく空を返す)
+    """
+    price_mock = mocker.Mock(spec=IPrice)
+    price_mock.iter_data.side_effect = \
+        lambda descriptions: IPrice.iter_data(price_mock, descriptions)
+    price_mock.get_many.return_value = {}
+    price_mock.get_stats.return_value = {}
+    return price_mock
+
+
+def make_alert_mock(mocker):
+    """
+    テスト用関数
+    IAlertのmockを作成する
+    (get_stats・flushは、統計・送信待ちのない実装と同じく空を返す)
+    """
+    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock.get_stats.return_value = {}
+    alert_mock.flush.return_value = []
+    return alert_mock
+
+
 def get_description_groups(test_descriptions: dict) -> list:
     """
     テスト用関数
@@ -113,11 +184,51 @@ def get_main_object():
             TestDbDiModule(),
             TestPriceDiModule(),
             TestAlertDiModule(),
+            TestAlertStateDiModule(),
+            TestIndicatorDiModule(),
+            TestMarketCalendarDiModule(),
             TestLoggerDiModule()
         ])
     return injector.get(main.Main)
 
 
+@pytest.fixture(autouse=True)
+def alert_state(mocker):
+    """
+    通知状態を保持せず、基準を超えた銘柄をすべて通知対象とする
+    """
+    mocker.patch(MockAlertState.mock_path, new=NoAlertState())
+
+
+@pytest.fixture(autouse=True)
+def indicator(mocker):
+    """
+    指標によるルールの条件を満たした銘柄はないものとする
+    """
+    indicator_mock = mocker.Mock(spec=IIndicator)
+    mocker.patch.object(indicator_mock, 'judge', return_value={})
+    mocker.patch(MockIndicator.mock_path, new=indicator_mock)
+
+
+@pytest.fixture(autouse=True)
+def market_calendar(mocker):
+    """
+    常に取引時間中とする
+    """
+    mocker.patch(MockMarketCalendar.mock_path, new=NoMarketCalendar())
+
+
+def get_crossed_rules(prices: Dict[int, Decimal]) -> Dict[int, List[Rule]]:
+    """
+    テスト用関数
+    判定対象の銘柄すべてについて、価格を基準としたルールを返す
+    """
+    return {
+        description: [Rule(description, price, 'over')]
+        for description, price in prices.items()
+    }
+
+
 def test_execute_normal(mocker):
     """
     以下の3点が正常終了した場合のテスト
@@ -129,9 +240,8 @@ def test_execute_normal(mocker):
     1. DBからの対象銘柄コードグループ取得メソッドが一度だけ呼ばれること
     2. 対象銘柄の数の回数だけ、価格取得メソッドが呼ばれること
        またその引数がDBから取得した銘柄コードグループの銘柄コードであること
-    3. 対象銘柄の数の回数だけ、トリガー条件判定メソッド取得メソッドが呼ばれること
-       その引数がDBから取得した銘柄コードグループの銘柄コードであること
-       またトリガー条件判定メソッドに渡される引数が価格取得メソッドで取得した価格であること
+    3. 各銘柄コードグループ毎に、一括トリガー条件判定メソッドが呼ばれること
+       その引数がグループの銘柄コードと価格取得メソッドで取得した価格の組であること
     4. 各銘柄コードグループ毎に、アラートメソッドが呼ばれること
        またその引数が、トリガー条件判定メソッドにてTrueが返された銘柄のリストであること
        (Trueの銘柄が一つもない場合には、引数は空のリスト)
@@ -175,7 +285,8 @@ def test_execute_normal(mocker):
     mock Main
     """
     main_send_message = mocker.patch('main.Main.send_message')
-    main_alert = mocker.patch('main.Main.alert')
+    main_send_messages = mocker.patch('main.Main.send_messages')
+    main_alert = mocker.patch('main.Main.alert', return_value=True)
     main_fail = mocker.patch('main.Main.fail')
 
     """
@@ -190,26 +301,29 @@ def test_execute_normal(mocker):
             return_value=description_groups
         )
 
-    # IDb.get_judge_func
-    def get_judge_func(description: int) -> Callable[[Decimal], bool]:
+    # IDb.get_triggered_descriptions
+    def get_triggered_descriptions(prices: Dict[int, Decimal]) -> List[int]:
         """
         引数のチェックとalert_targetの値を返す
         """
-
-        if description in test_descriptions:
-            config = test_descriptions[description]
-
-            def func(param_price: Decimal) -> bool:
-                if param_price != config['price']:
-                    # judge_funcに与えられた引数の確認
-                    raise ValueError('unexpected param_price is received')
-                return config['alert_target']
-            return func
-        else:
-            raise ValueError('Parameter description is invalid')
-
-    idb_get_judge_func = mocker.patch.object(db_mock, 'get_judge_func')
-    idb_get_judge_func.side_effect = get_judge_func
+        for description, param_price in prices.items():
+            if description not in test_descriptions:
+                raise ValueError('Parameter description is invalid')
+            if param_price != test_descriptions[description]['price']:
+                # 判定メソッドに与えられた価格の確認
+                raise ValueError('unexpected param_price is received')
+        return [
+            description for description in prices
+            if test_descriptions[description]['alert_target']
+        ]
+
+    idb_get_triggered_descriptions = \
+        mocker.patch.object(db_mock, 'get_triggered_descriptions')
+    idb_get_triggered_descriptions.side_effect = get_triggered_descriptions
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = get_crossed_rules
 
     # patch
     mocker.patch(MockDb.mock_path, new=db_mock)
@@ -217,7 +331,7 @@ def test_execute_normal(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
 
     # IPrice.get_data
     iprice_get_data = \
@@ -231,7 +345,7 @@ def test_execute_normal(mocker):
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     # patch
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -264,22 +378,35 @@ def test_execute_normal(mocker):
             params_descriptions.append(mocker.call(code))
     assert iprice_get_data.call_count == len(test_descriptions)
     iprice_get_data.assert_has_calls(params_descriptions)
-    # 3. 対象銘柄の数の回数だけ、トリガー条件判定メソッド取得メソッドが呼ばれること
-    #    その引数がDBから取得した銘柄コードグループの銘柄コードであること
-    #    またトリガー条件判定メソッドに渡される引数が価格取得メソッドで取得した価格であること
-    assert idb_get_judge_func.call_count == len(test_descriptions)
-    idb_get_judge_func.assert_has_calls(params_descriptions)
+    # 3. 各銘柄コードグループ毎に、一括トリガー条件判定メソッドが呼ばれること
+    #    その引数がグループの銘柄コードと価格取得メソッドで取得した価格の組であること
+    params_prices = [
+        mocker.call({
+            code: test_descriptions[code]['price']
+            for code in description_group
+        })
+        for description_group in description_groups
+    ]
+    assert idb_get_triggered_descriptions.call_count == len(test_groups)
+    idb_get_triggered_descriptions.assert_has_calls(params_prices)
     # 4. 各銘柄コードグループ毎に、アラートメソッドが呼ばれること
     #    またその引数が、トリガー条件判定メソッドにてTrueが返された銘柄のリストであること
     #    (Trueの銘柄が一つもない場合には、引数は空のリスト)
-    params_alert_description_groups = \
-        [mocker.call(group) for group in alert_description_groups]
+    params_alert_description_groups = [
+        mocker.call(
+            {code: test_descriptions[code]['price'] for code in group},
+            get_crossed_rules({
+                code: test_descriptions[code]['price'] for code in group
+            })
+        )
+        for group in alert_description_groups
+    ]
     assert main_alert.call_count == len(test_groups)
     main_alert.assert_has_calls(params_alert_description_groups)
-    # 5. 処理完了時に、メッセージ通知メソッドが呼ばれ、
+    # 5. 処理完了時に、まとめて通知するメソッドが一度だけ呼ばれ、
     #    パラメータとして終了メッセージが設定されていること
-    assert main_send_message.call_count == 1
-    main_send_message.assert_has_calls([mocker.call(main.Main.end_message)])
+    assert main_send_message.call_count == 0
+    main_send_messages.assert_called_once_with([main.Main.end_message])
     # 6. 価格取得失敗メッセージ通知メソッドが一度も呼ばれないこと
     assert main_fail.call_count == 0
 
@@ -309,13 +436,13 @@ def test_fail_get_descriptions(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
     """
@@ -340,6 +467,35 @@ def test_fail_get_descriptions(mocker):
     )
 
 
+def test_error_report_is_logged(mocker):
+    """
+    DBデータの検証エラーがある場合、
+    起動時にまとめて1回だけエラーログに出力されること
+    """
+    mocker.patch('main.Main.send_message')
+    mocker.patch('main.Main.alert')
+    mocker.patch('main.Main.fail')
+
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(db_mock, 'get_description_groups', return_value=[])
+    mocker.patch.object(
+        db_mock,
+        'get_error_report',
+        return_value='error line1\nerror line2'
+    )
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    mocker.patch(MockPrice.mock_path, new=make_price_mock(mocker))
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    logger_mock = mocker.Mock(spec=ILogger)
+    mocker.patch(MockLogger.mock_path, new=logger_mock)
+    ilogger_error = mocker.patch.object(logger_mock, 'error')
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    ilogger_error.assert_called_once_with('error line1\nerror line2')
+
+
 def test_fail_get_data_some_descriptions(mocker):
     """
     幾つかの銘柄で、価格取得が失敗した場合、
@@ -358,8 +514,8 @@ def test_fail_get_data_some_descriptions(mocker):
     """
     mock Main
     """
-    main_send_message = mocker.patch('main.Main.send_message')
-    main_alert = mocker.patch('main.Main.alert')
+    main_send_messages = mocker.patch('main.Main.send_messages')
+    main_alert = mocker.patch('main.Main.alert', return_value=True)
     main_fail = mocker.patch('main.Main.fail')
 
     """
@@ -371,13 +527,20 @@ def test_fail_get_data_some_descriptions(mocker):
         'get_description_groups',
         return_value=description_groups
     )
-    mocker.patch.object(db_mock, 'get_judge_func', return_value=lambda x: True)
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions'
+    ).side_effect = lambda prices: list(prices)
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = get_crossed_rules
     mocker.patch(MockDb.mock_path, new=db_mock)
 
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
 
     def get_data(description: int) -> Decimal:
         """
@@ -393,7 +556,7 @@ def test_fail_get_data_some_descriptions(mocker):
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
     """
@@ -422,14 +585,18 @@ def test_fail_get_data_some_descriptions(mocker):
 
     # アラートの送信
     assert main_alert.call_count == 3
+    alert_prices = [
+        {12345: Decimal(1111)},
+        {},
+        {45678: Decimal(1111), 67890: Decimal(1111)},
+    ]
     main_alert.assert_has_calls([
-        mocker.call([12345]),
-        mocker.call([]),
-        mocker.call([45678, 67890]),
+        mocker.call(prices, get_crossed_rules(prices))
+        for prices in alert_prices
     ])
 
     # 終了メッセージの出力
-    assert main_send_message.call_count == 1
+    main_send_messages.assert_called_once_with([main.Main.end_message])
 
 
 def test_send_message_normal(mocker):
@@ -446,13 +613,13 @@ def test_send_message_normal(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     ialert_send_message = mocker.patch.object(
         alert_mock,
         'send_message'
@@ -494,13 +661,13 @@ def test_exception_from_send_message(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     ialert_send_message = mocker.patch.object(
         alert_mock,
         'send_message'
@@ -537,22 +704,23 @@ def test_alert_normal(mocker):
     """
     db_mock = mocker.Mock(spec=IDb)
     idb_make_alert_message = mocker.patch.object(db_mock, 'make_alert_message')
-    idb_make_alert_message.side_effect = lambda x: 'alert {}'.format(x)
+    idb_make_alert_message.side_effect = \
+        lambda x, price, rules: 'alert {} {}'.format(x, price)
     mocker.patch(MockDb.mock_path, new=db_mock)
 
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
-    ialert_send_message = mocker.patch.object(
+    alert_mock = make_alert_mock(mocker)
+    ialert_send_messages = mocker.patch.object(
         alert_mock,
-        'send_message'
+        'send_messages'
     )
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -566,19 +734,21 @@ def test_alert_normal(mocker):
     """
     exec
     """
-    descriptions = [5489, 124785, 1111]
+    prices = {5489: Decimal(100), 124785: Decimal(2000), 1111: Decimal(30)}
     main_object = get_main_object()
-    main_object.alert(descriptions)
+    main_object.alert(prices)
 
     """
     confirm
     """
-    assert ialert_send_message.call_count == 1
-    expected_message = \
-        'alert 5489\n' \
-        'alert 124785\n' \
-        'alert 1111'
-    ialert_send_message.assert_has_calls([mocker.call(expected_message)])
+    # 通知先でまとめられるように、1銘柄ずつのメッセージとして一度に送信すること
+    assert ialert_send_messages.call_count == 1
+    expected_messages = [
+        'alert 5489 100',
+        'alert 124785 2000',
+        'alert 1111 30',
+    ]
+    ialert_send_messages.assert_has_calls([mocker.call(expected_messages)])
     assert ilogger_exception.call_count == 0
 
 
@@ -596,16 +766,16 @@ def test_alert_empty(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
-    ialert_send_message = mocker.patch.object(
+    alert_mock = make_alert_mock(mocker)
+    ialert_send_messages = mocker.patch.object(
         alert_mock,
-        'send_message'
+        'send_messages'
     )
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -619,16 +789,15 @@ def test_alert_empty(mocker):
     """
     exec
     """
-    descriptions = []
     main_object = get_main_object()
-    main_object.alert(descriptions)
+    main_object.alert({})
 
     """
     confirm
     """
-    assert ialert_send_message.call_count == 1
-    expected_message = main.Main.no_alert_description_message
-    ialert_send_message.assert_has_calls([mocker.call(expected_message)])
+    assert ialert_send_messages.call_count == 1
+    expected_messages = [main.Main.no_alert_description_message]
+    ialert_send_messages.assert_has_calls([mocker.call(expected_messages)])
     assert ilogger_exception.call_count == 0
 
 
@@ -649,16 +818,16 @@ def test_exception_from_alert(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     mocker.patch.object(
         alert_mock,
-        'send_message'
+        'send_messages'
     ).side_effect = AlertException()
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -673,17 +842,19 @@ def test_exception_from_alert(mocker):
     exec
     """
     main_object = get_main_object()
-    main_object.alert([])
+    result = main_object.alert({})
 
     """
     confirm
     """
     assert ilogger_exception.call_count == 1
+    assert result is False
 
 
 def test_fail_normal(mocker):
     """
     failメソッドの正常系テスト
+    (取得失敗のメッセージは、flushでまとめて送信される)
     """
     """
     mock IDb
@@ -696,16 +867,16 @@ def test_fail_normal(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
-    ialert_send_message = mocker.patch.object(
+    alert_mock = make_alert_mock(mocker)
+    ialert_send_messages = mocker.patch.object(
         alert_mock,
-        'send_message'
+        'send_messages'
     )
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -722,13 +893,18 @@ def test_fail_normal(mocker):
     description = 95247
     main_object = get_main_object()
     main_object.fail(description)
+    main_object.fail(description + 1)
+    # 終了時にまとめて送信するまでは、送信しないこと
+    assert ialert_send_messages.call_count == 0
+    main_object.flush()
+    main_object.flush()
 
     """
     confirm
     """
-    assert ialert_send_message.call_count == 1
-    expected_message = 'fail 95247'
-    ialert_send_message.assert_has_calls([mocker.call(expected_message)])
+    assert ialert_send_messages.call_count == 1
+    expected_messages = ['fail 95247', 'fail 95248']
+    ialert_send_messages.assert_has_calls([mocker.call(expected_messages)])
     assert ilogger_exception.call_count == 0
 
 
@@ -749,16 +925,16 @@ def test_exception_from_fail(mocker):
     """
     mock IPrice
     """
-    price_mock = mocker.Mock(spec=IPrice)
+    price_mock = make_price_mock(mocker)
     mocker.patch(MockPrice.mock_path, new=price_mock)
 
     """
     mock IAlert
     """
-    alert_mock = mocker.Mock(spec=IAlert)
+    alert_mock = make_alert_mock(mocker)
     mocker.patch.object(
         alert_mock,
-        'send_message'
+        'send_messages'
     ).side_effect = AlertException()
     mocker.patch(MockAlert.mock_path, new=alert_mock)
 
@@ -775,8 +951,565 @@ def test_exception_from_fail(mocker):
     description = 95247
     main_object = get_main_object()
     main_object.fail(description)
+    main_object.flush()
 
     """
     confirm
     """
     assert ilogger_exception.call_count == 1
+
+
+def test_state_is_not_committed_if_alert_failed(mocker):
+    """
+    アラートの送信に失敗した場合、通知できなかった銘柄を指定して保存し、
+    次回も通知対象となること
+    """
+    mocker.patch('main.Main.send_message')
+    mocker.patch('main.Main.alert', return_value=False)
+
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345], [24680]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions'
+    ).side_effect = lambda prices: [code for code in prices if code == 12345]
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = get_crossed_rules
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(100))
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+    state_mock = mocker.Mock(spec=IAlertState)
+    mocker.patch.object(state_mock, 'judge').side_effect = \
+        lambda prices, crossed: list(crossed)
+    istate_commit = mocker.patch.object(state_mock, 'commit')
+    # (MockAlertStateは、alert_stateフィクスチャで置き換え済み)
+    mocker.patch('test_main.MockAlertState', new=state_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    # 全てのグループの判定結果を、最後にまとめて保存する
+    assert istate_commit.call_args_list == [mocker.call([12345])]
+
+
+def test_state_is_pruned_by_rules(mocker):
+    """
+    株価チェックの開始時に、現在の全てのルールで通知状態が整理されること
+    """
+    rules = [
+        Rule(12345, Decimal(100), 'over'),
+        Rule(12345, Decimal(5), 'change_over'),
+    ]
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(db_mock, 'get_description_groups', return_value=[])
+    mocker.patch.object(db_mock, 'get_all_rules', return_value=rules)
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    mocker.patch(MockPrice.mock_path, new=make_price_mock(mocker))
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+    state_mock = mocker.Mock(spec=IAlertState)
+    istate_prune = mocker.patch.object(state_mock, 'prune')
+    mocker.patch('test_main.MockAlertState', new=state_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    istate_prune.assert_called_once_with(rules)
+
+
+def test_queued_alert_is_not_lost(mocker, tmp_path):
+    """
+    バックグラウンドで送信する場合、送信できなかった通知の銘柄は
+    通知済みとならず、次回も通知対象となること
+    (送信できた銘柄は、通知済みとなること)
+    """
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345], [24680]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions'
+    ).side_effect = lambda prices: list(prices)
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = get_crossed_rules
+    mocker.patch.object(
+        db_mock,
+        'make_alert_message'
+    ).side_effect = lambda code, price, rules: f'銘柄コード: {code}'
+    mocker.patch.object(db_mock, 'get_all_rules', return_value=[
+        Rule(12345, Decimal(100), 'over'),
+        Rule(24680, Decimal(100), 'over'),
+    ])
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(100))
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+
+    # 12345の通知だけ、送信に失敗する
+    def send_messages(messages):
+        if '銘柄コード: 12345' in messages:
+            raise AlertException('api error')
+
+    alert_mock = make_alert_mock(mocker)
+    alert_mock.send_messages.side_effect = send_messages
+    alert = QueuedAlert(alert_mock, retries=0, flush_timeout=5.0)
+    mocker.patch.object(QueuedAlert, 'linger', 0)
+    mocker.patch(MockAlert.mock_path, new=alert)
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+    state_file = str(tmp_path / 'alert_state.db')
+    mocker.patch(
+        'test_main.MockAlertState',
+        new=SqliteAlertState(state_file)
+    )
+
+    main_object = get_main_object()
+    try:
+        main_object.execute()
+    finally:
+        alert.close()
+
+    prices = {12345: Decimal(100), 24680: Decimal(100)}
+    assert SqliteAlertState(state_file).judge(
+        prices,
+        get_crossed_rules(prices)
+    ) == [12345]
+
+
+def test_alert_with_crossed_rules(mocker):
+    """
+    超えた基準・条件を満たした指標を指定した場合、
+    そのルールでメッセージが作成されること
+
+    """
+    db_mock = mocker.Mock(spec=IDb)
+    idb_make_alert_message = mocker.patch.object(
+        db_mock,
+        'make_alert_message',
+        return_value='alert'
+    )
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    mocker.patch(MockPrice.mock_path, new=make_price_mock(mocker))
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+
+    rules = [Rule(5489, Decimal(25), 'sma_over')]
+    main_object = get_main_object()
+    main_object.alert({5489: Decimal(100)}, {5489: rules})
+
+    idb_make_alert_message.assert_called_once_with(5489, Decimal(100), rules)
+
+
+def test_indicator_rules_are_alerted(mocker):
+    """
+    指標によるルールの条件を満たした銘柄が、
+    価格による判定結果に加えてアラート対象となること
+    """
+    mocker.patch('main.Main.send_message')
+    main_alert = mocker.patch('main.Main.alert', return_value=True)
+
+    rules = {
+        12345: [Rule(12345, Decimal(25), 'sma_over')],
+        24680: [Rule(24680, Decimal(3), 'change_under')],
+    }
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345, 24680]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions',
+        return_value=[24680]
+    )
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = get_crossed_rules
+    idb_get_indicator_rules = mocker.patch.object(
+        db_mock,
+        'get_indicator_rules',
+        return_value=rules
+    )
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(100))
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+    indicator_mock = mocker.Mock(spec=IIndicator)
+    iindicator_judge = mocker.patch.object(
+        indicator_mock,
+        'judge',
+        return_value=rules
+    )
+    # (MockIndicatorは、indicatorフィクスチャで置き換え済み)
+    mocker.patch('test_main.MockIndicator', new=indicator_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    prices = {12345: Decimal(100), 24680: Decimal(100)}
+    idb_get_indicator_rules.assert_called_once_with([12345, 24680])
+    iindicator_judge.assert_called_once_with(prices, rules)
+    main_alert.assert_called_once_with(prices, {
+        24680: [
+            Rule(24680, Decimal(100), 'over'),
+            Rule(24680, Decimal(3), 'change_under'),
+        ],
+        12345: [Rule(12345, Decimal(25), 'sma_over')],
+    })
+
+
+def test_price_stats_are_logged(mocker):
+    """
+    価格の取得状況の統計がある場合、ログに出力されること
+
+    """
+    mocker.patch('main.Main.send_message')
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(db_mock, 'get_description_groups', return_value=[])
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    price_mock.get_stats.return_value = {'pages': 3, 'bytes_saved': 1024}
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    logger_mock = mocker.Mock(spec=ILogger)
+    ilogger_info = mocker.patch.object(logger_mock, 'info')
+    mocker.patch(MockLogger.mock_path, new=logger_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    ilogger_info.assert_called_once_with(
+        '株価の取得状況: pages=3, bytes_saved=1024'
+    )
+
+
+def test_get_many_is_preferred(mocker):
+    """
+    まとめて取得できた銘柄は1銘柄ずつ取得せず、
+    まとめて取得できなかった銘柄だけを1銘柄ずつ取得すること
+
+    """
+    mocker.patch('main.Main.send_message')
+    main_alert = mocker.patch('main.Main.alert', return_value=True)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345, 24680, 36912]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions'
+    ).side_effect = lambda prices: list(prices)
+    mocker.patch.object(
+        db_mock,
+        'get_crossed_rules'
+    ).side_effect = lambda prices: {
+        code: [Rule(code, Decimal(1), 'over')] for code in prices
+    }
+    mocker.patch.object(db_mock, 'get_indicator_rules', return_value={})
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    price_mock.get_many.return_value = {36912: Decimal(300)}
+    iprice_get_data = mocker.patch.object(
+        price_mock,
+        'get_data',
+        return_value=Decimal(100)
+    )
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    price_mock.get_many.assert_called_once_with([12345, 24680, 36912])
+    assert iprice_get_data.call_args_list == \
+        [mocker.call(12345), mocker.call(24680)]
+    # 銘柄コードの順に判定される
+    prices = main_alert.call_args[0][0]
+    assert list(prices.items()) == [
+        (12345, Decimal(100)),
+        (24680, Decimal(100)),
+        (36912, Decimal(300)),
+    ]
+
+
+def test_skipped_descriptions_are_summarized(mocker):
+    """
+    取得元を遮断中のため取得しなかった銘柄は、銘柄ごとに通知せず、
+    最後に1件の通知にまとめ、終了メッセージと一度に送信すること
+    (遮断前に取得に失敗した銘柄は、銘柄ごとに通知する)
+
+    """
+    main_send_messages = mocker.patch('main.Main.send_messages')
+    mocker.patch('main.Main.alert', return_value=True)
+    main_fail = mocker.patch('main.Main.fail')
+    mocker.patch.object(main.Main, 'fail_summary_limit', 2)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345, 24680], [36912, 48260]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions',
+        return_value=[]
+    )
+    mocker.patch.object(db_mock, 'get_crossed_rules', return_value={})
+    mocker.patch.object(db_mock, 'get_indicator_rules', return_value={})
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+
+    def get_data(description: int) -> Decimal:
+        if description == 12345:
+            raise PriceException()
+        raise PriceCircuitOpenException()
+    mocker.patch.object(price_mock, 'get_data').side_effect = get_data
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    logger_mock = mocker.Mock(spec=ILogger)
+    ilogger_error = mocker.patch.object(logger_mock, 'error')
+    mocker.patch(MockLogger.mock_path, new=logger_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    main_fail.assert_called_once_with(12345)
+    summary = main.Main.fail_summary_message.format(3, '24680, 36912 ...')
+    ilogger_error.assert_called_once_with(summary)
+    main_send_messages.assert_called_once_with(
+        [summary, main.Main.end_message]
+    )
+
+
+
+def test_undelivered_messages_are_logged(mocker):
+    """
+    終了時に送信待ちの通知を送信し終えるまで待ち、
+    送信できなかったメッセージがエラーログに出力されること
+
+    """
+    mocker.patch('main.Main.alert', return_value=True)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(db_mock, 'get_description_groups', return_value=[])
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    mocker.patch(MockPrice.mock_path, new=make_price_mock(mocker))
+    alert_mock = make_alert_mock(mocker)
+    alert_mock.flush.return_value = ['alert 1', main.Main.end_message]
+    mocker.patch(MockAlert.mock_path, new=alert_mock)
+    logger_mock = mocker.Mock(spec=ILogger)
+    ilogger_error = mocker.patch.object(logger_mock, 'error')
+    mocker.patch(MockLogger.mock_path, new=logger_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    alert_mock.send_messages.assert_called_once_with([main.Main.end_message])
+    alert_mock.flush.assert_called_once_with()
+    ilogger_error.assert_called_once_with(main.Main.undelivered_message.format(
+        2,
+        f'alert 1\n{main.Main.end_message}'
+    ))
+
+def test_indicator_is_not_updated_when_reusing_prices(mocker):
+    """
+    昼休み・大引け後(取得済みの価格を使う場合)は、
+    同じ価格で指標が更新されず、前日終値用に価格のみ記録されること
+    """
+    mocker.patch('main.Main.send_message')
+    main_alert = mocker.patch('main.Main.alert', return_value=True)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions',
+        return_value=[]
+    )
+    mocker.patch.object(db_mock, 'get_crossed_rules', return_value={})
+    mocker.patch.object(
+        db_mock,
+        'get_indicator_rules',
+        return_value={12345: [Rule(12345, Decimal(3), 'change_over')]}
+    )
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(100))
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+    indicator_mock = mocker.Mock(spec=IIndicator)
+    mocker.patch('test_main.MockIndicator', new=indicator_mock)
+    calendar_mock = mocker.Mock(spec=IMarketCalendar)
+    mocker.patch.object(
+        calendar_mock,
+        'get_action',
+        return_value=IMarketCalendar.reuse
+    )
+    mocker.patch('test_main.MockMarketCalendar', new=calendar_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    indicator_mock.judge.assert_not_called()
+    indicator_mock.record.assert_called_once_with({12345: Decimal(100)})
+    main_alert.assert_called_once_with({}, {})
+
+
+def test_prices_are_cached_through_main(mocker, tmp_path):
+    """
+    株価チェックで1銘柄ずつ取得した価格が、キャッシュに保存されること
+    (次回の起動で、取得し直さずに使えること)
+    """
+    mocker.patch('main.Main.send_message')
+    mocker.patch('main.Main.alert', return_value=True)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345, 24680]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions',
+        return_value=[]
+    )
+    mocker.patch.object(db_mock, 'get_crossed_rules', return_value={})
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    price_mock = make_price_mock(mocker)
+    mocker.patch.object(price_mock, 'get_data').side_effect = \
+        lambda description: Decimal(description)
+    cache_file = str(tmp_path / 'price_cache.db')
+    mocker.patch(MockPrice.mock_path, new=CachedPrice(
+        price_mock,
+        ttl=60.0,
+        cache_file=cache_file,
+        calendar=NoMarketCalendar()
+    ))
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    cached = CachedPrice(
+        make_price_mock(mocker),
+        ttl=60.0,
+        cache_file=cache_file,
+        calendar=NoMarketCalendar()
+    )
+    assert cached.get_many([12345, 24680]) == {
+        12345: Decimal(12345),
+        24680: Decimal(24680),
+    }
+
+
+def test_iter_data_is_read_to_end(mocker):
+    """
+    価格の取得結果を、取得元が最後の結果を返した後の処理まで読むこと
+
+    """
+    mocker.patch('main.Main.send_message')
+    mocker.patch('main.Main.alert', return_value=True)
+    db_mock = mocker.Mock(spec=IDb)
+    mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[[12345, 24680]]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch.object(
+        db_mock,
+        'get_triggered_descriptions',
+        return_value=[]
+    )
+    mocker.patch.object(db_mock, 'get_crossed_rules', return_value={})
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    finished = []
+
+    def iter_data(descriptions):
+        yield from IPrice.iter_data(price_mock, descriptions)
+        finished.append(descriptions)
+
+    price_mock = make_price_mock(mocker)
+    price_mock.iter_data.side_effect = iter_data
+    mocker.patch.object(price_mock, 'get_data', return_value=Decimal(100))
+    mocker.patch(MockPrice.mock_path, new=price_mock)
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    mocker.patch(MockLogger.mock_path, new=mocker.Mock(spec=ILogger))
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    assert finished == [[12345, 24680]]
+
+
+@pytest.mark.parametrize('action, executed', [
+    (IMarketCalendar.fetch, True),
+    (IMarketCalendar.reuse, True),
+    (IMarketCalendar.skip, False),
+])
+def test_skip_when_market_is_closed(mocker, action, executed):
+    """
+    休場日・取引開始前は株価チェックを行わずに終了し、
+    それ以外は株価チェックを行うこと
+
+    """
+    main_send_messages = mocker.patch('main.Main.send_messages')
+    db_mock = mocker.Mock(spec=IDb)
+    idb_get_description_groups = mocker.patch.object(
+        db_mock,
+        'get_description_groups',
+        return_value=[]
+    )
+    mocker.patch.object(db_mock, 'get_error_report', return_value='')
+    mocker.patch(MockDb.mock_path, new=db_mock)
+    mocker.patch(MockPrice.mock_path, new=make_price_mock(mocker))
+    mocker.patch(MockAlert.mock_path, new=make_alert_mock(mocker))
+    logger_mock = mocker.Mock(spec=ILogger)
+    ilogger_info = mocker.patch.object(logger_mock, 'info')
+    mocker.patch(MockLogger.mock_path, new=logger_mock)
+    calendar_mock = mocker.Mock(spec=IMarketCalendar)
+    mocker.patch.object(calendar_mock, 'get_action', return_value=action)
+    # (MockMarketCalendarは、market_calendarフィクスチャで置き換え済み)
+    mocker.patch('test_main.MockMarketCalendar', new=calendar_mock)
+
+    main_object = get_main_object()
+    main_object.execute()
+
+    assert idb_get_description_groups.called is executed
+    assert main_send_messages.called is executed
+    if not executed:
+        ilogger_info.assert_called_once_with(main.Main.market_closed_message)